@@ -0,0 +1,75 @@
+from datetime import datetime
+from itertools import islice
+
+INDEXED_FIELDS = ('status', 'priority', 'type')
+
+def day_bucket(alert):
+    """Time bucket key: the alert's creation day"""
+    return alert.get('timestamp', '')[:10]
+
+class AlertIndex:
+    """Secondary indexes over alerts by status, priority, type and creation day.
+    
+    Each index maps a value to an insertion-ordered {id: alert} dict, so adding, removing or
+    moving an alert is O(1), counts are len() of a bucket and a filtered view costs O(result).
+    Views come back newest first; for status that means most recently moved into the status.
+    """
+    
+    def __init__(self):
+        self.by_field = {field: {} for field in INDEXED_FIELDS}
+        self.by_day = {}
+        
+    def clear(self):
+        self.by_field = {field: {} for field in INDEXED_FIELDS}
+        self.by_day = {}
+        
+    def add(self, alert):
+        alert_id = alert['id']
+        for field, index in self.by_field.items():
+            index.setdefault(alert.get(field), {})[alert_id] = alert
+        self.by_day.setdefault(day_bucket(alert), {})[alert_id] = alert
+        
+    def remove(self, alert):
+        alert_id = alert['id']
+        for field, index in self.by_field.items():
+            discard(index, alert.get(field), alert_id)
+        discard(self.by_day, day_bucket(alert), alert_id)
+        
+    def move(self, alert, field, old_value):
+        """Re-file an alert whose field has already changed from old_value"""
+        index = self.by_field[field]
+        discard(index, old_value, alert['id'])
+        index.setdefault(alert.get(field), {})[alert['id']] = alert
+        
+    def query(self, field, value, limit=None):
+        """Alerts with field == value, newest first"""
+        bucket = self.by_field[field].get(value, {})
+        return list(islice(reversed(bucket.values()), limit))
+        
+    def count(self, field, value):
+        return len(self.by_field[field].get(value, ()))
+        
+    def counts(self, field):
+        """{value: count} for every value currently present"""
+        return {value: len(bucket) for value, bucket in self.by_field[field].items()}
+        
+    def created_before(self, cutoff):
+        """Alerts created before cutoff; whole days are skipped or taken without parsing timestamps"""
+        cutoff_day = cutoff.strftime('%Y-%m-%d')
+        older = []
+        for day, bucket in self.by_day.items():
+            if day < cutoff_day:
+                older.extend(bucket.values())
+            elif day == cutoff_day:
+                older.extend(alert for alert in bucket.values()
+                             if datetime.fromisoformat(alert['timestamp']) <= cutoff)
+        return older
+
+def discard(index, key, alert_id):
+    """Remove alert_id from index[key], dropping the bucket once it is empty"""
+    bucket = index.get(key)
+    if bucket is None:
+        return
+    bucket.pop(alert_id, None)
+    if not bucket:
+        del index[key]
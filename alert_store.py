@@ -0,0 +1,222 @@
+import json
+import os
+import threading
+
+from metrics import stage_metrics
+from write_behind import sync_directory
+
+class AlertStore:
+    """Append-only JSON Lines log of alert changes with batched fsync and compaction.
+    
+    Each line is one record: {"op": "create", "alert": {...}}, {"op": "update", "id": ...,
+    "fields": {...}} or {"op": "remove", "ids": [...]}. Records are queued in memory and a
+    background thread writes and fsyncs them in batches every flush_interval seconds, so a
+    crash loses at most that window. Once the log holds compact_ratio times more records than
+    there are live alerts, it is rewritten from a snapshot (temp file + atomic rename).
+    Replaying is idempotent, so a record that lands in the log after a snapshot that already
+    contains its change is harmless.
+    """
+    
+    def __init__(self, path, snapshot=None, flush_interval=0.5, max_batch=256,
+                 compact_ratio=4.0, compact_min_records=1000):
+        self.path = path
+        self.snapshot = snapshot  # callable returning the live alerts, oldest first
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.compact_ratio = compact_ratio
+        self.compact_min_records = compact_min_records
+        
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.pending = []
+        self.file = None
+        self.log_records = 0  # records in the file on disk
+        self.live_count = 0
+        self.running = False
+        self.thread = None
+        
+        # Counters
+        self.records_written = 0
+        self.fsyncs = 0
+        self.compactions = 0
+        
+    def load(self):
+        """Replay the log into {id: alert}, oldest first; torn or corrupt lines are skipped"""
+        alerts = {}
+        records = 0
+        corrupt = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        apply_record(alerts, json.loads(line))
+                        records += 1
+                    except (ValueError, KeyError, TypeError):
+                        corrupt += 1
+                        
+        if corrupt:
+            print(f"Skipped {corrupt} unreadable alert log records")
+        self.log_records = records
+        self.live_count = len(alerts)
+        return alerts
+        
+    def open(self):
+        """Open the log for appending and start the flush thread"""
+        if self.running:
+            return
+            
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, 'a')
+        self.running = True
+        self.thread = threading.Thread(target=self.flush_loop, name="alert-store", daemon=True)
+        self.thread.start()
+        
+    def close(self):
+        """Write everything still queued and stop the flush thread"""
+        if not self.running:
+            return
+            
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=5.0)
+            
+        with self.lock:
+            self.write_pending()
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+                
+    def append(self, record, live_delta=0):
+        """Queue a record; O(1), the disk write happens on the flush thread"""
+        with self.condition:
+            self.pending.append(record)
+            self.live_count += live_delta
+            if len(self.pending) >= self.max_batch:
+                self.condition.notify_all()
+                
+    def create(self, alert):
+        # Copied: the caller keeps mutating its dict while the record waits to be serialized
+        self.append({'op': 'create', 'alert': dict(alert)}, live_delta=1)
+        
+    def update(self, alert_id, fields):
+        self.append({'op': 'update', 'id': alert_id, 'fields': dict(fields)})
+        
+    def remove(self, alert_ids):
+        alert_ids = list(alert_ids)
+        self.append({'op': 'remove', 'ids': alert_ids}, live_delta=-len(alert_ids))
+        
+    def flush(self):
+        """Write and fsync queued records now"""
+        with self.lock:
+            self.write_pending()
+            
+    def flush_loop(self):
+        """Flush thread: one write + fsync per batch, compaction when the log has grown stale"""
+        while True:
+            with self.condition:
+                if self.running and len(self.pending) < self.max_batch:
+                    self.condition.wait(self.flush_interval)
+                if not self.running:
+                    return
+                self.write_pending()
+                needs_compaction = self.needs_compaction()
+                
+            if needs_compaction:
+                self.compact()
+                
+    def write_pending(self):
+        """Write queued records as one batch (caller holds the lock)"""
+        if not self.pending or self.file is None:
+            return
+            
+        started = stage_metrics.start()
+        try:
+            self.file.write("".join(json.dumps(record) + "\n" for record in self.pending))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.fsyncs += 1
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing alert log: {e}")
+            return
+            
+        self.records_written += len(self.pending)
+        self.log_records += len(self.pending)
+        self.pending = []
+        stage_metrics.observe('persistence', started)
+        
+    def needs_compaction(self):
+        return (self.log_records >= self.compact_min_records and
+                self.log_records > self.compact_ratio * max(1, self.live_count))
+                
+    def compact(self, alerts=None):
+        """Rewrite the log as one create record per live alert.
+        
+        alerts defaults to the snapshot callable; queued records are dropped because the
+        snapshot already reflects them.
+        """
+        with self.lock:
+            if alerts is None:
+                if self.snapshot is None:
+                    return False
+                alerts = self.snapshot()
+            alerts = list(alerts)
+            
+            temp_path = self.path + ".tmp"
+            was_open = self.file is not None
+            try:
+                with open(temp_path, 'w') as f:
+                    f.write("".join(json.dumps({'op': 'create', 'alert': alert}) + "\n" for alert in alerts))
+                    f.flush()
+                    os.fsync(f.fileno())
+                    
+                if was_open:
+                    self.file.close()
+                    self.file = None
+                os.replace(temp_path, self.path)
+                sync_directory(self.path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Error compacting alert log: {e}")
+                return False
+            finally:
+                if was_open and self.file is None:
+                    self.file = open(self.path, 'a')
+                    
+            self.pending = []
+            self.log_records = len(alerts)
+            self.live_count = len(alerts)
+            self.compactions += 1
+            return True
+            
+    def get_stats(self):
+        """Log size and write counters"""
+        with self.lock:
+            return {
+                'log_records': self.log_records,
+                'live_alerts': self.live_count,
+                'pending': len(self.pending),
+                'records_written': self.records_written,
+                'fsyncs': self.fsyncs,
+                'compactions': self.compactions
+            }
+
+def apply_record(alerts, record):
+    """Apply one log record to {id: alert}; safe to repeat"""
+    op = record['op']
+    if op == 'create':
+        alert = record['alert']
+        alerts[alert['id']] = alert
+    elif op == 'update':
+        alert = alerts.get(record['id'])
+        if alert is not None:
+            alert.update(record['fields'])
+    elif op == 'remove':
+        for alert_id in record['ids']:
+            alerts.pop(alert_id, None)
+    else:
+        raise ValueError(f"unknown alert log op {op!r}")
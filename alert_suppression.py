@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Outcomes of AlertSuppressor.check
+CREATE = 'create'
+AGGREGATE = 'aggregate'
+SUPPRESS = 'suppress'
+
+class TokenBucket:
+    """Allows burst events at once, refilled at rate per second"""
+    
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        
+    def take(self, now):
+        """Spend a token if one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+class SuppressionKey:
+    """Per-key state: the alert repeats are folded into and the key's rate limit"""
+    
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.alert_id = None
+        self.last_seen = 0.0
+        self.last_persisted = 0.0
+        self.dirty = False
+
+class AlertSuppressor:
+    """Deduplicates and rate-limits alerts keyed by (type, camera, subject).
+    
+    The subject is a track id or identity. A repeat within window seconds of the key's last
+    event is folded into the open alert as a count and last-seen time instead of becoming a new
+    alert. After a quiet window a new alert is allowed only if the key's token bucket has a token
+    (rate_per_minute refill, burst capacity); otherwise the event is suppressed, and still counted
+    on the key's previous alert if that is around.
+    """
+    
+    def __init__(self, window=60.0, rate_per_minute=1.0, burst=3, max_keys=10000, enabled=True):
+        self.window = window
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.max_keys = max_keys
+        self.enabled = enabled
+        
+        self.keys = OrderedDict()  # least recently seen first
+        self.lock = threading.Lock()
+        
+        # Counters
+        self.created = 0
+        self.aggregated = 0
+        self.rate_limited = 0
+        
+    def update_settings(self, settings):
+        """Update window and rate limits; existing buckets keep their tokens"""
+        with self.lock:
+            if 'enabled' in settings:
+                self.enabled = bool(settings['enabled'])
+            if 'dedup_window_seconds' in settings:
+                self.window = float(settings['dedup_window_seconds'])
+            if 'rate_limit_per_minute' in settings:
+                self.rate_per_minute = float(settings['rate_limit_per_minute'])
+            if 'rate_limit_burst' in settings:
+                self.burst = max(1, int(settings['rate_limit_burst']))
+            for state in self.keys.values():
+                state.bucket.rate = self.rate_per_minute / 60.0
+                state.bucket.burst = self.burst
+                
+    def check(self, key, is_open, now=None):
+        """Decide what an event for key becomes: (CREATE | AGGREGATE | SUPPRESS, alert_id).
+        
+        is_open(alert_id) tells whether the key's last alert can still take repeats (it may have
+        been resolved, dismissed or cleaned up). With AGGREGATE, and SUPPRESS when alert_id is not
+        None, the caller folds the event into that alert.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            if not self.enabled:
+                self.created += 1
+                return CREATE, None
+            alert_id = self.key_state(key, now).alert_id
+            
+        # Asked without our lock: is_open takes the alert system's lock, and taking that inside
+        # ours would invert the order of the alert system's own calls into us and deadlock
+        open_alert = alert_id is not None and is_open(alert_id)
+        
+        with self.lock:
+            state = self.key_state(key, now)
+            if state.alert_id != alert_id:
+                # Another event for this key opened an alert meanwhile; it is open
+                open_alert = state.alert_id is not None
+                
+            within_window = now - state.last_seen <= self.window
+            state.last_seen = now
+            
+            if open_alert and within_window:
+                self.aggregated += 1
+                return AGGREGATE, state.alert_id
+                
+            if state.bucket.take(now):
+                self.created += 1
+                return CREATE, None
+                
+            self.rate_limited += 1
+            return SUPPRESS, state.alert_id if open_alert else None
+            
+    def key_state(self, key, now):
+        """State for key, created on first use and marked most recently seen (caller holds the lock)"""
+        state = self.keys.get(key)
+        if state is None:
+            state = SuppressionKey(TokenBucket(self.rate_per_minute / 60.0, self.burst, now))
+            self.keys[key] = state
+            self.prune()
+        self.keys.move_to_end(key)
+        return state
+        
+    def opened(self, key, alert_id, now=None):
+        """Record the alert created for key so later repeats fold into it.
+        
+        Returns the key's previous alert id if it has repeats that were never persisted.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            state = self.keys.get(key)
+            if state is None:
+                return None
+            previous = state.alert_id if state.dirty else None
+            state.alert_id = alert_id
+            state.last_persisted = now
+            state.dirty = False
+            return previous
+                
+    def should_persist(self, key, interval, now=None):
+        """Whether a folded repeat should be written now; repeats are persisted at most every interval"""
+        now = time.time() if now is None else now
+        with self.lock:
+            state = self.keys.get(key)
+            if state is None:
+                return True
+            if now - state.last_persisted >= interval:
+                state.last_persisted = now
+                state.dirty = False
+                return True
+            state.dirty = True
+            return False
+            
+    def take_dirty(self):
+        """Alert ids with repeats not yet persisted; clears the marks"""
+        with self.lock:
+            dirty = [state.alert_id for state in self.keys.values() if state.dirty and state.alert_id]
+            for state in self.keys.values():
+                state.dirty = False
+            return dirty
+            
+    def prune(self):
+        """Forget the least recently seen keys beyond max_keys (caller holds the lock)"""
+        while len(self.keys) > self.max_keys:
+            self.keys.popitem(last=False)
+            
+    def reset(self):
+        with self.lock:
+            self.keys.clear()
+            
+    def get_stats(self):
+        """Outcome counters; suppressed = aggregated + rate_limited"""
+        with self.lock:
+            suppressed = self.aggregated + self.rate_limited
+            events = self.created + suppressed
+            return {
+                'keys': len(self.keys),
+                'created': self.created,
+                'aggregated': self.aggregated,
+                'rate_limited': self.rate_limited,
+                'suppressed': suppressed,
+                'suppressed_ratio': suppressed / events if events else 0.0
+            }
@@ -1,49 +1,91 @@
 import json
 import os
-import smtplib
 from datetime import datetime, timedelta
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import uuid
 import threading
+from itertools import islice
+
+from alert_index import AlertIndex
+from alert_store import AlertStore
+from alert_suppression import AGGREGATE, CREATE, AlertSuppressor
+from mail_worker import MailWorker
+from metrics import stage_metrics
 
 class AlertSystem:
-    def __init__(self):
-        self.alerts_file = "data/alerts.json"
-        self.alerts = []
+    def __init__(self, alerts_file="data/alerts.jsonl"):
+        self.alerts_file = alerts_file
+        self.legacy_alerts_file = os.path.join(os.path.dirname(alerts_file), "alerts.json")
+        self.alerts = {}  # id -> alert, oldest first; O(1) lookup for resolve/dismiss
+        self.index = AlertIndex()
+        self.version = 0  # bumped on every change so views can skip redundant refreshes
+        self.lock = threading.RLock()
         self.email_settings = {}
+        self.mail_worker = MailWorker()
+        self.suppressor = AlertSuppressor()
+        self.repeat_persist_interval = 5.0  # folded repeats are written at most this often per key
+        self.store = AlertStore(self.alerts_file, snapshot=self.snapshot)
         self.ensure_data_directory()
         self.load_alerts()
+        self.store.open()
+        self.mail_worker.start()
         
     def ensure_data_directory(self):
         """Ensure data directory exists"""
-        os.makedirs("data", exist_ok=True)
+        os.makedirs(os.path.dirname(self.alerts_file) or ".", exist_ok=True)
         
     def load_alerts(self):
-        """Load alerts from file"""
+        """Load alerts from the log, importing a pre-log alerts.json once"""
         try:
-            if os.path.exists(self.alerts_file):
-                with open(self.alerts_file, 'r') as f:
-                    self.alerts = json.load(f)
-                print(f"Loaded {len(self.alerts)} alerts")
+            if not os.path.exists(self.alerts_file) and os.path.exists(self.legacy_alerts_file):
+                with open(self.legacy_alerts_file, 'r') as f:
+                    legacy_alerts = json.load(f)
+                    
+                # alerts.json was newest first
+                self.alerts = {alert['id']: alert for alert in reversed(legacy_alerts)}
+                self.rebuild_index()
+                self.store.compact(self.alerts.values())
+                os.replace(self.legacy_alerts_file, self.legacy_alerts_file + ".migrated")
+                print(f"Imported {len(self.alerts)} alerts from {self.legacy_alerts_file}")
             else:
-                self.alerts = []
+                self.alerts = self.store.load()
+                self.rebuild_index()
+                print(f"Loaded {len(self.alerts)} alerts")
                 
         except Exception as e:
             print(f"Error loading alerts: {e}")
-            self.alerts = []
+            self.alerts = {}
+            self.rebuild_index()
+            
+    def rebuild_index(self):
+        """Index every loaded alert (once at startup; changes keep it current afterwards)"""
+        with self.lock:
+            self.index.clear()
+            for alert in self.alerts.values():
+                self.index.add(alert)
+            self.version += 1
+            
+    def snapshot(self):
+        """Copies of the live alerts, oldest first, for log compaction"""
+        with self.lock:
+            return [dict(alert) for alert in self.alerts.values()]
             
     def save_alerts(self):
-        """Save alerts to file"""
+        """Write queued alert changes to disk now"""
         try:
-            with open(self.alerts_file, 'w') as f:
-                json.dump(self.alerts, f, indent=2)
-                
+            self.store.flush()
+            
         except Exception as e:
             print(f"Error saving alerts: {e}")
             
+    def close(self):
+        """Flush the alert log, stop its writer thread and send queued emails"""
+        self.flush_repeats()
+        self.store.close()
+        self.mail_worker.stop()
+        
     def create_alert(self, alert_type, message, priority="Medium", auto_email=True):
         """Create a new alert"""
+        started = stage_metrics.start()
         try:
             alert = {
                 'id': str(uuid.uuid4()),
@@ -55,32 +97,124 @@ class AlertSystem:
                 'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
             
-            self.alerts.insert(0, alert)  # Add to beginning for newest first
-            self.save_alerts()
+            with self.lock:
+                self.alerts[alert['id']] = alert
+                self.index.add(alert)
+                self.version += 1
+            self.store.create(alert)
             
             print(f"Alert created: {alert_type} - {message}")
             
-            # Send email notification if enabled
+            # Send email notification if enabled (queued; the mail worker batches and sends)
             if auto_email and self.email_settings:
-                threading.Thread(target=self.send_email_alert, args=(alert,), daemon=True).start()
+                self.mail_worker.submit(alert)
                 
+            stage_metrics.observe('alert_creation', started)
+            stage_metrics.increment('alerts_created_total')
             return alert['id']
             
         except Exception as e:
             print(f"Error creating alert: {e}")
             return None
             
+    def raise_alert(self, alert_type, message, priority="Medium", camera=None, subject=None, auto_email=True):
+        """Report an alert-worthy event, deduplicated and rate-limited per (type, camera, subject).
+        
+        subject is whatever identifies the cause, e.g. a track id or a name. Returns the id of the
+        alert the event was created as or folded into, or None if it was dropped.
+        """
+        try:
+            key = (alert_type, camera, subject)
+            action, alert_id = self.suppressor.check(key, self.is_alert_open)
+            
+            if action == CREATE:
+                alert_id = self.create_alert(alert_type, message, priority, auto_email)
+                if alert_id is not None:
+                    previous_id = self.suppressor.opened(key, alert_id)
+                    if previous_id is not None:
+                        self.persist_repeats(previous_id)
+                return alert_id
+                
+            if action == AGGREGATE:
+                stage_metrics.increment('alerts_aggregated_total')
+            else:
+                stage_metrics.increment('alerts_rate_limited_total')
+                
+            if alert_id is not None:
+                self.fold_repeat(key, alert_id)
+            return alert_id
+            
+        except Exception as e:
+            print(f"Error raising alert: {e}")
+            return None
+            
+    def is_alert_open(self, alert_id):
+        """Whether repeats can still be folded into an alert"""
+        with self.lock:
+            alert = self.alerts.get(alert_id)
+            return alert is not None and alert['status'] == 'Active'
+            
+    def fold_repeat(self, key, alert_id):
+        """Count a repeated event on its alert; the count is persisted at most every few seconds"""
+        with self.lock:
+            alert = self.alerts.get(alert_id)
+            if alert is None:
+                return
+            alert['count'] = alert.get('count', 1) + 1
+            alert['last_seen'] = datetime.now().isoformat()
+            fields = {'count': alert['count'], 'last_seen': alert['last_seen']}
+            self.version += 1
+            
+        if self.suppressor.should_persist(key, self.repeat_persist_interval):
+            self.store.update(alert_id, fields)
+            
+    def flush_repeats(self):
+        """Persist repeat counts that are still only in memory"""
+        for alert_id in self.suppressor.take_dirty():
+            self.persist_repeats(alert_id)
+            
+    def persist_repeats(self, alert_id):
+        """Log an alert's current repeat count"""
+        with self.lock:
+            alert = self.alerts.get(alert_id)
+            if alert is None or 'count' not in alert:
+                return
+            fields = {'count': alert['count'], 'last_seen': alert['last_seen']}
+        self.store.update(alert_id, fields)
+            
+    def update_suppression_settings(self, settings):
+        """Update deduplication window and per-key rate limits"""
+        try:
+            self.suppressor.update_settings(settings)
+            self.repeat_persist_interval = float(settings.get('repeat_persist_seconds', self.repeat_persist_interval))
+            
+        except Exception as e:
+            print(f"Error updating alert suppression settings: {e}")
+            
+    def set_alert_status(self, alert_id, status, time_field):
+        """Move an alert to a new status and log the transition; False if it does not exist"""
+        fields = {'status': status, time_field: datetime.now().isoformat()}
+        with self.lock:
+            alert = self.alerts.get(alert_id)
+            if alert is None:
+                return False
+            old_status = alert.get('status')
+            alert.update(fields)
+            # Carry any repeat count not yet persisted along with the transition
+            if 'count' in alert:
+                fields.update(count=alert['count'], last_seen=alert['last_seen'])
+            self.index.move(alert, 'status', old_status)
+            self.version += 1
+        self.store.update(alert_id, fields)
+        return True
+        
     def resolve_alert(self, alert_id):
         """Resolve an alert"""
         try:
-            for alert in self.alerts:
-                if alert['id'] == alert_id:
-                    alert['status'] = 'Resolved'
-                    alert['resolved_at'] = datetime.now().isoformat()
-                    self.save_alerts()
-                    print(f"Alert resolved: {alert_id}")
-                    return True
-                    
+            if self.set_alert_status(alert_id, 'Resolved', 'resolved_at'):
+                print(f"Alert resolved: {alert_id}")
+                return True
+                
             return False
             
         except Exception as e:
@@ -90,41 +224,68 @@ class AlertSystem:
     def dismiss_alert(self, alert_id):
         """Dismiss an alert"""
         try:
-            for alert in self.alerts:
-                if alert['id'] == alert_id:
-                    alert['status'] = 'Dismissed'
-                    alert['dismissed_at'] = datetime.now().isoformat()
-                    self.save_alerts()
-                    print(f"Alert dismissed: {alert_id}")
-                    return True
-                    
+            if self.set_alert_status(alert_id, 'Dismissed', 'dismissed_at'):
+                print(f"Alert dismissed: {alert_id}")
+                return True
+                
             return False
             
         except Exception as e:
             print(f"Error dismissing alert: {e}")
             return False
             
-    def get_all_alerts(self):
-        """Get all alerts"""
-        return self.alerts.copy()
+    def remove_alerts(self, alerts):
+        """Remove the given alerts with a single log record; returns how many"""
+        removed = []
+        with self.lock:
+            for alert in alerts:
+                if self.alerts.pop(alert['id'], None) is not None:
+                    self.index.remove(alert)
+                    removed.append(alert['id'])
+            if removed:
+                self.version += 1
+        if removed:
+            self.store.remove(removed)
+        return len(removed)
         
-    def get_active_alerts(self):
+    def get_alert(self, alert_id):
+        """Get one alert by id"""
+        with self.lock:
+            return self.alerts.get(alert_id)
+            
+    def get_all_alerts(self, limit=None):
+        """Get all alerts, newest first"""
+        with self.lock:
+            return list(islice(reversed(self.alerts.values()), limit))
+        
+    def get_active_alerts(self, limit=None):
         """Get only active alerts"""
-        return [alert for alert in self.alerts if alert['status'] == 'Active']
+        with self.lock:
+            return self.index.query('status', 'Active', limit)
         
-    def get_alerts_by_priority(self, priority):
+    def get_alerts_by_priority(self, priority, limit=None):
         """Get alerts by priority"""
-        return [alert for alert in self.alerts if alert['priority'] == priority]
+        with self.lock:
+            return self.index.query('priority', priority, limit)
         
-    def get_alerts_by_type(self, alert_type):
+    def get_alerts_by_type(self, alert_type, limit=None):
         """Get alerts by type"""
-        return [alert for alert in self.alerts if alert['type'] == alert_type]
+        with self.lock:
+            return self.index.query('type', alert_type, limit)
+        
+    def get_alerts_by_status(self, status, limit=None):
+        """Get alerts by status"""
+        with self.lock:
+            return self.index.query('status', status, limit)
         
     def clear_all_alerts(self):
         """Clear all alerts"""
         try:
-            self.alerts = []
-            self.save_alerts()
+            with self.lock:
+                self.alerts = {}
+                self.index.clear()
+                self.version += 1
+            self.store.compact([])
             print("All alerts cleared")
             return True
             
@@ -135,8 +296,7 @@ class AlertSystem:
     def clear_resolved_alerts(self):
         """Clear only resolved alerts"""
         try:
-            self.alerts = [alert for alert in self.alerts if alert['status'] != 'Resolved']
-            self.save_alerts()
+            self.remove_alerts(self.get_alerts_by_status('Resolved'))
             print("Resolved alerts cleared")
             return True
             
@@ -148,49 +308,20 @@ class AlertSystem:
         """Update email settings"""
         try:
             self.email_settings = email_settings
+            self.mail_worker.update_settings(email_settings)
             print("Alert system email settings updated")
             
         except Exception as e:
             print(f"Error updating alert settings: {e}")
             
     def send_email_alert(self, alert):
-        """Send email notification for alert"""
+        """Queue an email notification for alert"""
         try:
-            if not self.email_settings or not all(key in self.email_settings for key in ['email', 'password', 'smtp_server', 'smtp_port']):
+            if not self.mail_worker.is_configured():
                 print("Email settings not configured, skipping email notification")
                 return False
                 
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = self.email_settings['email']
-            msg['To'] = self.email_settings['email']  # Send to same email for demo
-            msg['Subject'] = f"Faculty Monitoring Alert: {alert['type']}"
-            
-            # Email body
-            body = f"""
-Faculty Monitoring System Alert
-
-Type: {alert['type']}
-Priority: {alert['priority']}
-Time: {alert['created_at']}
-Message: {alert['message']}
-
-This is an automated alert from the Faculty Monitoring System.
-            """
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Send email
-            server = smtplib.SMTP(self.email_settings['smtp_server'], self.email_settings['smtp_port'])
-            server.starttls()
-            server.login(self.email_settings['email'], self.email_settings['password'])
-            
-            text = msg.as_string()
-            server.sendmail(self.email_settings['email'], self.email_settings['email'], text)
-            server.quit()
-            
-            print(f"Email alert sent for: {alert['type']}")
-            return True
+            return self.mail_worker.submit(alert)
             
         except Exception as e:
             print(f"Error sending email alert: {e}")
@@ -199,22 +330,24 @@ This is an automated alert from the Faculty Monitoring System.
     def get_alert_statistics(self):
         """Get alert statistics"""
         try:
-            total_alerts = len(self.alerts)
-            active_alerts = len(self.get_active_alerts())
-            resolved_alerts = len([a for a in self.alerts if a['status'] == 'Resolved'])
-            dismissed_alerts = len([a for a in self.alerts if a['status'] == 'Dismissed'])
-            
-            priority_counts = {}
-            for priority in ['High', 'Medium', 'Low']:
-                priority_counts[priority] = len(self.get_alerts_by_priority(priority))
+            # Counts are bucket sizes in the index; no pass over the alerts
+            with self.lock:
+                priority_counts = {priority: self.index.count('priority', priority)
+                                   for priority in ['High', 'Medium', 'Low']}
+                stats = {
+                    'total': len(self.alerts),
+                    'active': self.index.count('status', 'Active'),
+                    'resolved': self.index.count('status', 'Resolved'),
+                    'dismissed': self.index.count('status', 'Dismissed'),
+                    'priority_counts': priority_counts,
+                    'type_counts': self.index.counts('type')
+                }
                 
-            return {
-                'total': total_alerts,
-                'active': active_alerts,
-                'resolved': resolved_alerts,
-                'dismissed': dismissed_alerts,
-                'priority_counts': priority_counts
-            }
+            # Outside our lock: the alert system and suppressor locks are never held together
+            # (check() asks is_alert_open outside the suppressor's lock), which keeps them deadlock-free
+            stats['suppression'] = self.suppressor.get_stats()
+            stats['email'] = self.mail_worker.get_stats()
+            return stats
             
         except Exception as e:
             print(f"Error getting alert statistics: {e}")
@@ -225,16 +358,11 @@ This is an automated alert from the Faculty Monitoring System.
         try:
             cutoff_date = datetime.now() - timedelta(days=days)
             
-            original_count = len(self.alerts)
-            self.alerts = [
-                alert for alert in self.alerts 
-                if datetime.fromisoformat(alert['timestamp']) > cutoff_date
-            ]
-            
-            removed_count = original_count - len(self.alerts)
+            with self.lock:
+                old_alerts = self.index.created_before(cutoff_date)
+            removed_count = self.remove_alerts(old_alerts)
             
             if removed_count > 0:
-                self.save_alerts()
                 print(f"Removed {removed_count} old alerts")
                 
             return removed_count
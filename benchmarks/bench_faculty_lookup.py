@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Faculty lookup benchmark: hash-indexed FacultyManager lookups against the
+previous linear scans, on a large synthetic roster
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from faculty_manager import FacultyManager
+
+def synthetic_roster(size, rng):
+    return [{
+        'id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'name': f"Dr. Faculty Member {i:06d}",
+        'department': rng.choice(['Computer Science', 'Mathematics', 'Physics', 'Chemistry']),
+        'email': f"member{i}@university.edu",
+        'phone': '+1-555-0100',
+        'employee_id': f"EMP{i:06d}",
+        'status': 'Active',
+        'created_at': '2024-01-01T00:00:00',
+        'last_seen': 'Never'
+    } for i in range(size)]
+
+def scan_by_id(records, faculty_id):
+    """The old get_faculty_by_id"""
+    for faculty in records:
+        if faculty['id'] == faculty_id:
+            return faculty
+    return None
+
+def scan_by_name(records, name):
+    """The old get_faculty_by_name / update_last_seen lookup"""
+    for faculty in records:
+        if faculty['name'].lower() == name.lower():
+            return faculty
+    return None
+
+def time_per_call(function, args_list):
+    """Mean microseconds per call over args_list"""
+    start = time.perf_counter()
+    for args in args_list:
+        function(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark faculty lookups")
+    parser.add_argument('--faculty', type=int, default=50000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--scan-lookups', type=int, default=200, help="linear scans are slow; use fewer")
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    roster = synthetic_roster(args.faculty, rng)
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        # An hour-long interval keeps the background writer out of the timings
+        manager = FacultyManager(os.path.join(workdir, 'faculty_data.json'), write_interval=3600)
+        start = time.perf_counter()
+        with manager.lock:
+            manager.faculty_data = roster
+            manager.index.rebuild(roster)
+        print(f"indexed {args.faculty} records in {(time.perf_counter() - start) * 1000:.1f} ms")
+        
+        # Recognition results name people in whatever case the gallery uses
+        sample = [rng.choice(roster) for _ in range(args.lookups)]
+        by_id = [(record['id'],) for record in sample]
+        by_name = [(record['name'].upper(),) for record in sample]
+        by_employee_id = [(record['employee_id'].lower(),) for record in sample]
+        scans = args.scan_lookups
+        
+        rows = [
+            ('get_faculty_by_id', time_per_call(lambda i: scan_by_id(roster, i), by_id[:scans]),
+             time_per_call(manager.get_faculty_by_id, by_id)),
+            ('get_faculty_by_name', time_per_call(lambda n: scan_by_name(roster, n), by_name[:scans]),
+             time_per_call(manager.get_faculty_by_name, by_name)),
+            ('get_faculty_by_employee_id', None, time_per_call(manager.get_faculty_by_employee_id, by_employee_id)),
+            ('update_last_seen', time_per_call(lambda n: scan_by_name(roster, n), by_name[:scans]),
+             time_per_call(manager.update_last_seen, by_name))
+        ]
+        
+        print(f"{'lookup':<28} {'scan us':>10} {'indexed us':>11} {'speedup':>9}")
+        for name, scan_us, indexed_us in rows:
+            scan_text = f"{scan_us:>10.1f}" if scan_us is not None else f"{'-':>10}"
+            speedup = f"{scan_us / indexed_us:>8.0f}x" if scan_us is not None else f"{'-':>9}"
+            print(f"{name:<28} {scan_text} {indexed_us:>11.2f} {speedup}")
+            
+        manager.close()
+
+if __name__ == "__main__":
+    main()
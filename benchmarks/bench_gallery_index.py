@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Gallery index benchmark: recall@1 and per-probe latency of the approximate
+IVF backend against the exact brute-force scan on synthetic encodings
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_gallery import FaceGallery
+
+def make_encodings(count, rng, groups=64, spread=0.06, group_spread=0.04):
+    """Synthetic 128-d encodings with loose group structure, scaled like dlib's"""
+    centers = rng.normal(0.0, group_spread, size=(groups, 128))
+    labels = rng.integers(0, groups, size=count)
+    return (centers[labels] + rng.normal(0.0, spread, size=(count, 128))).astype(np.float32)
+
+def time_search(search, probes, tolerance):
+    """Run one probe at a time (as in a frame) and return results and per-probe latencies"""
+    results = []
+    latencies = []
+    for probe in probes:
+        start = time.perf_counter()
+        results.extend(search(probe[None, :], tolerance, 1))
+        latencies.append(time.perf_counter() - start)
+    return results, np.array(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gallery index backends")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--probes', type=int, default=500)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--nlist', type=int, default=0)
+    parser.add_argument('--noise', type=float, default=0.025)
+    parser.add_argument('--tolerance', type=float, default=0.6)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    
+    print(f"{'size':>8} {'backend':>12} {'recall@1':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    
+    for size in args.sizes:
+        gallery = FaceGallery(initial_capacity=size)
+        encodings = make_encodings(size, rng)
+        for i, encoding in enumerate(encodings):
+            gallery.add(f"faculty_{i}", encoding)
+            
+        # Probes are noisy views of enrolled identities
+        targets = rng.integers(0, size, size=args.probes)
+        probes = encodings[targets] + rng.normal(0.0, args.noise, size=(args.probes, 128)).astype(np.float32)
+        
+        exact, latencies = time_search(gallery.match, probes, args.tolerance)
+        exact_names = [result['candidates'][0]['name'] for result in exact]
+        print(f"{size:>8} {'exact':>12} {1.0:>9.3f} "
+              f"{np.percentile(latencies, 50) * 1000:>8.3f} {np.percentile(latencies, 95) * 1000:>8.3f}")
+              
+        for nprobe in args.nprobe:
+            gallery.configure_index('ivf', nlist=args.nlist, nprobe=nprobe, min_gallery_size=0)
+            gallery.index.train()
+            
+            approximate, latencies = time_search(gallery.search, probes, args.tolerance)
+            hits = sum(
+                1 for result, name in zip(approximate, exact_names)
+                if result['candidates'] and result['candidates'][0]['name'] == name
+            )
+            print(f"{size:>8} {f'ivf/{nprobe}':>12} {hits / len(exact_names):>9.3f} "
+                  f"{np.percentile(latencies, 50) * 1000:>8.3f} {np.percentile(latencies, 95) * 1000:>8.3f}")
+                  
+        gallery.configure_index('exact')
+
+if __name__ == "__main__":
+    main()
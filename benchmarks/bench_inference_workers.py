@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Inference worker benchmark: frames/sec through InferenceWorkerPool as the
+number of worker processes grows, with frames passed via shared memory
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference_workers import InferenceWorkerPool, create_ml_processor
+
+class BusyProcessor:
+    """GIL-bound stand-in for detection: a fixed amount of pure-Python work per frame"""
+    
+    def __init__(self, settings):
+        self.work_ms = settings.get('work_ms', 20.0)
+        
+    def detect_faces(self, frame, regions=None):
+        checksum = int(frame[::64, ::64].sum())
+        deadline = time.perf_counter() + self.work_ms / 1000.0
+        while time.perf_counter() < deadline:
+            checksum = (checksum * 31 + 7) % 1000003
+        height, width = frame.shape[:2]
+        return [{'bbox': (width // 4, height // 4, width // 8, height // 8), 'confidence': 0.9}]
+        
+    def encode_faces(self, frame, face_locations):
+        return [np.zeros(128) for _ in face_locations]
+
+def create_busy_processor(settings):
+    return BusyProcessor(settings)
+
+def run(workers, frames, resolution, factory, settings, recognize):
+    """Push frames as fast as slots free up; returns frames/sec and mean latency"""
+    width, height = resolution
+    frame = np.random.default_rng(0).integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    
+    pool = InferenceWorkerPool(workers=workers, slot_bytes=frame.nbytes,
+                               processor_factory=factory, settings=settings)
+    pool.start()
+    
+    done = threading.Semaphore(0)
+    
+    def on_result(detected_faces, face_encodings, error):
+        done.release()
+        
+    # Warm up every worker (model load, first inference) before timing
+    for _ in range(workers * 2):
+        while not pool.submit(frame, None, recognize, on_result):
+            pass
+    for _ in range(workers * 2):
+        done.acquire()
+        
+    start = time.perf_counter()
+    submitted = 0
+    while submitted < frames:
+        if pool.submit(frame, None, recognize, on_result):
+            submitted += 1
+    for _ in range(frames):
+        done.acquire()
+    elapsed = time.perf_counter() - start
+    
+    stats = pool.get_stats()
+    pool.stop()
+    return frames / elapsed, stats['avg_ms']
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark process-based inference workers")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--resolution', default='640x480')
+    parser.add_argument('--workload', choices=['busy', 'ml'], default='busy',
+                        help="'busy' = synthetic GIL-bound work, 'ml' = the real MLProcessor")
+    parser.add_argument('--work-ms', type=float, default=20.0)
+    parser.add_argument('--recognize', action='store_true', help="also encode faces in the workers")
+    args = parser.parse_args()
+    
+    resolution = tuple(int(v) for v in args.resolution.split('x'))
+    if args.workload == 'ml':
+        factory, settings = create_ml_processor, {}
+    else:
+        factory, settings = create_busy_processor, {'work_ms': args.work_ms}
+        
+    print(f"{'workers':>8} {'fps':>8} {'speedup':>8} {'ms/frame':>9}")
+    
+    baseline = None
+    for workers in args.workers:
+        fps, latency = run(workers, args.frames, resolution, factory, settings, args.recognize)
+        baseline = baseline or fps
+        print(f"{workers:>8} {fps:>8.1f} {fps / baseline:>8.2f} {latency:>9.1f}")
+
+if __name__ == "__main__":
+    main()
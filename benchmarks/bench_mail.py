@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Alert email benchmark: delivery throughput of MailWorker against a local SMTP
+stand-in, compared with the old connection-per-alert approach
+"""
+
+import argparse
+import os
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mail_worker import MailWorker, build_message
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, AUTH PLAIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+    
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode('ascii'))
+        
+    def handle(self):
+        server = self.server
+        # Stands in for the TCP + STARTTLS + login round trips of a real provider
+        time.sleep(server.connect_delay)
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost stand-in SMTP")
+        
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            
+            if verb == 'EHLO':
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN")
+            elif verb == 'HELO':
+                self.reply("250 localhost")
+            elif verb == 'AUTH':
+                self.reply("235 Authentication successful")
+            elif verb in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                time.sleep(server.message_delay)
+                with server.lock:
+                    server.messages += 1
+                self.reply("250 Queued")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Local SMTP sink on an ephemeral port that counts connections and messages"""
+    
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, connect_delay=0.0, message_delay=0.0):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.connect_delay = connect_delay
+        self.message_delay = message_delay
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        
+    @property
+    def port(self):
+        return self.server_address[1]
+        
+    def start(self):
+        self.thread.start()
+        return self
+        
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def make_alerts(count):
+    return [{
+        'id': str(i),
+        'type': 'Unknown Person',
+        'message': f"Unknown person detected on Corridor {i % 4} (benchmark)",
+        'priority': 'Medium',
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    } for i in range(count)]
+
+def settings_for(server):
+    return {'smtp_server': '127.0.0.1', 'smtp_port': server.port, 'email': 'alerts@example.com',
+            'password': 'secret', 'use_tls': False}
+
+def run_per_alert(alerts, server):
+    """Old behaviour: a new connection and login for every alert"""
+    settings = settings_for(server)
+    start = time.perf_counter()
+    for alert in alerts:
+        connection = smtplib.SMTP(settings['smtp_server'], settings['smtp_port'])
+        connection.login(settings['email'], settings['password'])
+        connection.sendmail(settings['email'], [settings['email']],
+                            build_message([alert], settings['email'], settings['email']).as_string())
+        connection.quit()
+    return time.perf_counter() - start
+
+def run_worker(alerts, server, digest_window, max_digest):
+    """MailWorker with a reused connection and optional digests"""
+    worker = MailWorker(settings_for(server), queue_size=len(alerts),
+                        digest_window=digest_window, max_digest=max_digest)
+    worker.start()
+    start = time.perf_counter()
+    for alert in alerts:
+        worker.submit(alert)
+    while worker.get_stats()['sent_alerts'] + worker.get_stats()['failed'] < len(alerts):
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    worker.stop()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark alert email delivery")
+    parser.add_argument('--alerts', type=int, default=200)
+    parser.add_argument('--connect-ms', type=float, default=50.0,
+                        help="simulated connection + TLS + login cost per connection")
+    parser.add_argument('--message-ms', type=float, default=5.0, help="simulated per-message server cost")
+    parser.add_argument('--digest-window', type=float, default=0.05)
+    parser.add_argument('--max-digest', type=int, default=20)
+    args = parser.parse_args()
+    
+    alerts = make_alerts(args.alerts)
+    modes = [
+        ('per-alert connection', lambda server: run_per_alert(alerts, server)),
+        ('worker, reused connection', lambda server: run_worker(alerts, server, 0.0, 1)),
+        (f'worker, digests of {args.max_digest}',
+         lambda server: run_worker(alerts, server, args.digest_window, args.max_digest))
+    ]
+    
+    print(f"{'mode':<28} {'alerts/s':>9} {'messages':>9} {'connections':>12}")
+    for name, run in modes:
+        server = LocalSMTPServer(args.connect_ms / 1000.0, args.message_ms / 1000.0).start()
+        elapsed = run(server)
+        print(f"{name:<28} {len(alerts) / elapsed:>9.1f} {server.messages:>9} {server.connections:>12}")
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite: gallery matching, detection, recognition,
+process_frame and the full capture-to-alert path, on synthetic frames or a
+recorded video/frame directory. Results (p50/p95/p99 latency, frames/sec,
+peak RSS) are written as JSON and can be compared against a baseline run.
+Each scenario, and each gallery size of the scenarios that search a gallery,
+runs in its own interpreter, so its peak RSS is not inflated by the runs
+before it. Synthetic galleries replace the real one, so reference_images/ and
+its encoding cache are never read or written.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_gallery_index import make_encodings
+from face_gallery import FaceGallery
+from replay_source import ReplayCapture
+
+SCENARIOS = ('matching', 'detect_yolo', 'detect_opencv', 'recognize', 'process_frame', 'end_to_end')
+ML_SCENARIOS = ('detect_yolo', 'detect_opencv', 'recognize', 'process_frame', 'end_to_end')
+GALLERY_SCENARIOS = ('matching', 'recognize', 'process_frame', 'end_to_end')
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (monotonic), or None if unavailable.
+    
+    Runs are isolated per scenario and gallery size, so this covers the current run only.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+def summarize(name, scenario, params, latencies, elapsed=None, frames=None):
+    """Result record from per-iteration latencies in seconds"""
+    latencies = np.asarray(latencies, dtype=np.float64) * 1000.0
+    if elapsed is None:
+        elapsed = latencies.sum() / 1000.0
+    frames = len(latencies) if frames is None else frames
+    return {
+        'name': name,
+        'scenario': scenario,
+        'params': params,
+        'iterations': int(len(latencies)),
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+        'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def time_calls(function, iterations, warmup=3):
+    """Latency of each call after a few untimed warm-up calls"""
+    for _ in range(warmup):
+        function()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def parse_resolution(text):
+    width, height = (int(v) for v in text.split('x'))
+    return width, height
+
+def synthetic_frames(resolution, count, rng):
+    """Noise frames with a few bright ellipses so detectors have something to look at"""
+    width, height = resolution
+    frames = []
+    for _ in range(count):
+        frame = rng.integers(0, 64, size=(height, width, 3), dtype=np.uint8)
+        for _ in range(3):
+            center = (int(rng.integers(width // 8, width - width // 8)), int(rng.integers(height // 8, height - height // 8)))
+            axes = (max(4, width // 16), max(6, height // 10))
+            cv2.ellipse(frame, center, axes, 0, 0, 360, (170, 190, 220), -1)
+        frames.append(frame)
+    return frames
+
+def recorded_frames(source, resolution, count):
+    """Up to count frames from a video file or frame directory, resized to the resolution"""
+    capture = ReplayCapture(source, speed=0)
+    frames = []
+    while len(frames) < count:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(frame, resolution, interpolation=cv2.INTER_AREA))
+    capture.release()
+    if not frames:
+        raise ValueError(f"No frames could be read from {source}")
+    return frames
+
+def face_boxes(resolution, faces):
+    """Evenly spaced (x, y, width, height) boxes, sized like faces a few metres from the camera"""
+    width, height = resolution
+    size = max(24, height // 6)
+    columns = max(1, width // (size * 2))
+    boxes = []
+    for i in range(faces):
+        row, column = divmod(i, columns)
+        boxes.append((column * size * 2 + size // 2, min(height - size, row * size * 2 + size // 2), size, size))
+    return boxes
+
+def synthetic_gallery(size, rng):
+    gallery = FaceGallery(initial_capacity=max(64, size))
+    gallery.add_many([f"faculty_{i}" for i in range(size)], make_encodings(size, rng))
+    return gallery
+
+def bench_matching(args, rng):
+    """Gallery search only: needs no ML dependencies"""
+    results = []
+    for size in args.gallery_sizes:
+        gallery = synthetic_gallery(size, rng)
+        for faces in args.faces:
+            probes = make_encodings(faces, rng)
+            latencies = time_calls(lambda: gallery.search(probes, 0.6, 3), args.iterations)
+            params = {'gallery_size': size, 'faces': faces}
+            results.append(summarize(f"matching/gallery={size}/faces={faces}", 'matching', params, latencies))
+    return results
+
+def bench_detection(args, ml_processor, frames_by_resolution, detector):
+    results = []
+    detect = ml_processor.detect_faces_yolo if detector == 'yolo' else ml_processor.detect_faces_opencv
+    if detector == 'yolo' and ml_processor.yolo_model is None:
+        return [{'name': 'detect_yolo', 'scenario': 'detect_yolo', 'skipped': "YOLO model not loaded"}]
+    if detector == 'opencv' and not hasattr(ml_processor, 'face_cascade'):
+        ml_processor.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        
+    for resolution, frames in frames_by_resolution.items():
+        cycle = iter(frames * (args.iterations // len(frames) + 4))
+        latencies = time_calls(lambda: detect(next(cycle)), args.iterations)
+        params = {'resolution': resolution}
+        results.append(summarize(f"detect_{detector}/{resolution}", f"detect_{detector}", params, latencies))
+    return results
+
+def bench_recognition(args, ml_processor, frames_by_resolution, rng):
+    results = []
+    for size in args.gallery_sizes:
+        ml_processor.gallery = synthetic_gallery(size, rng)
+        for resolution, frames in frames_by_resolution.items():
+            for faces in args.faces:
+                boxes = face_boxes(parse_resolution(resolution), faces)
+                latencies = time_calls(lambda: ml_processor.recognize_faces(frames[0], boxes), args.iterations)
+                params = {'gallery_size': size, 'faces': faces, 'resolution': resolution}
+                results.append(summarize(f"recognize/gallery={size}/faces={faces}/{resolution}",
+                                         'recognize', params, latencies))
+    return results
+
+def bench_process_frame(args, ml_processor, frames_by_resolution, rng):
+    results = []
+    for size in args.gallery_sizes:
+        ml_processor.gallery = synthetic_gallery(size, rng)
+        for resolution, frames in frames_by_resolution.items():
+            cycle = iter(frames * (args.iterations // len(frames) + 4))
+            latencies = time_calls(lambda: ml_processor.process_frame(next(cycle)), args.iterations)
+            params = {'gallery_size': size, 'resolution': resolution}
+            results.append(summarize(f"process_frame/gallery={size}/{resolution}", 'process_frame', params, latencies))
+    return results
+
+def bench_end_to_end(args, ml_processor, frames_by_resolution, rng, workdir):
+    """Replay frames through CameraMonitor, the staged pipeline and AlertSystem, losslessly"""
+    from alert_system import AlertSystem
+    from camera_monitor import CameraMonitor
+    from pipeline import MonitoringPipeline
+    
+    # Never touch the real alert history
+    alert_system = AlertSystem(os.path.join(workdir, 'alerts.jsonl'))
+    
+    results = []
+    for size in args.gallery_sizes:
+        ml_processor.gallery = synthetic_gallery(size, rng)
+        for resolution, frames in frames_by_resolution.items():
+            frame_dir = os.path.join(workdir, f"frames_{resolution}")
+            if not os.path.isdir(frame_dir):
+                os.makedirs(frame_dir)
+                for i, frame in enumerate(frames):
+                    cv2.imwrite(os.path.join(frame_dir, f"{i:06d}.png"), frame)
+                    
+            alert_system.clear_all_alerts()
+            alert_system.suppressor.reset()
+            latencies = []
+            
+            def sink(packet):
+                # Mirrors FacultyMonitoringApp.handle_detection's alert rule
+                for detection in packet['detections']:
+                    if detection['name'] == 'Unknown' or detection['confidence'] < 0.7:
+                        subject = detection.get('track_id')
+                        alert_system.raise_alert("Unknown Person", "Unknown person detected (benchmark)",
+                                                 camera="benchmark",
+                                                 subject=detection['name'] if subject is None else subject,
+                                                 auto_email=False)
+                latencies.append(packet['latency'])
+                
+            camera_monitor = CameraMonitor("benchmark", frame_dir)
+            camera_monitor.update_settings({'index': frame_dir, 'replay_speed': 0})
+            pipeline = MonitoringPipeline(None, ml_processor, sink, drop_policy='block')
+            pipeline.add_source("benchmark", camera_monitor)
+            pipeline.start()
+            
+            start = time.perf_counter()
+            camera_monitor.start_monitoring()
+            camera_monitor.wait_until_finished()
+            while len(latencies) < len(frames) and time.perf_counter() - start < 600:
+                time.sleep(0.01)
+            elapsed = time.perf_counter() - start
+            
+            pipeline.stop()
+            camera_monitor.stop_monitoring()
+            
+            params = {'gallery_size': size, 'resolution': resolution, 'frames': len(frames)}
+            result = summarize(f"end_to_end/gallery={size}/{resolution}", 'end_to_end', params,
+                               latencies, elapsed=elapsed, frames=len(latencies))
+            result['alerts'] = len(alert_system.alerts)
+            results.append(result)
+            
+    alert_system.close()
+    return results
+
+def format_rss(rss):
+    return "n/a" if rss is None else f"{rss:.1f}"
+
+def compare(results, baseline, tolerance):
+    """Flag runs whose p95 latency, peak RSS or throughput got worse by more than the tolerance"""
+    previous = {result['name']: result for result in baseline.get('results', []) if 'skipped' not in result}
+    regressions = []
+    
+    print(f"\n{'benchmark':<48} {'p95 ms':>16} {'fps':>18} {'RSS MB':>18}")
+    for result in results:
+        old = previous.get(result['name'])
+        if old is None or 'skipped' in result:
+            continue
+            
+        slower = result['p95_ms'] > old['p95_ms'] * (1.0 + tolerance)
+        fewer = result['fps'] < old['fps'] * (1.0 - tolerance)
+        # Baselines from other platforms (or without resource) carry no RSS to compare
+        old_rss, rss = old.get('peak_rss_mb'), result.get('peak_rss_mb')
+        larger = old_rss is not None and rss is not None and rss > old_rss * (1.0 + tolerance)
+        flag = "  REGRESSION" if slower or fewer or larger else ""
+        print(f"{result['name']:<48} {old['p95_ms']:>7.2f} -> {result['p95_ms']:<7.2f} "
+              f"{old['fps']:>8.1f} -> {result['fps']:<8.1f} "
+              f"{format_rss(old_rss):>8} -> {format_rss(rss):<8}{flag}")
+        if flag:
+            regressions.append(result['name'])
+            
+    return regressions
+
+def run_scenarios(args, scenarios):
+    """Run the scenarios in this process"""
+    rng = np.random.default_rng(args.seed)
+    
+    frames_by_resolution = {}
+    for resolution in args.resolutions:
+        size = parse_resolution(resolution)
+        if args.input:
+            frames_by_resolution[resolution] = recorded_frames(args.input, size, args.frames)
+        else:
+            frames_by_resolution[resolution] = synthetic_frames(size, args.frames, rng)
+            
+    ml_processor = None
+    ml_error = None
+    if any(scenario in ML_SCENARIOS for scenario in scenarios):
+        try:
+            from ml_processor import MLProcessor
+            # Every scenario swaps in a synthetic gallery; never touch the app's reference images
+            ml_processor = MLProcessor(load_gallery=False)
+        except Exception as e:
+            ml_error = f"MLProcessor unavailable: {e}"
+            print(ml_error)
+            
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    results = []
+    try:
+        for scenario in scenarios:
+            if scenario in ML_SCENARIOS and ml_processor is None:
+                results.append({'name': scenario, 'scenario': scenario, 'skipped': ml_error})
+            elif scenario == 'matching':
+                results.extend(bench_matching(args, rng))
+            elif scenario == 'detect_yolo':
+                results.extend(bench_detection(args, ml_processor, frames_by_resolution, 'yolo'))
+            elif scenario == 'detect_opencv':
+                results.extend(bench_detection(args, ml_processor, frames_by_resolution, 'opencv'))
+            elif scenario == 'recognize':
+                results.extend(bench_recognition(args, ml_processor, frames_by_resolution, rng))
+            elif scenario == 'process_frame':
+                results.extend(bench_process_frame(args, ml_processor, frames_by_resolution, rng))
+            elif scenario == 'end_to_end':
+                results.extend(bench_end_to_end(args, ml_processor, frames_by_resolution, rng, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def run_isolated(args, scenario, gallery_size, workdir):
+    """Run one scenario (at one gallery size) in a fresh interpreter, so ru_maxrss is its own peak"""
+    gallery_sizes = args.gallery_sizes if gallery_size is None else [gallery_size]
+    output = os.path.join(workdir, f"{scenario}_{gallery_size}.json")
+    command = [sys.executable, os.path.abspath(__file__), '--scenarios', scenario,
+               '--gallery-sizes', *map(str, gallery_sizes), '--faces', *map(str, args.faces),
+               '--resolutions', *args.resolutions, '--frames', str(args.frames),
+               '--iterations', str(args.iterations), '--seed', str(args.seed), '--scenario-output', output]
+    if args.input:
+        command += ['--input', args.input]
+        
+    completed = subprocess.run(command)
+    if completed.returncode != 0 or not os.path.exists(output):
+        return [{'name': scenario, 'scenario': scenario,
+                 'skipped': f"scenario process exited with code {completed.returncode}"}]
+    with open(output, 'r') as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the monitoring pipeline end to end")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--gallery-sizes', type=int, nargs='+', default=[10, 1000, 10000, 50000])
+    parser.add_argument('--faces', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--resolutions', nargs='+', default=['640x480', '1280x720'])
+    parser.add_argument('--input', help="recorded video file or frame directory (default: synthetic frames)")
+    parser.add_argument('--frames', type=int, default=60, help="frames per resolution")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="JSON results file")
+    parser.add_argument('--compare', default=None, help="baseline JSON to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    # Internal: run the given scenarios in this process and write their results here
+    parser.add_argument('--scenario-output', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.scenario_output:
+        results = run_scenarios(args, args.scenarios)
+        with open(args.scenario_output, 'w') as f:
+            json.dump(results, f)
+        return
+        
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_results_")
+    results = []
+    try:
+        for scenario in args.scenarios:
+            # Galleries of different sizes each get a process; detection does not use one
+            gallery_sizes = args.gallery_sizes if scenario in GALLERY_SCENARIOS else [None]
+            for gallery_size in gallery_sizes:
+                print(f"Running {scenario}" + ("..." if gallery_size is None else f" (gallery={gallery_size})..."))
+                for result in run_isolated(args, scenario, gallery_size, workdir):
+                    # A scenario that cannot run is skipped once, not once per gallery size
+                    if 'skipped' in result and any(previous['name'] == result['name'] for previous in results):
+                        continue
+                    results.append(result)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        
+    print(f"\n{'benchmark':<48} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'fps':>9} {'RSS MB':>8}")
+    for result in results:
+        if 'skipped' in result:
+            print(f"{result['name']:<48} skipped: {result['skipped']}")
+            continue
+        print(f"{result['name']:<48} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+              f"{result['fps']:>9.1f} {format_rss(result['peak_rss_mb']):>8}")
+              
+    if args.output:
+        report = {
+            'created_at': datetime.now().isoformat(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'input': args.input or 'synthetic',
+            'results': results
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+        
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance * 100:.0f}%")
+            sys.exit(1)
+        print("\nNo regressions")
+
+if __name__ == "__main__":
+    main()
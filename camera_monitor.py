@@ -4,18 +4,105 @@ import time
 from datetime import datetime
 import numpy as np
 
+from frame_ring import FrameRing
+from metrics import stage_metrics
+from replay_source import ReplayCapture, is_frame_directory
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is open-ended)
+TIMING_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100)
+
+def timing_histogram():
+    return [0] * (len(TIMING_BUCKETS_MS) + 1)
+
+def bucket_index(value_ms):
+    for i, bound in enumerate(TIMING_BUCKETS_MS):
+        if value_ms < bound:
+            return i
+    return len(TIMING_BUCKETS_MS)
+
+def histogram_labels(histogram):
+    """{'<1ms': n, ..., '>=100ms': n}"""
+    labels = [f"<{bound}ms" for bound in TIMING_BUCKETS_MS] + [f">={TIMING_BUCKETS_MS[-1]}ms"]
+    return dict(zip(labels, histogram))
+
+class CaptureStats:
+    """Measured capture rate, jitter against the target interval and read time, O(1) per frame"""
+    
+    def __init__(self, smoothing=0.1):
+        self.smoothing = smoothing
+        self.reset()
+        
+    def reset(self):
+        self.frames = 0
+        self.last_time = None
+        self.interval = None
+        self.jitter = None
+        self.read_time = None
+        self.late_frames = 0
+        self.drained_frames = 0
+        self.jitter_histogram = timing_histogram()
+        self.read_histogram = timing_histogram()
+        
+    def ewma(self, average, value):
+        return value if average is None else average + self.smoothing * (value - average)
+        
+    def record(self, now, read_duration, target_interval):
+        """Record one delivered frame"""
+        self.frames += 1
+        self.read_time = self.ewma(self.read_time, read_duration)
+        self.read_histogram[bucket_index(read_duration * 1000.0)] += 1
+        
+        if self.last_time is not None:
+            interval = now - self.last_time
+            jitter = abs(interval - target_interval)
+            self.interval = self.ewma(self.interval, interval)
+            self.jitter = self.ewma(self.jitter, jitter)
+            self.jitter_histogram[bucket_index(jitter * 1000.0)] += 1
+        self.last_time = now
+        
+    def get_stats(self, target_fps):
+        return {
+            'fps': (1.0 / self.interval) if self.interval else 0.0,
+            'target_fps': target_fps,
+            'frames': self.frames,
+            'jitter_ms': (self.jitter or 0.0) * 1000.0,
+            'read_ms': (self.read_time or 0.0) * 1000.0,
+            'late_frames': self.late_frames,
+            'drained_frames': self.drained_frames,
+            'jitter_histogram': histogram_labels(self.jitter_histogram),
+            'read_histogram': histogram_labels(self.read_histogram)
+        }
+
 class CameraMonitor:
-    def __init__(self):
+    def __init__(self, camera_id="PC Camera", source=0):
+        self.camera_id = camera_id
         self.camera = None
         self.monitoring = False
-        self.current_frame = None
         self.capture_thread = None
         self.frame_lock = threading.Lock()
+        self.frame_listeners = []
+        self.stop_listeners = []  # told when capture ends on its own (replay finished, read error)
         
-        # Default camera settings
-        self.camera_index = 0
+        # Default camera settings; the index may also be a video file path or stream URL
+        self.camera_index = source
         self.resolution = (640, 480)
         self.fps = 30
+        # Detection regions of interest as (x, y, width, height); empty = whole frame
+        self.regions = []
+        
+        # Frames are read in place into a preallocated ring and shared as read-only views
+        self.frame_buffers = 16  # the configured size
+        self.required_frame_buffers = 0  # what consumers (the pipeline) asked the ring to hold
+        self.frame_ring = FrameRing(self.frame_buffers)
+        
+        # Drain the driver's buffer each cycle and decode only the newest frame
+        self.latest_frame_only = False
+        self.max_drain = 8
+        self.capture_stats = CaptureStats()
+        
+        # Replay a recording instead of a live device (None = live; 1.0 native, 0 = as fast as possible)
+        self.replay_speed = None
+        self.replay_loop = False
         
     def initialize_camera(self):
         """Initialize the camera"""
@@ -24,8 +111,13 @@ class CameraMonitor:
             if self.camera is not None:
                 self.camera.release()
                 
-            # Initialize new camera
-            self.camera = cv2.VideoCapture(self.camera_index)
+            # Initialize new camera; frame directories and replay mode use a recording instead
+            if self.replay_speed is not None or is_frame_directory(self.camera_index):
+                self.camera = ReplayCapture(self.camera_index,
+                                            speed=1.0 if self.replay_speed is None else self.replay_speed,
+                                            loop=self.replay_loop)
+            else:
+                self.camera = cv2.VideoCapture(self.camera_index)
             
             if not self.camera.isOpened():
                 raise Exception(f"Cannot open camera {self.camera_index}")
@@ -41,6 +133,10 @@ class CameraMonitor:
             if not ret:
                 raise Exception("Cannot read from camera")
                 
+            # A replay must start from its first frame to be reproducible
+            if isinstance(self.camera, ReplayCapture):
+                self.camera.rewind()
+                
             print(f"Camera initialized successfully - Resolution: {width}x{height}, FPS: {self.fps}")
             return True
             
@@ -58,7 +154,8 @@ class CameraMonitor:
                 self.monitoring = True
                 
                 # Start capture thread
-                self.capture_thread = threading.Thread(target=self.capture_loop, daemon=True)
+                self.capture_thread = threading.Thread(target=self.capture_loop,
+                                                       name=f"capture-{self.camera_id}", daemon=True)
                 self.capture_thread.start()
                 
                 print("Camera monitoring started")
@@ -69,55 +166,164 @@ class CameraMonitor:
         return True
         
     def stop_monitoring(self):
-        """Stop camera monitoring"""
-        if self.monitoring:
-            self.monitoring = False
+        """Stop camera monitoring (also releases a camera whose capture already ended on its own)"""
+        was_monitoring = self.monitoring
+        self.monitoring = False
+        
+        # Wait for capture thread to finish
+        if self.capture_thread and self.capture_thread.is_alive() and \
+                self.capture_thread is not threading.current_thread():
+            self.capture_thread.join(timeout=2.0)
             
-            # Wait for capture thread to finish
-            if self.capture_thread and self.capture_thread.is_alive():
-                self.capture_thread.join(timeout=2.0)
-                
-            # Release camera
-            if self.camera is not None:
-                self.camera.release()
-                self.camera = None
-                
-            # Clear current frame
-            with self.frame_lock:
-                self.current_frame = None
-                
+        # Release camera
+        if self.camera is not None:
+            self.camera.release()
+            self.camera = None
+            
+        # Clear current frame
+        self.frame_ring.clear()
+        
+        if was_monitoring:
             print("Camera monitoring stopped")
             
     def capture_loop(self):
-        """Main capture loop"""
+        """Main capture loop, paced by per-frame deadlines rather than a fixed sleep"""
         frame_interval = 1.0 / self.fps if self.fps > 0 else 1.0 / 30
+        replay = self.camera if isinstance(self.camera, ReplayCapture) else None
+        if replay is not None:
+            frame_interval = replay.frame_interval
+        self.capture_stats.reset()
+        deadline = time.perf_counter()
         
         while self.monitoring and self.camera is not None:
             try:
-                ret, frame = self.camera.read()
+                read_start = time.perf_counter()
+                capture_started = stage_metrics.start()
                 
+                # Decode straight into the next ring slot; no per-frame allocation at steady state
+                buffer = self.frame_ring.next_buffer()
+                if self.latest_frame_only:
+                    ret, frame = self.read_latest(buffer, frame_interval)
+                elif buffer is not None:
+                    ret, frame = self.camera.read(buffer)
+                else:
+                    ret, frame = self.camera.read()
+                    
                 if ret and frame is not None:
-                    # Store frame thread-safely
+                    stage_metrics.observe('capture', capture_started)
+                    stage_metrics.increment('frames_captured_total')
+                    timestamp = time.time()
+                    now = time.perf_counter()
+                    self.capture_stats.record(now, now - read_start, frame_interval)
+                    frame, sequence = self.frame_ring.publish(frame, timestamp)
+                    
                     with self.frame_lock:
-                        self.current_frame = frame.copy()
+                        listeners = list(self.frame_listeners)
+                        
+                    # Push the read-only view to subscribers (e.g. the monitoring pipeline)
+                    for listener in listeners:
+                        listener(frame, timestamp, sequence)
+                elif replay is not None and replay.finished:
+                    print(f"Replay finished after {replay.position} frames")
+                    break
                 else:
                     print("Failed to read frame from camera")
                     
-                time.sleep(frame_interval)
+                if frame_interval <= 0:
+                    # Replay as fast as possible
+                    continue
+                    
+                # Sleep only for what is left of this frame's slot, so read time is not added on top
+                deadline += frame_interval
+                remaining = deadline - time.perf_counter()
+                if remaining > 0:
+                    time.sleep(remaining)
+                else:
+                    self.capture_stats.late_frames += 1
+                    if remaining < -frame_interval:
+                        # Too far behind to catch up: restart the schedule instead of bursting
+                        deadline = time.perf_counter()
                 
             except Exception as e:
                 print(f"Error in capture loop: {e}")
                 break
                 
+        # Ended by itself rather than by stop_monitoring(): stop reporting a live camera
+        if self.monitoring:
+            self.monitoring = False
+            with self.frame_lock:
+                listeners = list(self.stop_listeners)
+            for listener in listeners:
+                try:
+                    listener(self.camera_id)
+                except Exception as e:
+                    print(f"Error in camera stop listener: {e}")
+                    
         print("Capture loop ended")
         
+    def read_latest(self, buffer, frame_interval):
+        """Grab until a grab has to wait for the sensor (driver queue empty), then decode that frame"""
+        grabbed = 0
+        for _ in range(self.max_drain):
+            start = time.perf_counter()
+            if not self.camera.grab():
+                # Nothing decodable is left behind a failed grab
+                self.capture_stats.drained_frames += grabbed
+                return False, None
+            grabbed += 1
+            
+            # A queued frame is returned almost at once; a live one takes a good part of an interval
+            if time.perf_counter() - start > frame_interval / 4:
+                break
+                
+        self.capture_stats.drained_frames += grabbed - 1
+        if buffer is not None:
+            return self.camera.retrieve(buffer)
+        return self.camera.retrieve()
+        
+    def wait_until_finished(self, timeout=None):
+        """Block until the capture thread ends, e.g. when a replay runs out of frames"""
+        if self.capture_thread is not None:
+            self.capture_thread.join(timeout)
+        return self.capture_thread is None or not self.capture_thread.is_alive()
+        
+    def ensure_frame_buffers(self, slots):
+        """Grow the frame ring to at least slots buffers (safe while capturing); True if it grew"""
+        self.required_frame_buffers = max(self.required_frame_buffers, slots)
+        return self.frame_ring.ensure_slots(slots)
+        
     def get_current_frame(self):
-        """Get the current frame thread-safely"""
+        """Get a read-only view of the newest frame; copy it to modify or keep it"""
+        return self.frame_ring.latest()[0]
+        
+    def get_latest_frame(self):
+        """Get (read-only frame view, timestamp, sequence) of the newest frame"""
+        return self.frame_ring.latest()
+        
+    def add_frame_listener(self, listener):
+        """Register a callback(frame, timestamp, sequence) invoked for every captured frame"""
         with self.frame_lock:
-            if self.current_frame is not None:
-                return self.current_frame.copy()
-            return None
-            
+            if listener not in self.frame_listeners:
+                self.frame_listeners.append(listener)
+                
+    def remove_frame_listener(self, listener):
+        """Unregister a frame callback"""
+        with self.frame_lock:
+            if listener in self.frame_listeners:
+                self.frame_listeners.remove(listener)
+                
+    def add_stop_listener(self, listener):
+        """Register a callback(camera_id) invoked when capture ends without stop_monitoring()"""
+        with self.frame_lock:
+            if listener not in self.stop_listeners:
+                self.stop_listeners.append(listener)
+                
+    def remove_stop_listener(self, listener):
+        """Unregister a stop callback"""
+        with self.frame_lock:
+            if listener in self.stop_listeners:
+                self.stop_listeners.remove(listener)
+                
     def is_monitoring(self):
         """Check if monitoring is active"""
         return self.monitoring
@@ -129,18 +335,29 @@ class CameraMonitor:
             height = int(self.camera.get(cv2.CAP_PROP_FRAME_HEIGHT))
             fps = int(self.camera.get(cv2.CAP_PROP_FPS))
             
-            return {
+            info = {
+                'id': self.camera_id,
                 'index': self.camera_index,
                 'resolution': f"{width}x{height}",
                 'fps': fps,
-                'status': 'active'
+                'status': 'active' if self.monitoring else 'inactive',
+                'latest_frame_only': self.latest_frame_only,
+                'capture': self.capture_stats.get_stats(self.fps),
+                'frame_ring': self.frame_ring.get_stats()
             }
+            if isinstance(self.camera, ReplayCapture):
+                info['replay'] = self.camera.get_stats()
+            return info
         else:
             return {
+                'id': self.camera_id,
                 'index': self.camera_index,
                 'resolution': f"{self.resolution[0]}x{self.resolution[1]}",
                 'fps': self.fps,
-                'status': 'inactive'
+                'status': 'inactive',
+                'latest_frame_only': self.latest_frame_only,
+                'capture': self.capture_stats.get_stats(self.fps),
+                'frame_ring': self.frame_ring.get_stats()
             }
             
     def update_settings(self, settings):
@@ -154,7 +371,24 @@ class CameraMonitor:
             self.resolution = (width, height)
             
             self.fps = settings.get('fps', 30)
+            self.regions = [tuple(region) for region in settings.get('regions', self.regions)]
             
+            self.latest_frame_only = settings.get('latest_frame_only', self.latest_frame_only)
+            self.replay_speed = settings.get('replay_speed', self.replay_speed)
+            self.replay_loop = settings.get('replay_loop', self.replay_loop)
+            
+            frame_buffers = settings.get('frame_buffers', self.frame_buffers)
+            if frame_buffers != self.frame_buffers:
+                # Only a changed setting resizes the ring, and never below what consumers required
+                self.frame_buffers = frame_buffers
+                slots = max(frame_buffers, self.required_frame_buffers)
+                if slots > self.frame_ring.slot_count:
+                    self.frame_ring.ensure_slots(slots)
+                elif slots < self.frame_ring.slot_count:
+                    # Pinned frames keep their arrays, and their holders release them on the old ring
+                    self.frame_ring = FrameRing(slots)
+                    
+                    
             # If monitoring is active, restart with new settings
             if self.monitoring:
                 self.stop_monitoring()
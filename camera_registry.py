@@ -0,0 +1,125 @@
+import threading
+
+from camera_monitor import CameraMonitor
+
+class CameraRegistry:
+    def __init__(self):
+        self.cameras = {}
+        self.lock = threading.Lock()
+        self.stop_listeners = []
+        
+    def add_camera(self, camera_id, settings):
+        """Create a CameraMonitor for a device index, video file, stream URL or frame directory"""
+        with self.lock:
+            if camera_id in self.cameras:
+                raise ValueError(f"Camera already registered: {camera_id}")
+                
+            source = settings.get('source', settings.get('index', 0))
+            camera_monitor = CameraMonitor(camera_id=camera_id, source=source)
+            camera_monitor.update_settings({
+                'index': source,
+                'resolution': settings.get('resolution', '640x480'),
+                'fps': settings.get('fps', 30),
+                'regions': settings.get('regions', []),
+                'frame_buffers': settings.get('frame_buffers', 16),
+                'latest_frame_only': settings.get('latest_frame_only', False),
+                'replay_speed': settings.get('replay_speed'),
+                'replay_loop': settings.get('replay_loop', False)
+            })
+            camera_monitor.add_stop_listener(self.on_camera_stopped)
+            self.cameras[camera_id] = camera_monitor
+            
+        print(f"Camera registered: {camera_id} ({source})")
+        return camera_monitor
+        
+    def remove_camera(self, camera_id):
+        """Stop and forget a camera"""
+        with self.lock:
+            camera_monitor = self.cameras.pop(camera_id, None)
+            
+        if camera_monitor is None:
+            return False
+            
+        camera_monitor.stop_monitoring()
+        print(f"Camera removed: {camera_id}")
+        return True
+        
+    def add_stop_listener(self, listener):
+        """Register a callback(camera_id) for cameras whose capture ends on its own, e.g. a finished replay"""
+        if listener not in self.stop_listeners:
+            self.stop_listeners.append(listener)
+            
+    def on_camera_stopped(self, camera_id):
+        """Capture thread: a camera stopped without being asked to"""
+        print(f"Camera {camera_id} stopped capturing")
+        for listener in list(self.stop_listeners):
+            listener(camera_id)
+            
+    def get_camera(self, camera_id):
+        """Get a camera by id"""
+        with self.lock:
+            return self.cameras.get(camera_id)
+            
+    def get_primary_camera(self):
+        """The first registered camera (the one the settings tab edits)"""
+        with self.lock:
+            return next(iter(self.cameras.values()), None)
+            
+    def get_cameras(self):
+        """Get {camera_id: CameraMonitor} for all registered cameras"""
+        with self.lock:
+            return dict(self.cameras)
+            
+    def load_from_config(self, config):
+        """Register the configured cameras, or the single 'camera' section if none are listed"""
+        cameras = config.get_config('cameras')
+        if not cameras:
+            cameras = [dict(config.get_config('camera'), id="PC Camera")]
+            
+        for camera_settings in cameras:
+            try:
+                camera_id = camera_settings.get('id') or f"camera_{len(self.cameras)}"
+                self.add_camera(camera_id, camera_settings)
+            except Exception as e:
+                print(f"Error registering camera: {e}")
+                
+        return len(self.cameras)
+        
+    def start_all(self):
+        """Start every camera, each on its own capture thread; returns how many started"""
+        started = 0
+        for camera_id, camera_monitor in self.get_cameras().items():
+            if camera_monitor.start_monitoring():
+                started += 1
+            else:
+                print(f"Camera {camera_id} failed to start")
+        return started
+        
+    def stop_all(self):
+        """Stop every camera"""
+        for camera_monitor in self.get_cameras().values():
+            camera_monitor.stop_monitoring()
+            
+    def get_active_count(self):
+        """Number of cameras currently capturing"""
+        return sum(1 for camera_monitor in self.get_cameras().values() if camera_monitor.is_monitoring())
+        
+    def get_camera_stats(self, pipeline=None):
+        """Per-camera status, measured capture FPS and jitter, and detection backlog"""
+        capture_stats = {}
+        if pipeline is not None:
+            capture_stats = pipeline.get_stats()['capture']['sources']
+            
+        stats = {}
+        for camera_id, camera_monitor in self.get_cameras().items():
+            source_stats = capture_stats.get(camera_id, {})
+            timing = camera_monitor.capture_stats.get_stats(camera_monitor.fps)
+            stats[camera_id] = {
+                'source': camera_monitor.camera_index,
+                'status': 'active' if camera_monitor.is_monitoring() else 'inactive',
+                'fps': timing['fps'],
+                'jitter_ms': timing['jitter_ms'],
+                'backlog': source_stats.get('backlog', 0),
+                'dropped': source_stats.get('dropped', 0)
+            }
+        return stats
@@ -8,18 +8,91 @@ class Config:
             'camera': {
                 'index': 0,
                 'resolution': '640x480',
-                'fps': 30
+                'fps': 30,
+                'regions': [],  # detection regions of interest, e.g. a doorway: [[x, y, width, height]]
+                'frame_buffers': 16,  # ring slots; raised at pipeline start to cover the frames it can hold in flight
+                'latest_frame_only': False,  # live cameras: drain the driver buffer, decode only the newest frame
+                'replay_speed': None,  # replay a video/frame directory: 1.0 = native rate, 0 = as fast as possible
+                'replay_loop': False
             },
             'detection': {
                 'confidence_threshold': 0.8,
                 'nms_threshold': 0.4,
-                'face_detection_model': 'yolov8n-face.pt'
+                'face_detection_model': 'yolov8n-face.pt',
+                'detection_width': 0,  # run the detector on a copy this wide (0 = full resolution)
+                'recognition_tolerance': 0.6,
+                'top_k_candidates': 3,
+                'gallery_index': 'exact',  # 'exact' or 'ivf'
+                'ivf_nlist': 0,  # 0 = sqrt(gallery size)
+                'ivf_nprobe': 8,  # more lists probed = higher recall, higher latency
+                'ivf_min_gallery_size': 1000,
+                'enrollment_workers': 0  # 0 = all cores
+            },
+            # Extra streams: [{'id': 'Corridor 1', 'source': 'rtsp://...' or 0, 'resolution': '640x480', 'fps': 15,
+            #                  'regions': [[x, y, width, height]]}].
+            # When empty, the single 'camera' section above is used.
+            'cameras': [],
+            'pipeline': {
+                'queue_size': 2,
+                'drop_policy': 'drop_oldest',  # 'drop_oldest', 'latest_only' or 'block' (lossless, for replays)
+                'detection_batch_size': 1,  # > 1 batches YOLO calls across frames and cameras
+                'detection_batch_wait_ms': 10,
+                'inference_workers': 0,  # > 0 runs detection and face encoding in that many processes (matching stays here)
+                'worker_slots': 2  # shared-memory frame slots per worker process
+            },
+            'motion': {
+                'enabled': True,
+                'motion_threshold': 0.01,  # fraction of changed pixels that triggers detection
+                'pixel_threshold': 25,
+                'max_skip_seconds': 2.0,  # run detection at least this often on a static scene
+                'downscale_width': 160
+            },
+            'tracking': {
+                'enabled': True,
+                'iou_threshold': 0.3,
+                'max_missed_frames': 10,
+                'min_confidence': 0.5,  # below this a track's identity is treated as uncertain
+                'low_confidence_retry_seconds': 0.5,
+                'reverify_seconds': 5.0
+            },
+            'detection_schedule': {
+                'enabled': False,  # run the detector every N frames, track with optical flow in between
+                'detect_every_n_frames': 3,
+                'adaptive': True,  # raise N when the detector cannot keep up with the cameras
+                'max_interval': 15,
+                'target_utilization': 0.8
+            },
+            'metrics': {
+                'enabled': False,  # per-stage latency histograms; off costs one flag check per stage
+                'http_enabled': False,  # serve /metrics in Prometheus text format
+                'host': '127.0.0.1',
+                'port': 9108
+            },
+            'alerts': {
+                'enabled': True,  # fold repeats of one (type, camera, track/identity) into a single alert
+                'dedup_window_seconds': 60.0,  # repeats closer together than this join the open alert
+                'rate_limit_per_minute': 1.0,  # new alerts per key once the window has lapsed
+                'rate_limit_burst': 3,
+                'repeat_persist_seconds': 5.0  # how often a growing repeat count is written to the log
             },
             'email': {
                 'smtp_server': 'smtp.gmail.com',
                 'smtp_port': 587,
                 'email': '',
-                'password': ''
+                'password': '',
+                'use_tls': True,
+                'digest_window_seconds': 10.0,  # alerts queued within this window go out as one email
+                'max_digest': 20
+            },
+            'presence': {
+                'enter_hits': 3,  # confident recognitions needed within enter_window_seconds to mark someone present
+                'enter_window_seconds': 2.0,
+                'exit_after_seconds': 30.0,  # unseen this long before someone is marked absent
+                'min_confidence': 0.6,
+                'alert_on_transitions': True  # raise a low-priority alert on each arrival and departure
+            },
+            'persistence': {
+                'faculty_write_interval_seconds': 2.0  # faculty changes are batched into one write per interval
             },
             'system': {
                 'auto_start_monitoring': False,
@@ -67,7 +140,9 @@ class Config:
             
     def merge_configs(self, default, loaded):
         """Merge loaded config with default config"""
-        merged = default.copy()
+        # Copy nested sections so merging never mutates the defaults
+        merged = {key: value.copy() if isinstance(value, dict) else value
+                  for key, value in default.items()}
         
         for key, value in loaded.items():
             if key in merged and isinstance(merged[key], dict) and isinstance(value, dict):
@@ -100,7 +175,8 @@ class Config:
     def save_settings(self, settings):
         """Save all settings"""
         try:
-            self.config.update(settings)
+            # Merge per section so keys not exposed in the GUI are preserved
+            self.config = self.merge_configs(self.config, settings)
             self.save_config()
             return True
             
@@ -0,0 +1,82 @@
+import math
+
+class DetectionScheduler:
+    """Decides per frame whether to run the detector or let the tracker propagate boxes"""
+    
+    def __init__(self, detect_every=3, adaptive=True, max_interval=15, target_utilization=0.8):
+        # Run the detector at least every N frames per source
+        self.detect_every = detect_every
+        # Stretch N so the detector can keep up with the incoming frame rate
+        self.adaptive = adaptive
+        self.max_interval = max_interval
+        # Fraction of the detector's time budget the schedule may use
+        self.target_utilization = target_utilization
+        
+        # source_id -> counters; each source is fed by one camera thread
+        self.states = {}
+        self.interval = detect_every
+        
+    def update_settings(self, settings):
+        """Update scheduling settings"""
+        self.detect_every = max(1, int(settings.get('detect_every_n_frames', 3)))
+        self.adaptive = settings.get('adaptive', True)
+        self.max_interval = max(self.detect_every, int(settings.get('max_interval', 15)))
+        self.target_utilization = settings.get('target_utilization', 0.8)
+        self.interval = self.detect_every
+        
+    def compute_interval(self, detector_latency, input_fps):
+        """Frames per detection so that detector_latency * input_fps / N stays under the target"""
+        if not self.adaptive or not detector_latency or not input_fps:
+            return self.detect_every
+            
+        needed = math.ceil(detector_latency * input_fps / max(0.05, self.target_utilization))
+        return max(self.detect_every, min(self.max_interval, needed))
+        
+    def should_detect(self, source_id, detector_latency=None, input_fps=None):
+        """True if this frame should go to the detector rather than the tracker"""
+        state = self.states.get(source_id)
+        if state is None:
+            state = self.states[source_id] = {
+                'since_detection': 0,
+                'requested': True,
+                'detected': 0,
+                'propagated': 0
+            }
+            
+        self.interval = self.compute_interval(detector_latency, input_fps)
+        
+        if state['requested'] or state['since_detection'] + 1 >= self.interval:
+            state['requested'] = False
+            state['since_detection'] = 0
+            state['detected'] += 1
+            return True
+            
+        state['since_detection'] += 1
+        state['propagated'] += 1
+        return False
+        
+    def request_detection(self, source_id):
+        """Run the detector on the source's next frame (tracking lost or identity uncertain)"""
+        state = self.states.get(source_id)
+        if state is not None:
+            state['requested'] = True
+            
+    def remove_source(self, source_id):
+        """Forget a source's schedule"""
+        self.states.pop(source_id, None)
+        
+    def get_stats(self):
+        """Current interval and detected versus propagated frames"""
+        detected = 0
+        propagated = 0
+        for state in list(self.states.values()):
+            detected += state['detected']
+            propagated += state['propagated']
+            
+        total = detected + propagated
+        return {
+            'interval': self.interval,
+            'detected': detected,
+            'propagated': propagated,
+            'propagated_ratio': propagated / total if total else 0.0
+        }
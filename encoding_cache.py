@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+class EncodingCache:
+    def __init__(self, reference_dir="reference_images", encoding_size=128):
+        self.reference_dir = reference_dir
+        self.encoding_size = encoding_size
+        self.matrix_file = os.path.join(reference_dir, "gallery_cache.npy")
+        self.metadata_file = os.path.join(reference_dir, "gallery_cache.json")
+        
+        # filename -> {'name', 'sha1', 'mtime', 'size', 'encoding'}; encoding is None when no face was found
+        self.entries = {}
+        self.dirty = False
+        
+    def load(self):
+        """Load the consolidated encoding matrix and its metadata sidecar"""
+        self.entries = {}
+        self.dirty = False
+        
+        try:
+            if not os.path.exists(self.matrix_file) or not os.path.exists(self.metadata_file):
+                return 0
+                
+            with open(self.metadata_file, 'r') as f:
+                metadata = json.load(f)
+                
+            if metadata.get('encoding_size') != self.encoding_size:
+                print("Encoding cache has a different encoding size, ignoring it")
+                return 0
+                
+            # Map the gallery and copy out only the rows the metadata lists. Entries end up in
+            # MLProcessor.reference_encodings, so they must not be views: a live mapping would keep
+            # save() from replacing the file on Windows
+            matrix = np.load(self.matrix_file, mmap_mode='r')
+            
+            for entry in metadata.get('entries', []):
+                row = entry.get('row', -1)
+                encoding = np.array(matrix[row]) if row >= 0 else None
+                self.entries[entry['filename']] = {
+                    'name': entry['name'],
+                    'sha1': entry['sha1'],
+                    'mtime': entry['mtime'],
+                    'size': entry['size'],
+                    'encoding': encoding
+                }
+            del matrix
+            
+            print(f"Loaded encoding cache with {len(self.entries)} entries")
+            return len(self.entries)
+            
+        except Exception as e:
+            print(f"Error loading encoding cache: {e}")
+            self.entries = {}
+            return 0
+            
+    def save(self):
+        """Write the matrix and sidecar atomically (temp file + rename)"""
+        try:
+            os.makedirs(self.reference_dir, exist_ok=True)
+            
+            filenames = sorted(self.entries)
+            encoded = [filename for filename in filenames if self.entries[filename]['encoding'] is not None]
+            rows = {filename: row for row, filename in enumerate(encoded)}
+            
+            matrix = np.zeros((len(encoded), self.encoding_size), dtype=np.float32)
+            for filename, row in rows.items():
+                matrix[row] = self.entries[filename]['encoding']
+                
+            metadata_entries = []
+            for filename in filenames:
+                entry = self.entries[filename]
+                metadata_entries.append({
+                    'filename': filename,
+                    'name': entry['name'],
+                    'sha1': entry['sha1'],
+                    'mtime': entry['mtime'],
+                    'size': entry['size'],
+                    'row': rows.get(filename, -1)
+                })
+                
+            temp_matrix = self.matrix_file + ".tmp.npy"
+            with open(temp_matrix, 'wb') as f:
+                np.save(f, matrix)
+            temp_metadata = self.metadata_file + ".tmp"
+            with open(temp_metadata, 'w') as f:
+                json.dump({
+                    'version': 1,
+                    'encoding_size': self.encoding_size,
+                    'entries': metadata_entries
+                }, f)
+                
+            os.replace(temp_matrix, self.matrix_file)
+            os.replace(temp_metadata, self.metadata_file)
+            self.dirty = False
+            return True
+            
+        except Exception as e:
+            print(f"Error saving encoding cache: {e}")
+            return False
+            
+    def file_signature(self, image_path):
+        """Get (mtime, size) for an image file"""
+        stat = os.stat(image_path)
+        return stat.st_mtime, stat.st_size
+        
+    def file_hash(self, image_path):
+        """SHA-1 of the image file contents"""
+        digest = hashlib.sha1()
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+        
+    def lookup(self, filename, image_path):
+        """Return the cached entry for an image if it is unchanged, else None"""
+        entry = self.entries.get(filename)
+        if entry is None:
+            return None
+            
+        mtime, size = self.file_signature(image_path)
+        if entry['mtime'] == mtime and entry['size'] == size:
+            return entry
+            
+        # Touched but possibly unchanged: fall back to the content hash
+        if entry['size'] == size and entry['sha1'] == self.file_hash(image_path):
+            entry['mtime'] = mtime
+            self.dirty = True
+            return entry
+            
+        return None
+        
+    def update(self, filename, name, image_path, encoding):
+        """Record the encoding (or None for no face) for an image"""
+        mtime, size = self.file_signature(image_path)
+        self.entries[filename] = {
+            'name': name,
+            'sha1': self.file_hash(image_path),
+            'mtime': mtime,
+            'size': size,
+            'encoding': None if encoding is None else np.asarray(encoding, dtype=np.float32)
+        }
+        self.dirty = True
+        
+    def remove(self, filename):
+        """Forget an image"""
+        if self.entries.pop(filename, None) is None:
+            return False
+        self.dirty = True
+        return True
+        
+    def prune(self, filenames):
+        """Drop entries for images that no longer exist"""
+        stale = [filename for filename in self.entries if filename not in filenames]
+        for filename in stale:
+            del self.entries[filename]
+        if stale:
+            self.dirty = True
+        return len(stale)
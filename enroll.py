@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Faculty Presence Monitoring & Alert System
+Headless bulk enrollment of reference images
+"""
+
+import argparse
+import sys
+
+def main():
+    """Enroll every image in a directory into the reference gallery cache"""
+    parser = argparse.ArgumentParser(
+        description="Encode a directory of staff photos into the reference gallery. "
+                    "Each image is enrolled under its file name (without extension)."
+    )
+    parser.add_argument('source_dir', help="Directory containing .jpg/.jpeg/.png/.bmp photos")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Worker processes (default: all cores)")
+    parser.add_argument('--reference-dir', default="reference_images",
+                        help="Reference image directory used by the application")
+    args = parser.parse_args()
+    
+    try:
+        from encoding_cache import EncodingCache
+        from enrollment import collect_images, copy_into_reference_dir, enroll_images, print_progress, resolve_workers
+    except ImportError as e:
+        print(f"Missing required package: {e}")
+        sys.exit(1)
+        
+    images = collect_images(args.source_dir)
+    if not images:
+        print(f"No images found in {args.source_dir}")
+        return
+        
+    cache = EncodingCache(args.reference_dir)
+    cache.load()
+    
+    items = copy_into_reference_dir(images, args.reference_dir)
+    print(f"Enrolling {len(items)} images with {resolve_workers(args.workers)} workers...")
+    
+    summary = enroll_images(cache, items, args.workers, print_progress)
+    cache.save()
+    
+    print(f"Enrolled: {len(summary['enrolled'])}, "
+          f"no face found: {len(summary['no_face'])}, "
+          f"failed: {len(summary['failed'])}")
+          
+    for faculty_name in summary['no_face']:
+        print(f"  no face: {faculty_name}")
+    for faculty_name, error in summary['failed'].items():
+        print(f"  failed: {faculty_name} - {error}")
+        
+    if summary['failed']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
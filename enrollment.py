@@ -0,0 +1,120 @@
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import face_recognition
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def encode_reference_image(image_path):
+    """Compute the face encoding of the first face in an image, or None"""
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"Failed to load image: {image_path}")
+        
+    # Convert BGR to RGB for face_recognition
+    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    
+    face_encodings = face_recognition.face_encodings(rgb_image)
+    if len(face_encodings) == 0:
+        return None
+        
+    # Use the first face found
+    return face_encodings[0]
+
+def encode_image_task(image_path):
+    """Worker entry point: never raises, so one bad image cannot sink the batch"""
+    try:
+        return image_path, encode_reference_image(image_path), None
+    except Exception as e:
+        return image_path, None, str(e)
+
+def resolve_workers(workers):
+    """Number of worker processes to use (0 or None = all cores)"""
+    if not workers:
+        workers = os.cpu_count() or 1
+    return max(1, int(workers))
+
+def encode_images(image_paths, workers=None, progress_callback=None):
+    """Encode images across a process pool; returns {path: (encoding, error)}"""
+    image_paths = list(image_paths)
+    total = len(image_paths)
+    results = {}
+    if total == 0:
+        return results
+        
+    workers = min(resolve_workers(workers), total)
+    
+    def record(image_path, encoding, error):
+        results[image_path] = (encoding, error)
+        if progress_callback is not None:
+            progress_callback(len(results), total, image_path, encoding, error)
+            
+    if workers == 1:
+        for image_path in image_paths:
+            record(*encode_image_task(image_path))
+        return results
+        
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(encode_image_task, image_path) for image_path in image_paths]
+        for future in as_completed(futures):
+            record(*future.result())
+            
+    return results
+
+def enroll_images(encoding_cache, items, workers=None, progress_callback=None):
+    """Encode (filename, faculty_name, image_path) items in parallel and record them in the cache"""
+    items = list(items)
+    encoded = encode_images([image_path for _, _, image_path in items], workers, progress_callback)
+    
+    summary = {'enrolled': {}, 'no_face': [], 'failed': {}}
+    
+    for filename, faculty_name, image_path in items:
+        encoding, error = encoded.get(image_path, (None, "not processed"))
+        
+        if error is not None:
+            # Not cached, so a fixed image is retried on the next run
+            summary['failed'][faculty_name] = error
+            continue
+            
+        encoding_cache.update(filename, faculty_name, image_path, encoding)
+        if encoding is None:
+            summary['no_face'].append(faculty_name)
+        else:
+            summary['enrolled'][faculty_name] = encoding
+            
+    return summary
+
+def collect_images(source_dir):
+    """List (faculty_name, path) for every image in a directory"""
+    images = []
+    for filename in sorted(os.listdir(source_dir)):
+        if filename.lower().endswith(IMAGE_EXTENSIONS):
+            images.append((os.path.splitext(filename)[0], os.path.join(source_dir, filename)))
+    return images
+
+def copy_into_reference_dir(images, reference_dir):
+    """Copy (faculty_name, path) images into the reference directory as enrollment items"""
+    os.makedirs(reference_dir, exist_ok=True)
+    
+    items = []
+    for faculty_name, image_path in images:
+        filename = faculty_name + os.path.splitext(image_path)[1].lower()
+        target_path = os.path.join(reference_dir, filename)
+        if os.path.abspath(image_path) != os.path.abspath(target_path):
+            shutil.copy2(image_path, target_path)
+        items.append((filename, faculty_name, target_path))
+        
+    return items
+
+def print_progress(completed, total, image_path, encoding, error):
+    """Default progress reporter for bulk enrollment"""
+    name = os.path.basename(image_path)
+    if error is not None:
+        status = f"failed: {error}"
+    elif encoding is None:
+        status = "no face found"
+    else:
+        status = "ok"
+    print(f"[{completed}/{total}] {name}: {status}")
@@ -0,0 +1,372 @@
+import threading
+
+import numpy as np
+
+class FaceGallery:
+    """Reference encodings in one contiguous matrix, shared by enrollment and matching threads.
+    
+    Every public method holds the (reentrant: the IVF index calls back in) lock, so a search
+    never pairs a regrown matrix with stale norms or size.
+    """
+    
+    def __init__(self, encoding_size=128, initial_capacity=64):
+        self.encoding_size = encoding_size
+        self.names = []
+        self.name_to_index = {}
+        
+        # Contiguous storage, grown by doubling; only the first `size` rows are valid
+        self.encodings = np.zeros((initial_capacity, encoding_size), dtype=np.float32)
+        self.squared_norms = np.zeros(initial_capacity, dtype=np.float32)
+        self.size = 0
+        
+        # Optional search index kept in sync with row changes (None = exact scan)
+        self.index = None
+        self.lock = threading.RLock()
+        
+    def __len__(self):
+        return self.size
+        
+    def __contains__(self, name):
+        with self.lock:
+            return name in self.name_to_index
+            
+    def ensure_capacity(self, capacity):
+        """Grow the encoding matrix so it can hold at least `capacity` rows"""
+        current = self.encodings.shape[0]
+        if capacity <= current:
+            return
+            
+        new_capacity = max(capacity, current * 2)
+        encodings = np.zeros((new_capacity, self.encoding_size), dtype=np.float32)
+        squared_norms = np.zeros(new_capacity, dtype=np.float32)
+        encodings[:self.size] = self.encodings[:self.size]
+        squared_norms[:self.size] = self.squared_norms[:self.size]
+        
+        self.encodings = encodings
+        self.squared_norms = squared_norms
+        
+    def add(self, name, encoding):
+        """Add or replace the reference encoding for a name"""
+        with self.lock:
+            encoding = np.asarray(encoding, dtype=np.float32).reshape(self.encoding_size)
+            
+            index = self.name_to_index.get(name)
+            if index is None:
+                self.ensure_capacity(self.size + 1)
+                index = self.size
+                self.size += 1
+                self.names.append(name)
+                self.name_to_index[name] = index
+                
+            self.encodings[index] = encoding
+            self.squared_norms[index] = np.dot(encoding, encoding)
+            
+            if self.index is not None:
+                self.index.row_updated(index)
+            return index
+            
+    def add_many(self, names, encodings):
+        """Add or replace many reference encodings at once"""
+        with self.lock:
+            encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, self.encoding_size)
+            
+            index_active = self.index is not None and self.index.is_trained()
+            fresh = (not index_active and len(set(names)) == len(names)
+                     and not any(name in self.name_to_index for name in names))
+            if not fresh:
+                for name, encoding in zip(names, encodings):
+                    self.add(name, encoding)
+                return
+                
+            # Fast path for bulk loading: one block copy instead of per-row writes
+            start = self.size
+            end = start + len(names)
+            self.ensure_capacity(end)
+            self.encodings[start:end] = encodings
+            self.squared_norms[start:end] = np.einsum('ij,ij->i', encodings, encodings)
+            for offset, name in enumerate(names):
+                self.names.append(name)
+                self.name_to_index[name] = start + offset
+            self.size = end
+            
+    def remove(self, name):
+        """Remove a name, moving the last row into its slot"""
+        with self.lock:
+            index = self.name_to_index.pop(name, None)
+            if index is None:
+                return False
+                
+            last = self.size - 1
+            if self.index is not None:
+                self.index.row_removed(index, last)
+                
+            if index != last:
+                last_name = self.names[last]
+                self.encodings[index] = self.encodings[last]
+                self.squared_norms[index] = self.squared_norms[last]
+                self.names[index] = last_name
+                self.name_to_index[last_name] = index
+                
+            self.names.pop()
+            self.size = last
+            return True
+            
+    def clear(self):
+        """Remove all reference encodings"""
+        with self.lock:
+            self.names = []
+            self.name_to_index = {}
+            self.size = 0
+            
+            if self.index is not None:
+                self.index.reset()
+                
+    def configure_index(self, index_type='exact', **options):
+        """Select the search backend used by search()"""
+        with self.lock:
+            if index_type == 'exact':
+                self.index = None
+            elif index_type == 'ivf':
+                self.index = IVFIndex(self, **options)
+            else:
+                raise ValueError(f"Unknown gallery index type: {index_type}")
+                
+    def get_encoding(self, name):
+        """Get the stored encoding for a name"""
+        with self.lock:
+            index = self.name_to_index.get(name)
+            if index is None:
+                return None
+            return self.encodings[index].copy()
+            
+    def distances(self, probe_encodings):
+        """Euclidean distances from every probe to every reference (P x N)"""
+        probes = np.asarray(probe_encodings, dtype=np.float32).reshape(-1, self.encoding_size)
+        with self.lock:
+            gallery = self.encodings[:self.size]
+            
+            # ||p - g||^2 = ||p||^2 + ||g||^2 - 2 p.g, with one matrix product for the whole batch
+            probe_norms = np.einsum('ij,ij->i', probes, probes)
+            squared = probe_norms[:, None] + self.squared_norms[:self.size][None, :] - 2.0 * (probes @ gallery.T)
+        np.maximum(squared, 0.0, out=squared)
+        return np.sqrt(squared, out=squared)
+        
+    def match(self, probe_encodings, tolerance=0.6, top_k=3):
+        """Match probes against the gallery, returning the best match and top-k candidates per probe"""
+        with self.lock:
+            probes = np.asarray(probe_encodings, dtype=np.float32).reshape(-1, self.encoding_size)
+            if len(probes) == 0:
+                return []
+                
+            if self.size == 0:
+                return [self.build_result([], tolerance) for _ in range(len(probes))]
+                
+            distances = self.distances(probes)
+            return self.select_top_k(distances, np.arange(self.size), tolerance, top_k)
+            
+    def search(self, probe_encodings, tolerance=0.6, top_k=3):
+        """Match probes using the configured index, falling back to an exact scan"""
+        with self.lock:
+            if self.index is None:
+                return self.match(probe_encodings, tolerance, top_k)
+            return self.index.search(probe_encodings, tolerance, top_k)
+            
+    def select_top_k(self, distances, row_indices, tolerance, top_k):
+        """Turn a P x M distance matrix over gallery rows `row_indices` into match results"""
+        k = max(1, min(top_k, distances.shape[1]))
+        
+        if k < distances.shape[1]:
+            candidate_columns = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            candidate_columns = np.broadcast_to(np.arange(distances.shape[1]), distances.shape)
+            
+        results = []
+        for probe_index in range(distances.shape[0]):
+            columns = candidate_columns[probe_index]
+            probe_distances = distances[probe_index, columns]
+            order = np.argsort(probe_distances)
+            
+            candidates = []
+            for position in order:
+                name = self.names[row_indices[columns[position]]]
+                candidates.append((name, float(probe_distances[position])))
+                
+            results.append(self.build_result(candidates, tolerance))
+            
+        return results
+        
+    def build_result(self, candidates, tolerance):
+        """Build a match result from candidates sorted by ascending distance"""
+        name = "Unknown"
+        confidence = 0.0
+        distance = None
+        
+        if candidates:
+            best_name, distance = candidates[0]
+            if distance <= tolerance:
+                name = best_name
+                # Convert distance to confidence (lower distance = higher confidence)
+                confidence = 1.0 - distance
+                
+        return {
+            'name': name,
+            'confidence': confidence,
+            'distance': distance,
+            'candidates': [
+                {'name': candidate, 'distance': candidate_distance}
+                for candidate, candidate_distance in candidates
+            ]
+        }
+
+
+class IVFIndex:
+    """Inverted-file index: k-means coarse quantizer with per-cluster row lists"""
+    
+    def __init__(self, gallery, nlist=0, nprobe=8, min_gallery_size=1000,
+                 retrain_growth=2.0, kmeans_iterations=10, seed=0):
+        self.gallery = gallery
+        self.nlist = nlist  # 0 = choose sqrt(N) at training time
+        self.nprobe = nprobe
+        self.min_gallery_size = min_gallery_size
+        self.retrain_growth = retrain_growth
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        self.reset()
+        
+    def reset(self):
+        """Drop the trained quantizer and inverted lists"""
+        self.centroids = None
+        self.lists = []
+        self.list_arrays = []
+        self.assignments = {}
+        self.trained_size = 0
+        
+    def is_trained(self):
+        return self.centroids is not None
+        
+    def needs_training(self):
+        size = len(self.gallery)
+        if size < self.min_gallery_size:
+            return False
+        if not self.is_trained():
+            return True
+        return size > self.trained_size * self.retrain_growth
+        
+    def train(self):
+        """Cluster the current gallery and rebuild all inverted lists"""
+        size = len(self.gallery)
+        data = self.gallery.encodings[:size]
+        nlist = self.nlist or int(np.sqrt(size))
+        nlist = max(1, min(nlist, size))
+        
+        rng = np.random.default_rng(self.seed)
+        
+        # Train on a bounded sample, then assign every row
+        sample_size = min(size, nlist * 64)
+        sample = data[rng.choice(size, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        
+        for _ in range(self.kmeans_iterations):
+            labels = self.nearest_centroids(sample, centroids, 1)[:, 0]
+            for cluster in range(nlist):
+                members = sample[labels == cluster]
+                if len(members) > 0:
+                    centroids[cluster] = members.mean(axis=0)
+                    
+        self.centroids = centroids
+        self.trained_size = size
+        
+        labels = self.nearest_centroids(data, centroids, 1)[:, 0]
+        self.lists = [[] for _ in range(nlist)]
+        self.assignments = {}
+        for row, cluster in enumerate(labels.tolist()):
+            self.lists[cluster].append(row)
+            self.assignments[row] = cluster
+        self.list_arrays = [None] * nlist
+        
+        print(f"Gallery IVF index trained - {size} encodings, {nlist} lists")
+        
+    def nearest_centroids(self, points, centroids, count):
+        """Indices of the `count` nearest centroids for each point"""
+        squared = (np.einsum('ij,ij->i', points, points)[:, None]
+                   + np.einsum('ij,ij->i', centroids, centroids)[None, :]
+                   - 2.0 * (points @ centroids.T))
+        count = min(count, len(centroids))
+        if count < len(centroids):
+            return np.argpartition(squared, count - 1, axis=1)[:, :count]
+        return np.broadcast_to(np.arange(len(centroids)), squared.shape)
+        
+    def row_updated(self, row):
+        """Assign a new or replaced gallery row to its nearest list"""
+        if not self.is_trained():
+            return
+            
+        encoding = self.gallery.encodings[row:row + 1]
+        cluster = int(self.nearest_centroids(encoding, self.centroids, 1)[0, 0])
+        
+        previous = self.assignments.get(row)
+        if previous == cluster:
+            return
+        if previous is not None:
+            self.lists[previous].remove(row)
+            self.list_arrays[previous] = None
+            
+        self.lists[cluster].append(row)
+        self.list_arrays[cluster] = None
+        self.assignments[row] = cluster
+        
+    def row_removed(self, row, last_row):
+        """Mirror the gallery's swap-with-last removal"""
+        if not self.is_trained():
+            return
+            
+        cluster = self.assignments.pop(row, None)
+        if cluster is not None:
+            self.lists[cluster].remove(row)
+            self.list_arrays[cluster] = None
+            
+        if row != last_row:
+            moved_cluster = self.assignments.pop(last_row, None)
+            if moved_cluster is not None:
+                rows = self.lists[moved_cluster]
+                rows[rows.index(last_row)] = row
+                self.list_arrays[moved_cluster] = None
+                self.assignments[row] = moved_cluster
+                
+    def list_rows(self, cluster):
+        """Row indices of one inverted list as a cached array"""
+        rows = self.list_arrays[cluster]
+        if rows is None:
+            rows = np.array(self.lists[cluster], dtype=np.int64)
+            self.list_arrays[cluster] = rows
+        return rows
+        
+    def search(self, probe_encodings, tolerance=0.6, top_k=3):
+        """Approximate search that scans only the nprobe nearest lists per probe"""
+        if self.needs_training():
+            self.train()
+            
+        if not self.is_trained() or len(self.gallery) < self.min_gallery_size:
+            return self.gallery.match(probe_encodings, tolerance, top_k)
+            
+        gallery = self.gallery
+        probes = np.asarray(probe_encodings, dtype=np.float32).reshape(-1, gallery.encoding_size)
+        if len(probes) == 0:
+            return []
+            
+        probe_lists = self.nearest_centroids(probes, self.centroids, self.nprobe)
+        
+        results = []
+        for probe, clusters in zip(probes, probe_lists):
+            rows = np.concatenate([self.list_rows(cluster) for cluster in clusters])
+            if len(rows) == 0:
+                results.append(gallery.build_result([], tolerance))
+                continue
+                
+            squared = (np.dot(probe, probe) + gallery.squared_norms[rows]
+                       - 2.0 * (gallery.encodings[rows] @ probe))
+            np.maximum(squared, 0.0, out=squared)
+            distances = np.sqrt(squared)[None, :]
+            results.extend(gallery.select_top_k(distances, rows, tolerance, top_k))
+            
+        return results
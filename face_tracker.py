@@ -0,0 +1,346 @@
+import itertools
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+# Optical flow samples a FLOW_GRID x FLOW_GRID grid of points inside each face box
+FLOW_GRID = 4
+
+class Track:
+    def __init__(self, track_id, bbox, detection_confidence, now):
+        self.track_id = track_id
+        self.bbox = tuple(float(v) for v in bbox)  # (x, y, width, height)
+        self.velocity = (0.0, 0.0)  # centre velocity in pixels/second
+        self.detection_confidence = detection_confidence
+        self.created_at = now
+        self.last_update = now
+        self.hits = 1
+        self.misses = 0
+        
+        # Cached identity from the last recognition run
+        self.name = None
+        self.confidence = 0.0
+        self.candidates = []
+        self.last_recognized = None
+        
+    def predict(self, now):
+        """Constant-velocity prediction of the box at time `now`"""
+        dt = max(0.0, now - self.last_update)
+        x, y, w, h = self.bbox
+        return (x + self.velocity[0] * dt, y + self.velocity[1] * dt, w, h)
+        
+    def update(self, bbox, detection_confidence, now, smoothing=0.5):
+        """Correct the track with a matched detection (alpha-beta filter on the centre)"""
+        dt = now - self.last_update
+        old_cx, old_cy = center(self.bbox)
+        new_cx, new_cy = center(bbox)
+        
+        if dt > 0:
+            vx = (new_cx - old_cx) / dt
+            vy = (new_cy - old_cy) / dt
+            self.velocity = (
+                self.velocity[0] + smoothing * (vx - self.velocity[0]),
+                self.velocity[1] + smoothing * (vy - self.velocity[1])
+            )
+            
+        self.bbox = tuple(float(v) for v in bbox)
+        self.detection_confidence = detection_confidence
+        # A correction never moves the track back in time
+        self.last_update = max(self.last_update, now)
+        self.hits += 1
+        self.misses = 0
+        
+    def int_bbox(self):
+        x, y, w, h = self.bbox
+        return (int(round(x)), int(round(y)), int(round(w)), int(round(h)))
+
+def center(bbox):
+    x, y, w, h = bbox
+    return x + w / 2.0, y + h / 2.0
+
+def flow_points(bbox):
+    """Grid of points over the central part of a box, shaped for calcOpticalFlowPyrLK"""
+    x, y, w, h = bbox
+    xs = np.linspace(x + w * 0.2, x + w * 0.8, FLOW_GRID)
+    ys = np.linspace(y + h * 0.2, y + h * 0.8, FLOW_GRID)
+    grid = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 1, 2)
+    return grid.astype(np.float32)
+
+def to_grey(frame):
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+def iou(a, b):
+    """Intersection over union of two (x, y, width, height) boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0.0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0.0, min(ay + ah, by + bh) - max(ay, by))
+    intersection = ix * iy
+    union = aw * ah + bw * bh - intersection
+    return intersection / union if union > 0 else 0.0
+
+class FaceTracker:
+    def __init__(self, iou_threshold=0.3, max_center_distance=1.0, max_missed_frames=10,
+                 min_confidence=0.5, low_confidence_retry=0.5, reverify_interval=5.0):
+        self.iou_threshold = iou_threshold
+        # Fallback association for fast motion: centre distance in units of box size
+        self.max_center_distance = max_center_distance
+        self.max_missed_frames = max_missed_frames
+        self.min_confidence = min_confidence
+        self.low_confidence_retry = low_confidence_retry
+        self.reverify_interval = reverify_interval
+        
+        self.track_ids = itertools.count(1)
+        self.tracks = {}  # source_id -> [Track]
+        self.lock = threading.Lock()
+        
+        # Optical flow between detections: keep the last frame each source's boxes refer to
+        self.optical_flow = False
+        self.min_flow_points = 0.5  # fraction of a box's points that must be tracked
+        self.flow_frames = {}  # source_id -> greyscale frame
+        self.flow_times = {}  # source_id -> timestamp of that frame
+        # Recent frames per source, so a detection that finishes after newer frames were
+        # propagated can be carried forward to them instead of being thrown away
+        self.flow_history_frames = 30
+        self.flow_history = {}  # source_id -> deque of (timestamp, greyscale frame)
+        self.detections_forwarded = 0
+        
+        # Counters
+        self.recognitions_run = 0
+        self.recognitions_saved = 0
+        
+    def update_settings(self, settings):
+        """Update association and re-verification settings"""
+        self.iou_threshold = settings.get('iou_threshold', 0.3)
+        self.max_missed_frames = settings.get('max_missed_frames', 10)
+        self.min_confidence = settings.get('min_confidence', 0.5)
+        self.low_confidence_retry = settings.get('low_confidence_retry_seconds', 0.5)
+        self.reverify_interval = settings.get('reverify_seconds', 5.0)
+        
+    def association_score(self, predicted, bbox):
+        """IoU, or a small positive score for nearby boxes that no longer overlap"""
+        overlap = iou(predicted, bbox)
+        if overlap >= self.iou_threshold:
+            return 1.0 + overlap
+            
+        pcx, pcy = center(predicted)
+        dcx, dcy = center(bbox)
+        size = max(1.0, (predicted[2] + predicted[3]) / 2.0)
+        distance = ((pcx - dcx) ** 2 + (pcy - dcy) ** 2) ** 0.5 / size
+        if distance <= self.max_center_distance:
+            return 1.0 - distance / (self.max_center_distance + 1e-9) * 0.999
+        return 0.0
+        
+    def remember_frame(self, source_id, grey, now):
+        """Make grey the source's flow reference frame and add it to the history"""
+        self.flow_frames[source_id] = grey
+        self.flow_times[source_id] = now
+        history = self.flow_history.get(source_id)
+        if history is None or history.maxlen != self.flow_history_frames:
+            history = self.flow_history[source_id] = deque(history or (), maxlen=self.flow_history_frames)
+        history.append((now, grey))
+        
+    def forward_boxes(self, source_id, grey, then, boxes):
+        """Carry boxes found in a frame taken at `then` through the newer frames in the history"""
+        frames = [frame for timestamp, frame in self.flow_history.get(source_id, ()) if timestamp > then]
+        if not boxes or not frames:
+            return boxes
+            
+        start = np.concatenate([flow_points(bbox) for bbox in boxes])
+        points = start
+        tracked = np.ones(len(start), dtype=bool)
+        previous = grey
+        for frame in frames:
+            if frame.shape != previous.shape:
+                return boxes
+            points, status, _ = cv2.calcOpticalFlowPyrLK(previous, frame, points, None,
+                                                         winSize=(15, 15), maxLevel=2)
+            tracked &= status.reshape(-1).astype(bool)
+            previous = frame
+            
+        per_box = FLOW_GRID * FLOW_GRID
+        forwarded = []
+        for i, (x, y, w, h) in enumerate(boxes):
+            block = slice(i * per_box, (i + 1) * per_box)
+            if tracked[block].mean() < self.min_flow_points:
+                # Flow lost the face; its own position is still the best estimate there is
+                forwarded.append((x, y, w, h))
+                continue
+            dx, dy = np.median((points[block] - start[block]).reshape(-1, 2)[tracked[block]], axis=0)
+            forwarded.append((x + float(dx), y + float(dy), w, h))
+        return forwarded
+        
+    def update(self, source_id, detected_faces, now, frame=None):
+        """Associate this frame's detections with tracks; returns a track per detection.
+        
+        A detection older than the frames already propagated is first moved forward to the newest
+        one with optical flow, so it corrects the tracks where they are now.
+        """
+        grey = to_grey(frame) if self.optical_flow and frame is not None else None
+        boxes = [face['bbox'] for face in detected_faces]
+        
+        with self.lock:
+            latest = self.flow_times.get(source_id)
+            if grey is not None and latest is not None and now < latest:
+                boxes = self.forward_boxes(source_id, grey, now, boxes)
+                now = latest
+                self.detections_forwarded += 1
+            elif grey is not None:
+                # Boxes and reference frame change together so flow always starts from matching data
+                self.remember_frame(source_id, grey, now)
+                
+            tracks = self.tracks.setdefault(source_id, [])
+            predictions = [track.predict(now) for track in tracks]
+            
+            # Greedy matching on the best score first
+            pairs = []
+            for t, predicted in enumerate(predictions):
+                for d, bbox in enumerate(boxes):
+                    score = self.association_score(predicted, bbox)
+                    if score > 0:
+                        pairs.append((score, t, d))
+            pairs.sort(reverse=True)
+            
+            assigned = [None] * len(detected_faces)
+            used_tracks = set()
+            for score, t, d in pairs:
+                if t in used_tracks or assigned[d] is not None:
+                    continue
+                tracks[t].update(boxes[d], detected_faces[d]['confidence'], now)
+                assigned[d] = tracks[t]
+                used_tracks.add(t)
+                
+            # Unmatched tracks age out
+            survivors = []
+            for t, track in enumerate(tracks):
+                if t not in used_tracks:
+                    track.misses += 1
+                if track.misses <= self.max_missed_frames:
+                    survivors.append(track)
+                    
+            # Unmatched detections start new tracks
+            for d, face in enumerate(detected_faces):
+                if assigned[d] is None:
+                    track = Track(next(self.track_ids), boxes[d], face['confidence'], now)
+                    assigned[d] = track
+                    survivors.append(track)
+                    
+            self.tracks[source_id] = survivors
+            return assigned
+            
+    def propagate(self, source_id, frame, now):
+        """Move visible tracks onto this frame with sparse optical flow instead of detecting.
+        
+        Returns (detections, needs_detection); needs_detection is True when a track was lost,
+        there is no reference frame yet, or an identity is uncertain or due for re-verification.
+        """
+        grey = to_grey(frame)
+        
+        with self.lock:
+            if now < self.flow_times.get(source_id, now):
+                # Overtaken by a newer frame; the sink drops this one as stale anyway
+                return [], False
+            previous = self.flow_frames.get(source_id)
+            self.remember_frame(source_id, grey, now)
+            if previous is None or previous.shape != grey.shape:
+                return [], True
+                
+            tracks = [track for track in self.tracks.get(source_id, []) if track.misses == 0]
+            if not tracks:
+                return [], False
+                
+            # One pyramidal Lucas-Kanade call for the points of every track
+            points = np.concatenate([flow_points(track.bbox) for track in tracks])
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(previous, grey, points, None,
+                                                        winSize=(15, 15), maxLevel=2)
+            status = status.reshape(-1).astype(bool)
+            
+            per_track = FLOW_GRID * FLOW_GRID
+            needs_detection = False
+            detections = []
+            for i, track in enumerate(tracks):
+                block = slice(i * per_track, (i + 1) * per_track)
+                tracked = status[block]
+                if tracked.mean() < self.min_flow_points:
+                    # Lost: it re-associates (or ages out) on the next detection frame
+                    track.misses += 1
+                    needs_detection = True
+                    continue
+                    
+                dx, dy = np.median((moved[block] - points[block]).reshape(-1, 2)[tracked], axis=0)
+                x, y, w, h = track.bbox
+                track.update((x + float(dx), y + float(dy), w, h), track.detection_confidence, now)
+                
+                if self.needs_recognition(track, now):
+                    needs_detection = True
+                detections.append(self.track_detection(track, track.int_bbox(), track.detection_confidence))
+                
+            return detections, needs_detection
+            
+    def needs_recognition(self, track, now):
+        """New, low-confidence (rate-limited) or due for periodic re-verification"""
+        if track.last_recognized is None:
+            return True
+        elapsed = now - track.last_recognized
+        if track.name == 'Unknown' or track.confidence < self.min_confidence:
+            return elapsed >= self.low_confidence_retry
+        return elapsed >= self.reverify_interval
+        
+    def set_identity(self, track, recognition, now):
+        """Cache a recognition result on the track"""
+        track.name = recognition.get('name', 'Unknown')
+        track.confidence = recognition.get('confidence', 0.0)
+        track.candidates = recognition.get('candidates', [])
+        track.last_recognized = now
+        
+    def recognize(self, source_id, frame, detected_faces, now, recognize_detections):
+        """Track this frame's faces and run recognition only for tracks that need it"""
+        tracks = self.update(source_id, detected_faces, now, frame)
+        
+        pending = [i for i, track in enumerate(tracks) if self.needs_recognition(track, now)]
+        if pending:
+            results = recognize_detections(frame, [detected_faces[i] for i in pending])
+            for i, result in zip(pending, results):
+                self.set_identity(tracks[i], result, now)
+                
+        self.recognitions_run += len(pending)
+        self.recognitions_saved += len(tracks) - len(pending)
+        
+        # A late detection was moved onto newer frames; report where its tracks are now
+        return [self.track_detection(track, track.int_bbox() if track.last_update > now else face['bbox'],
+                                     face['confidence'])
+                for face, track in zip(detected_faces, tracks)]
+        
+    def track_detection(self, track, bbox, detection_confidence):
+        """Detection dict carrying the track's cached identity"""
+        return {
+            'name': track.name or 'Unknown',
+            'confidence': track.confidence,
+            'bbox': bbox,
+            'detection_confidence': detection_confidence,
+            'candidates': track.candidates,
+            'track_id': track.track_id
+        }
+        
+    def remove_source(self, source_id):
+        """Forget all tracks of a source"""
+        with self.lock:
+            self.tracks.pop(source_id, None)
+            self.flow_frames.pop(source_id, None)
+            self.flow_times.pop(source_id, None)
+            self.flow_history.pop(source_id, None)
+            
+    def get_stats(self):
+        """Active tracks and how many recognition runs the cache avoided"""
+        with self.lock:
+            active = sum(len(tracks) for tracks in self.tracks.values())
+        total = self.recognitions_run + self.recognitions_saved
+        return {
+            'active_tracks': active,
+            'recognitions_run': self.recognitions_run,
+            'recognitions_saved': self.recognitions_saved,
+            'detections_forwarded': self.detections_forwarded,
+            'saved_ratio': self.recognitions_saved / total if total else 0.0
+        }
@@ -0,0 +1,60 @@
+def name_key(name):
+    """Case-insensitive lookup key for a name or employee id"""
+    return str(name).casefold()
+
+class FacultyIndex:
+    """Hash indexes over faculty records by id, case-folded name and case-folded employee_id.
+    
+    Names (and, in messy data, employee ids) can repeat, so those keys map to a list of records
+    in insertion order; lookups return the first, matching the old linear scan.
+    """
+    
+    def __init__(self):
+        self.by_id = {}
+        self.by_name = {}
+        self.by_employee_id = {}
+        
+    def rebuild(self, records):
+        self.by_id = {}
+        self.by_name = {}
+        self.by_employee_id = {}
+        for record in records:
+            self.add(record)
+            
+    def add(self, record):
+        self.by_id[record['id']] = record
+        if record.get('name'):
+            self.by_name.setdefault(name_key(record['name']), []).append(record)
+        if record.get('employee_id'):
+            self.by_employee_id.setdefault(name_key(record['employee_id']), []).append(record)
+            
+    def remove(self, record):
+        if self.by_id.get(record['id']) is record:
+            del self.by_id[record['id']]
+        if record.get('name'):
+            discard(self.by_name, name_key(record['name']), record)
+        if record.get('employee_id'):
+            discard(self.by_employee_id, name_key(record['employee_id']), record)
+            
+    def get_by_id(self, faculty_id):
+        return self.by_id.get(faculty_id)
+        
+    def get_by_name(self, name):
+        records = self.by_name.get(name_key(name))
+        return records[0] if records else None
+        
+    def get_by_employee_id(self, employee_id):
+        records = self.by_employee_id.get(name_key(employee_id))
+        return records[0] if records else None
+
+def discard(index, key, record):
+    """Remove record (by identity) from index[key], dropping the key once empty"""
+    records = index.get(key)
+    if not records:
+        return
+    for i, candidate in enumerate(records):
+        if candidate is record:
+            del records[i]
+            break
+    if not records:
+        del index[key]
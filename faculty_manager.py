@@ -1,25 +1,37 @@
 import json
 import os
 from datetime import datetime
+import threading
 import uuid
 
+from faculty_index import FacultyIndex
+from write_behind import WriteBehindWriter
+
 class FacultyManager:
-    def __init__(self):
-        self.data_file = "data/faculty_data.json"
+    def __init__(self, data_file="data/faculty_data.json", write_interval=2.0):
+        self.data_file = data_file
         self.faculty_data = []
+        self.index = FacultyIndex()  # O(1) lookups by id, name and employee_id
+        self.lock = threading.RLock()
+        # Changes are marked dirty and written in the background, at most once per interval
+        self.writer = WriteBehindWriter(self.data_file, self.snapshot, interval=write_interval)
         self.ensure_data_directory()
         self.load_data()
+        self.writer.start()
         
     def ensure_data_directory(self):
         """Ensure data directory exists"""
-        os.makedirs("data", exist_ok=True)
+        os.makedirs(os.path.dirname(self.data_file) or ".", exist_ok=True)
         
     def load_data(self):
         """Load faculty data from file"""
         try:
             if os.path.exists(self.data_file):
                 with open(self.data_file, 'r') as f:
-                    self.faculty_data = json.load(f)
+                    faculty_data = json.load(f)
+                with self.lock:
+                    self.faculty_data = faculty_data
+                    self.index.rebuild(faculty_data)
                 print(f"Loaded {len(self.faculty_data)} faculty members")
             else:
                 # Create sample data
@@ -27,18 +39,32 @@ class FacultyManager:
                 
         except Exception as e:
             print(f"Error loading faculty data: {e}")
-            self.faculty_data = []
+            with self.lock:
+                self.faculty_data = []
+                self.index.rebuild([])
+            
+    def snapshot(self):
+        """Copy of the faculty records for the background writer"""
+        with self.lock:
+            return [dict(faculty) for faculty in self.faculty_data]
             
+    def mark_dirty(self, faculty_id=None):
+        """Schedule a write for a changed record; never blocks on disk"""
+        self.writer.mark_dirty(faculty_id)
+        
     def save_data(self):
-        """Save faculty data to file"""
+        """Write pending changes to disk now (atomically)"""
         try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.faculty_data, f, indent=2)
-            print("Faculty data saved successfully")
-            
+            if self.writer.flush():
+                print("Faculty data saved successfully")
+                
         except Exception as e:
             print(f"Error saving faculty data: {e}")
             
+    def close(self):
+        """Write pending changes and stop the background writer"""
+        self.writer.close()
+        
     def create_sample_data(self):
         """Create sample faculty data"""
         sample_faculty = [
@@ -88,7 +114,10 @@ class FacultyManager:
             }
         ]
         
-        self.faculty_data = sample_faculty
+        with self.lock:
+            self.faculty_data = sample_faculty
+            self.index.rebuild(sample_faculty)
+        self.mark_dirty()
         self.save_data()
         print("Sample faculty data created")
         
@@ -100,8 +129,10 @@ class FacultyManager:
             faculty_info['created_at'] = datetime.now().isoformat()
             faculty_info['last_seen'] = 'Never'
             
-            self.faculty_data.append(faculty_info)
-            self.save_data()
+            with self.lock:
+                self.faculty_data.append(faculty_info)
+                self.index.add(faculty_info)
+            self.mark_dirty(faculty_info['id'])
             
             print(f"Added faculty member: {faculty_info['name']}")
             return True
@@ -113,20 +144,26 @@ class FacultyManager:
     def update_faculty(self, faculty_id, updated_info):
         """Update faculty member information"""
         try:
-            for i, faculty in enumerate(self.faculty_data):
-                if faculty['id'] == faculty_id:
+            with self.lock:
+                faculty = self.index.get_by_id(faculty_id)
+                if faculty is not None:
                     # Preserve original creation data
                     updated_info['id'] = faculty_id
                     updated_info['created_at'] = faculty.get('created_at', datetime.now().isoformat())
                     updated_info['last_seen'] = faculty.get('last_seen', 'Never')
                     updated_info['updated_at'] = datetime.now().isoformat()
                     
-                    self.faculty_data[i] = updated_info
-                    self.save_data()
-                    
-                    print(f"Updated faculty member: {updated_info['name']}")
-                    return True
+                    self.faculty_data[self.faculty_data.index(faculty)] = updated_info
+                    self.index.remove(faculty)
+                    self.index.add(updated_info)
+                else:
+                    updated_info = None
                     
+            if updated_info is not None:
+                self.mark_dirty(faculty_id)
+                print(f"Updated faculty member: {updated_info['name']}")
+                return True
+                
             print(f"Faculty member with ID {faculty_id} not found")
             return False
             
@@ -137,14 +174,17 @@ class FacultyManager:
     def delete_faculty(self, faculty_id):
         """Delete faculty member"""
         try:
-            for i, faculty in enumerate(self.faculty_data):
-                if faculty['id'] == faculty_id:
-                    deleted_faculty = self.faculty_data.pop(i)
-                    self.save_data()
-                    
-                    print(f"Deleted faculty member: {deleted_faculty['name']}")
-                    return True
+            with self.lock:
+                deleted_faculty = self.index.get_by_id(faculty_id)
+                if deleted_faculty is not None:
+                    self.faculty_data.remove(deleted_faculty)
+                    self.index.remove(deleted_faculty)
                     
+            if deleted_faculty is not None:
+                self.mark_dirty(faculty_id)
+                print(f"Deleted faculty member: {deleted_faculty['name']}")
+                return True
+                
             print(f"Faculty member with ID {faculty_id} not found")
             return False
             
@@ -154,21 +194,23 @@ class FacultyManager:
             
     def get_faculty_by_id(self, faculty_id):
         """Get faculty member by ID"""
-        for faculty in self.faculty_data:
-            if faculty['id'] == faculty_id:
-                return faculty
-        return None
+        with self.lock:
+            return self.index.get_by_id(faculty_id)
         
     def get_faculty_by_name(self, name):
-        """Get faculty member by name"""
-        for faculty in self.faculty_data:
-            if faculty['name'].lower() == name.lower():
-                return faculty
-        return None
+        """Get faculty member by name (case-insensitive)"""
+        with self.lock:
+            return self.index.get_by_name(name)
+            
+    def get_faculty_by_employee_id(self, employee_id):
+        """Get faculty member by employee ID (case-insensitive)"""
+        with self.lock:
+            return self.index.get_by_employee_id(employee_id)
         
     def get_all_faculty(self):
         """Get all faculty members"""
-        return self.faculty_data.copy()
+        with self.lock:
+            return self.faculty_data.copy()
         
     def search_faculty(self, query):
         """Search faculty members"""
@@ -184,15 +226,21 @@ class FacultyManager:
                 
         return results
         
-    def update_last_seen(self, faculty_name):
-        """Update last seen timestamp for faculty member"""
+    def update_last_seen(self, faculty_name, seen_at=None, camera=None):
+        """Update last seen timestamp (epoch seconds, default now) and camera for faculty member"""
         try:
-            for faculty in self.faculty_data:
-                if faculty['name'].lower() == faculty_name.lower():
-                    faculty['last_seen'] = datetime.now().isoformat()
-                    self.save_data()
-                    return True
-            return False
+            with self.lock:
+                faculty = self.index.get_by_name(faculty_name)
+                if faculty is None:
+                    return False
+                seen = datetime.fromtimestamp(seen_at) if seen_at is not None else datetime.now()
+                faculty['last_seen'] = seen.isoformat()
+                if camera is not None:
+                    faculty['last_seen_camera'] = camera
+                
+            # Hot path: only mark the record; the background writer coalesces the disk write
+            self.mark_dirty(faculty['id'])
+            return True
             
         except Exception as e:
             print(f"Error updating last seen for {faculty_name}: {e}")
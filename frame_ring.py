@@ -0,0 +1,209 @@
+import threading
+
+import numpy as np
+
+class FrameRing:
+    """Preallocated ring of frame buffers: capture reads in place, readers get read-only views.
+    
+    Consumers that keep a view past the capture callback (pipeline packets) pin its slot, and
+    the writer skips pinned slots, so a frame is never overwritten while someone still reads it.
+    When every slot is pinned the frame goes out in its own array instead (counted as overflow),
+    so the ring should hold more frames than consumers keep in flight; see ensure_slots().
+    """
+    
+    def __init__(self, slots=16):
+        self.slot_count = max(2, int(slots))
+        self.buffers = []
+        self.sequences = [0] * self.slot_count
+        self.timestamps = [0.0] * self.slot_count
+        self.pins = [0] * self.slot_count
+        self.write_index = 0
+        self.latest_index = None
+        self.latest_frame = None  # (read-only view, timestamp, sequence)
+        self.sequence = 0
+        self.lock = threading.Lock()
+        
+        # Counters
+        self.copies = 0  # frames the source could not decode in place
+        self.allocations = 0
+        self.overflows = 0  # frames published outside the ring because every slot was pinned
+        
+    def free_slot(self):
+        """First unpinned slot from write_index on, never the latest one; caller holds the lock"""
+        for offset in range(self.slot_count):
+            index = (self.write_index + offset) % self.slot_count
+            if self.pins[index] == 0 and index != self.latest_index:
+                return index
+        return None
+        
+    def next_buffer(self):
+        """Buffer to read the next frame into, or None to let the source allocate one"""
+        with self.lock:
+            if not self.buffers:
+                return None
+            index = self.free_slot()
+            if index is None:
+                return None
+            self.write_index = index
+            return self.buffers[index]
+            
+    def publish(self, frame, timestamp):
+        """Make a freshly read frame visible; returns (read-only view, sequence number).
+        
+        Copies only when the source allocated its own array (first frame, resolution change);
+        with every slot pinned the frame itself is published and nothing is copied.
+        """
+        with self.lock:
+            in_place = bool(self.buffers) and frame is self.buffers[self.write_index]
+            
+        if not in_place:
+            with self.lock:
+                reallocate = not self.buffers or self.buffers[0].shape != frame.shape or \
+                    self.buffers[0].dtype != frame.dtype
+            if reallocate:
+                self.allocate(frame.shape, frame.dtype)
+                
+            with self.lock:
+                index = self.free_slot()
+                if index is None:
+                    # Nobody else holds this array, so it is safe to hand out as is
+                    self.overflows += 1
+                    self.sequence += 1
+                    view = frame.view()
+                    view.flags.writeable = False
+                    self.latest_index = None
+                    self.latest_frame = (view, timestamp, self.sequence)
+                    return view, self.sequence
+                self.write_index = index
+                buffer = self.buffers[index]
+            # Only the capture thread writes slots, and it chose an unpinned one
+            np.copyto(buffer, frame)
+            self.copies += 1
+            
+        with self.lock:
+            index = self.write_index
+            self.sequence += 1
+            self.sequences[index] = self.sequence
+            self.timestamps[index] = timestamp
+            self.latest_index = index
+            self.write_index = (index + 1) % self.slot_count
+            view = self.view(index)
+            self.latest_frame = (view, timestamp, self.sequence)
+            return view, self.sequence
+            
+    def pin(self, sequence):
+        """Keep the slot holding sequence from being reused; False if it is not in the ring"""
+        with self.lock:
+            index = self.slot_of(sequence)
+            if index is None:
+                return False
+            self.pins[index] += 1
+            return True
+            
+    def release(self, sequence):
+        """Undo one pin(sequence)"""
+        with self.lock:
+            index = self.slot_of(sequence)
+            if index is not None and self.pins[index] > 0:
+                self.pins[index] -= 1
+                
+    def slot_of(self, sequence):
+        """Slot currently holding sequence, or None; caller holds the lock"""
+        if self.latest_index is not None and self.sequences[self.latest_index] == sequence:
+            return self.latest_index
+        for index, slot_sequence in enumerate(self.sequences):
+            if slot_sequence == sequence:
+                return index
+        return None
+        
+    def ensure_slots(self, slots):
+        """Grow the ring to at least slots; returns True if it grew"""
+        with self.lock:
+            extra = int(slots) - self.slot_count
+            if extra <= 0:
+                return False
+            if self.buffers:
+                self.buffers.extend(np.empty_like(self.buffers[0]) for _ in range(extra))
+            self.sequences.extend([0] * extra)
+            self.timestamps.extend([0.0] * extra)
+            self.pins.extend([0] * extra)
+            self.slot_count += extra
+            return True
+            
+    def allocate(self, shape, dtype=np.uint8):
+        """(Re)allocate every slot; views handed out earlier keep their old arrays alive"""
+        with self.lock:
+            # Pins belong to the old arrays; sequences are never reused, so their releases are no-ops
+            self.buffers = [np.empty(shape, dtype) for _ in range(self.slot_count)]
+            self.sequences = [0] * self.slot_count
+            self.pins = [0] * self.slot_count
+            self.latest_index = None
+            self.write_index = 0
+            self.allocations += 1
+            
+    def view(self, index):
+        """Read-only view of a slot; caller holds the lock"""
+        view = self.buffers[index].view()
+        view.flags.writeable = False
+        return view
+        
+    def latest(self):
+        """Newest frame as (read-only view, timestamp, sequence), or (None, None, 0)"""
+        with self.lock:
+            if self.latest_frame is None:
+                return None, None, 0
+            return self.latest_frame
+            
+    def acquire_latest(self):
+        """latest() with its slot pinned; release(sequence) once done with the frame"""
+        with self.lock:
+            if self.latest_frame is None:
+                return None, None, 0
+            if self.latest_index is not None:
+                self.pins[self.latest_index] += 1
+            return self.latest_frame
+            
+    def clear(self):
+        """Forget the latest frame but keep the buffers for the next start"""
+        with self.lock:
+            self.latest_index = None
+            self.latest_frame = None
+            
+    def get_stats(self):
+        """Slot count, pinned slots, frames published and how many needed a copy"""
+        with self.lock:
+            return {
+                'slots': self.slot_count,
+                'pinned': sum(1 for pins in self.pins if pins),
+                'sequence': self.sequence,
+                'copies': self.copies,
+                'allocations': self.allocations,
+                'overflows': self.overflows
+            }
+
+class FrameCursor:
+    """Follows a ring for a polling consumer and counts the frames it skipped or saw twice"""
+    
+    def __init__(self):
+        self.last_sequence = 0
+        self.dropped = 0
+        self.duplicates = 0
+        
+    def advance(self, sequence):
+        """Record a polled sequence number; returns True if it is a new frame"""
+        if sequence == self.last_sequence:
+            self.duplicates += 1
+            return False
+            
+        # A smaller sequence means a new ring (camera re-created); just follow it
+        if self.last_sequence and sequence > self.last_sequence + 1:
+            self.dropped += sequence - self.last_sequence - 1
+        self.last_sequence = sequence
+        return True
+        
+    def get_stats(self):
+        return {
+            'sequence': self.last_sequence,
+            'dropped': self.dropped,
+            'duplicates': self.duplicates
+        }
@@ -0,0 +1,297 @@
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+def create_ml_processor(settings):
+    """Default worker processor: an MLProcessor with the app's detection settings and no gallery.
+    
+    Workers only detect and encode, so they skip loading (and enrolling) reference images:
+    N workers would otherwise rewrite the same gallery cache, and enrollment cannot start its
+    process pool from inside a daemonic worker.
+    """
+    from ml_processor import MLProcessor
+    
+    return MLProcessor(settings, load_gallery=False)
+
+def attach_shared_memory(name):
+    """Attach to a parent-owned block without letting this process unlink it on exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: spawned workers share the parent's resource tracker, so registering
+        # the attach again is harmless and the parent's unlink stays the only one
+        return shared_memory.SharedMemory(name=name)
+
+def strip_face_regions(detected_faces):
+    """Face crops are views into the shared slot; the parent re-slices them from its own frame"""
+    return [{key: value for key, value in face.items() if key != 'face_region'} for face in detected_faces]
+
+def inference_worker_main(slot_names, task_queue, result_queue, processor_factory, settings):
+    """Worker process: detect (and optionally encode) faces in frames found in shared-memory slots.
+    
+    Matching is left to the parent, whose gallery follows enrollments and deletions.
+    """
+    blocks = [attach_shared_memory(name) for name in slot_names]
+    try:
+        processor = processor_factory(settings)
+    except Exception as e:
+        result_queue.put((None, None, None, None, f"worker failed to start: {e}"))
+        processor = None
+        
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+                
+            task_id, slot, shape, dtype, regions, encode = task
+            if processor is None:
+                result_queue.put((task_id, slot, None, None, "worker not initialized"))
+                continue
+                
+            try:
+                frame = np.ndarray(shape, dtype=dtype, buffer=blocks[slot].buf)
+                detected_faces = processor.detect_faces(frame, regions)
+                
+                face_encodings = None
+                if encode:
+                    face_encodings = processor.encode_faces(frame, [face['bbox'] for face in detected_faces])
+                    
+                result_queue.put((task_id, slot, strip_face_regions(detected_faces), face_encodings, None))
+            except Exception as e:
+                result_queue.put((task_id, slot, None, None, str(e)))
+    finally:
+        for block in blocks:
+            block.close()
+
+class InferenceWorkerPool:
+    """MLProcessor in worker processes, fed through shared-memory frame slots.
+    
+    A frame is copied once into a free slot; only the slot index, shape and regions travel
+    over a worker's task queue, and only boxes (and face encodings) come back over the result
+    queue. Each worker has its own task queue, so when one dies the pool knows which slots and
+    callbacks it held, reclaims them and starts a replacement.
+    """
+    
+    def __init__(self, workers=2, slots_per_worker=2, slot_bytes=1920 * 1080 * 3,
+                 processor_factory=create_ml_processor, settings=None):
+        self.workers = max(1, int(workers))
+        self.slot_count = self.workers * max(1, int(slots_per_worker))
+        self.slot_bytes = int(slot_bytes)
+        self.processor_factory = processor_factory
+        self.settings = settings or {}
+        
+        # Spawned (not forked) workers never inherit the GUI or camera threads
+        self.context = multiprocessing.get_context('spawn')
+        self.processes = []
+        self.task_queues = []
+        self.blocks = []
+        self.free_slots = queue.Queue()
+        self.result_queue = None
+        self.result_thread = None
+        self.running = False
+        self.health_interval = 0.5  # seconds between worker liveness checks
+        
+        self.task_ids = itertools.count(1)
+        self.pending = {}  # task_id -> (callback, submitted_at, slot, worker)
+        self.outstanding = []  # tasks queued on each worker
+        self.pending_lock = threading.Lock()
+        
+        # Counters
+        self.completed = 0
+        self.errors = 0
+        self.oversized = 0
+        self.restarts = 0
+        self.latency = None
+        
+    def start(self):
+        """Allocate the slots and start the worker processes"""
+        if self.running:
+            return
+            
+        self.blocks = [shared_memory.SharedMemory(create=True, size=self.slot_bytes)
+                       for _ in range(self.slot_count)]
+        self.free_slots = queue.Queue()
+        for slot in range(self.slot_count):
+            self.free_slots.put(slot)
+            
+        self.result_queue = self.context.Queue()
+        self.processes = [None] * self.workers
+        self.task_queues = [None] * self.workers
+        self.outstanding = [0] * self.workers
+        for worker in range(self.workers):
+            self.spawn_worker(worker)
+            
+        self.running = True
+        self.result_thread = threading.Thread(target=self.collect_results, name="inference-results", daemon=True)
+        self.result_thread.start()
+        print(f"Inference worker pool started with {self.workers} processes")
+        
+    def spawn_worker(self, worker):
+        """Start (or replace) one worker process with a fresh task queue"""
+        self.task_queues[worker] = self.context.Queue()
+        process = self.context.Process(
+            target=inference_worker_main,
+            args=([block.name for block in self.blocks], self.task_queues[worker], self.result_queue,
+                  self.processor_factory, self.settings),
+            name=f"inference-worker-{worker}",
+            daemon=True
+        )
+        process.start()
+        self.processes[worker] = process
+        
+    def stop(self):
+        """Stop the workers and release the shared memory"""
+        if not self.running:
+            return
+            
+        self.running = False
+        # Result thread first, so it cannot restart a worker we are about to stop
+        if self.result_thread and self.result_thread.is_alive():
+            self.result_thread.join(timeout=2.0)
+            
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self.task_queues = []
+        
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+        
+        # Results that never came back still get their callback, so callers can free what they hold
+        with self.pending_lock:
+            abandoned = list(self.pending.values())
+            self.pending.clear()
+        for callback, _, _, _ in abandoned:
+            self.notify(callback, None, None, "worker pool stopped")
+        print("Inference worker pool stopped")
+        
+    def submit(self, frame, regions, recognize, callback, timeout=0.5):
+        """Copy a frame into a free slot and queue it; False if no slot freed up in time.
+        
+        With recognize the worker also encodes the faces. callback(detected_faces, face_encodings,
+        error) runs on the result thread; match the encodings with MLProcessor.recognize_encoded.
+        """
+        if not self.running:
+            return False
+            
+        if frame.nbytes > self.slot_bytes:
+            self.oversized += 1
+            if self.oversized == 1:
+                print(f"Frame of {frame.nbytes} bytes does not fit a {self.slot_bytes} byte slot")
+            return False
+            
+        try:
+            slot = self.free_slots.get(timeout=timeout)
+        except queue.Empty:
+            return False
+            
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.blocks[slot].buf)[...] = frame
+        
+        task_id = next(self.task_ids)
+        with self.pending_lock:
+            # Least loaded worker; its queue is never longer than the slots it holds
+            worker = min(range(self.workers), key=self.outstanding.__getitem__)
+            self.outstanding[worker] += 1
+            self.pending[task_id] = (callback, time.perf_counter(), slot, worker)
+            task_queue = self.task_queues[worker]
+        task_queue.put((task_id, slot, frame.shape, frame.dtype.str, regions, recognize))
+        return True
+        
+    def collect_results(self):
+        """Result thread: free the slot and hand each result to its callback; reclaim dead workers"""
+        last_check = time.monotonic()
+        while self.running:
+            if time.monotonic() - last_check >= self.health_interval:
+                self.check_workers()
+                last_check = time.monotonic()
+                
+            try:
+                task_id, _, detected_faces, face_encodings, error = self.result_queue.get(
+                    timeout=self.health_interval)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+                
+            with self.pending_lock:
+                entry = self.pending.pop(task_id, None)
+                if entry is not None:
+                    self.outstanding[entry[3]] -= 1
+                    
+            if entry is None:
+                # A worker's startup error, or a task already reclaimed from a dead worker
+                if error is not None:
+                    self.errors += 1
+                    print(f"Inference worker error: {error}")
+                continue
+                
+            callback, submitted_at, slot, _ = entry
+            self.free_slots.put(slot)
+            
+            if error is not None:
+                self.errors += 1
+                print(f"Inference worker error: {error}")
+            else:
+                self.completed += 1
+                latency = time.perf_counter() - submitted_at
+                self.latency = latency if self.latency is None else self.latency + 0.1 * (latency - self.latency)
+                
+            self.notify(callback, detected_faces, face_encodings, error)
+            
+    def check_workers(self):
+        """Reclaim the slots and callbacks of workers that died, then replace them"""
+        for worker, process in enumerate(self.processes):
+            if process is None or process.is_alive() or not self.running:
+                continue
+                
+            with self.pending_lock:
+                lost = [(task_id, entry) for task_id, entry in self.pending.items() if entry[3] == worker]
+                for task_id, _ in lost:
+                    del self.pending[task_id]
+                self.outstanding[worker] = 0
+                
+            print(f"Inference worker {worker} exited with code {process.exitcode}; "
+                  f"reclaimed {len(lost)} slots and restarting it")
+            for _, (callback, _, slot, _) in lost:
+                self.free_slots.put(slot)
+                self.errors += 1
+                self.notify(callback, None, None, "inference worker exited")
+                
+            self.restarts += 1
+            self.spawn_worker(worker)
+            
+    def notify(self, callback, detected_faces, face_encodings, error):
+        if callback is None:
+            return
+        try:
+            callback(detected_faces, face_encodings, error)
+        except Exception as e:
+            print(f"Error in inference result callback: {e}")
+            
+    def get_stats(self):
+        """Worker count, frames in flight and per-frame latency"""
+        with self.pending_lock:
+            in_flight = len(self.pending)
+        return {
+            'workers': self.workers,
+            'alive': sum(1 for process in self.processes if process is not None and process.is_alive()),
+            'slots': self.slot_count,
+            'in_flight': in_flight,
+            'completed': self.completed,
+            'errors': self.errors,
+            'oversized': self.oversized,
+            'restarts': self.restarts,
+            'avg_ms': (self.latency or 0.0) * 1000.0
+        }
@@ -0,0 +1,220 @@
+import queue
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+REQUIRED_SETTINGS = ('email', 'password', 'smtp_server', 'smtp_port')
+
+def format_alert(alert):
+    """Plain-text body for a single alert"""
+    count = alert.get('count', 1)
+    repeats = f"Repeats: {count} (last {alert.get('last_seen', '')})\n" if count > 1 else ""
+    return f"""
+Faculty Monitoring System Alert
+
+Type: {alert['type']}
+Priority: {alert['priority']}
+Time: {alert['created_at']}
+Message: {alert['message']}
+{repeats}
+This is an automated alert from the Faculty Monitoring System.
+            """
+
+def format_digest(alerts):
+    """Plain-text body combining several alerts"""
+    lines = ["", f"Faculty Monitoring System: {len(alerts)} alerts", ""]
+    for alert in alerts:
+        lines.append(f"[{alert['priority']}] {alert['created_at']} {alert['type']}: {alert['message']}")
+    lines += ["", "This is an automated alert from the Faculty Monitoring System."]
+    return "\n".join(lines)
+
+def build_message(alerts, sender, recipient):
+    """One email for one alert, or a digest for several"""
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = recipient
+    if len(alerts) == 1:
+        msg['Subject'] = f"Faculty Monitoring Alert: {alerts[0]['type']}"
+        body = format_alert(alerts[0])
+    else:
+        msg['Subject'] = f"Faculty Monitoring Alerts: {len(alerts)} new"
+        body = format_digest(alerts)
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+class MailWorker:
+    """Single outbound mail thread with a bounded queue, a reused SMTP session and digests.
+    
+    Alerts queued within digest_window seconds of the first one (up to max_digest) go out as
+    one message. The SMTP connection stays open between messages and is closed after
+    idle_timeout seconds without mail. Failed sends are retried with exponential backoff; when
+    the queue is full new alerts are dropped (and counted) rather than blocking the caller.
+    """
+    
+    def __init__(self, settings=None, queue_size=100, digest_window=10.0, max_digest=20,
+                 max_retries=3, retry_backoff=2.0, idle_timeout=60.0, timeout=30.0):
+        self.settings = dict(settings or {})
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.digest_window = digest_window
+        self.max_digest = max_digest
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        
+        self.connection = None
+        self.last_used = 0.0
+        self.settings_changed = False
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+        
+        # Counters
+        self.sent_messages = 0
+        self.sent_alerts = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retries = 0
+        self.connections = 0
+        
+    def update_settings(self, settings):
+        """Use new SMTP and digest settings; the open connection is replaced on the next send"""
+        with self.lock:
+            self.settings = dict(settings or {})
+            self.settings_changed = True
+            self.digest_window = float(self.settings.get('digest_window_seconds', self.digest_window))
+            self.max_digest = max(1, int(self.settings.get('max_digest', self.max_digest)))
+            
+    def is_configured(self):
+        with self.lock:
+            return all(self.settings.get(key) not in (None, '') for key in REQUIRED_SETTINGS)
+            
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="mail-worker", daemon=True)
+        self.thread.start()
+        
+    def stop(self, timeout=5.0):
+        """Stop after sending what is already queued (within timeout)"""
+        if not self.running:
+            return
+        self.running = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=timeout)
+            
+    def submit(self, alert):
+        """Queue an alert for mailing; False if the queue is full or mail is not configured"""
+        if not self.running or not self.is_configured():
+            return False
+        try:
+            self.queue.put_nowait(alert)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                print(f"Mail queue full, dropped {self.dropped} alert emails so far")
+            return False
+            
+    def run(self):
+        """Worker loop: gather a digest, send it, close the connection when idle"""
+        try:
+            while True:
+                try:
+                    first = self.queue.get(timeout=0.5)
+                except queue.Empty:
+                    if not self.running:
+                        break
+                    if self.connection is not None and time.monotonic() - self.last_used > self.idle_timeout:
+                        self.disconnect()
+                    continue
+                    
+                batch = [first]
+                self.collect(batch)
+                self.deliver(batch)
+        finally:
+            self.disconnect()
+            
+    def collect(self, batch):
+        """Add alerts arriving within the digest window (cut short by stop())"""
+        deadline = time.monotonic() + self.digest_window
+        while len(batch) < self.max_digest:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=min(remaining, 0.5) if self.running else 0))
+            except queue.Empty:
+                if not self.running:
+                    break
+                    
+    def deliver(self, alerts):
+        """Send one message for the batch, reconnecting and backing off on failure"""
+        with self.lock:
+            settings = dict(self.settings)
+            if self.settings_changed:
+                self.settings_changed = False
+                self.disconnect()
+                
+        msg = build_message(alerts, settings['email'], settings['email'])
+        for attempt in range(self.max_retries + 1):
+            try:
+                connection = self.connect(settings)
+                connection.sendmail(settings['email'], [settings['email']], msg.as_string())
+                self.last_used = time.monotonic()
+                self.sent_messages += 1
+                self.sent_alerts += len(alerts)
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                self.disconnect()
+                if attempt == self.max_retries:
+                    self.failed += len(alerts)
+                    print(f"Error sending email alert after {attempt + 1} attempts: {e}")
+                    return False
+                self.retries += 1
+                time.sleep(self.retry_backoff * (2 ** attempt))
+        return False
+        
+    def connect(self, settings):
+        """The open SMTP session, or a new one (STARTTLS and login only when connecting)"""
+        if self.connection is not None:
+            return self.connection
+            
+        connection = smtplib.SMTP(settings['smtp_server'], int(settings['smtp_port']), timeout=self.timeout)
+        try:
+            if settings.get('use_tls', True):
+                connection.starttls()
+            if settings.get('password'):
+                connection.login(settings['email'], settings['password'])
+        except Exception:
+            connection.close()
+            raise
+            
+        self.connection = connection
+        self.connections += 1
+        return connection
+        
+    def disconnect(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.quit()
+        except (smtplib.SMTPException, OSError):
+            self.connection.close()
+        self.connection = None
+        
+    def get_stats(self):
+        """Queue depth and delivery counters"""
+        return {
+            'queued': self.queue.qsize(),
+            'sent_messages': self.sent_messages,
+            'sent_alerts': self.sent_alerts,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'retries': self.retries,
+            'connections': self.connections,
+            'connected': self.connection is not None
+        }
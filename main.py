@@ -1,8 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import cv2
-import threading
-import time
 from datetime import datetime
 import json
 import os
@@ -10,12 +8,24 @@ from PIL import Image, ImageTk
 import numpy as np
 
 from faculty_manager import FacultyManager
-from camera_monitor import CameraMonitor
+from camera_registry import CameraRegistry
 from ml_processor import MLProcessor
 from alert_system import AlertSystem
 from config import Config
+from pipeline import MonitoringPipeline
+from motion_gate import MotionGate
+from face_tracker import FaceTracker
+from frame_ring import FrameCursor
+from detection_scheduler import DetectionScheduler
+from inference_workers import InferenceWorkerPool
+from metrics import MetricsServer, stage_metrics
+from profiler import SamplingProfiler
+from presence_tracker import PresenceTracker
 from utils import Utils
 
+# Rows kept in the alerts table; older alerts remain available through Export Alerts
+MAX_DISPLAYED_ALERTS = 500
+
 class FacultyMonitoringApp:
     def __init__(self, root):
         self.root = root
@@ -25,16 +35,50 @@ class FacultyMonitoringApp:
         
         # Initialize components
         self.config = Config()
-        self.faculty_manager = FacultyManager()
-        self.camera_monitor = CameraMonitor()
-        self.ml_processor = MLProcessor()
+        self.faculty_manager = FacultyManager(
+            write_interval=self.config.get_config('persistence').get('faculty_write_interval_seconds', 2.0))
+        self.camera_registry = CameraRegistry()
+        self.camera_registry.load_from_config(self.config)
+        if self.camera_registry.get_primary_camera() is None:
+            self.camera_registry.add_camera("PC Camera", self.config.get_config('camera'))
+        self.camera_monitor = self.camera_registry.get_primary_camera()
+        # Persisted detection/recognition settings apply before the reference images are enrolled
+        self.ml_processor = MLProcessor(self.config.get_config('detection'))
         self.alert_system = AlertSystem()
         self.utils = Utils()
         
+        # Apply persisted alert settings
+        self.alert_system.update_suppression_settings(self.config.get_config('alerts'))
+        self.alert_system.update_settings(self.config.get_config('email'))
+        
+        # Debounced arrive/depart state per faculty member; only transitions reach the stores
+        self.presence_tracker = PresenceTracker()
+        self.presence_tracker.update_settings(self.config.get_config('presence'))
+        self.presence_tracker.add_listener(self.handle_presence_change)
+        
+        # Stage timings and the optional /metrics endpoint
+        metrics_settings = self.config.get_config('metrics')
+        stage_metrics.enabled = metrics_settings.get('enabled', False)
+        stage_metrics.add_collector(self.pipeline_gauges)
+        self.metrics_server = None
+        if metrics_settings.get('http_enabled', False):
+            self.metrics_server = MetricsServer(host=metrics_settings.get('host', '127.0.0.1'),
+                                                port=metrics_settings.get('port', 9108))
+            self.metrics_server.start()
+        
         # Initialize variables
         self.monitoring_active = False
+        self.pipeline = None
         self.current_frame = None
+        self.current_frame_pin = None  # (frame ring, sequence) pinned for current_frame
+        self.display_cursor = FrameCursor()
+        self.display_buffer = None  # reused resize/convert targets for the live feed
+        self.display_rgb = None
+        self.displayed_detections = None
         self.detection_log = []
+        self.latest_detections = {}  # camera_id -> detections of the newest processed frame
+        self.profiler = None
+        self.alerts_view_key = None  # (alert version, filter) currently shown in the alerts tab
         
         # Create GUI
         self.create_gui()
@@ -42,6 +86,9 @@ class FacultyMonitoringApp:
         # Start background processes
         self.start_background_processes()
         
+        # Flush persisted state before the window goes away
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
     def create_gui(self):
         """Create the main GUI interface"""
         # Create main frame
@@ -79,7 +126,10 @@ class FacultyMonitoringApp:
             ("Total Faculty", "total_faculty"),
             ("Active Cameras", "active_cameras"),
             ("Detections Today", "detections_today"),
-            ("System Status", "system_status")
+            ("System Status", "system_status"),
+            ("Active Alerts", "active_alerts"),
+            ("Alerts Suppressed", "alerts_suppressed"),
+            ("Faculty Present", "faculty_present")
         ]
         
         for i, (label_text, key) in enumerate(stats_data):
@@ -94,6 +144,36 @@ class FacultyMonitoringApp:
             
             self.stats_labels[key] = value_label
             
+        # Per-camera status
+        cameras_frame = ttk.LabelFrame(dashboard_frame, text="Cameras")
+        cameras_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        camera_columns = ("Camera", "Source", "Status", "FPS", "Jitter", "Backlog", "Dropped")
+        self.cameras_tree = ttk.Treeview(cameras_frame, columns=camera_columns, show="headings", height=4)
+        
+        for col in camera_columns:
+            self.cameras_tree.heading(col, text=col)
+            self.cameras_tree.column(col, width=120)
+            
+        self.cameras_tree.pack(fill=tk.X, padx=5, pady=5)
+        
+        # Where frame time goes, per instrumented stage
+        frame_time_frame = ttk.LabelFrame(dashboard_frame, text="Frame Time")
+        frame_time_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        self.metrics_enabled_var = tk.BooleanVar(value=stage_metrics.enabled)
+        ttk.Checkbutton(frame_time_frame, text="Collect stage timings", variable=self.metrics_enabled_var,
+                        command=self.toggle_metrics).pack(anchor=tk.W, padx=5)
+        
+        metrics_columns = ("Stage", "Count", "Mean", "p50", "p95", "Total")
+        self.metrics_tree = ttk.Treeview(frame_time_frame, columns=metrics_columns, show="headings", height=8)
+        
+        for col in metrics_columns:
+            self.metrics_tree.heading(col, text=col)
+            self.metrics_tree.column(col, width=120)
+            
+        self.metrics_tree.pack(fill=tk.X, padx=5, pady=5)
+        
         # Recent activity frame
         activity_frame = ttk.LabelFrame(dashboard_frame, text="Recent Activity")
         activity_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -185,6 +265,10 @@ class FacultyMonitoringApp:
                                                foreground="red")
         self.monitoring_status_label.pack(side=tk.RIGHT, padx=10)
         
+        # Pipeline stage counters
+        self.pipeline_stats_label = ttk.Label(monitoring_frame, text="Pipeline: stopped")
+        self.pipeline_stats_label.pack(fill=tk.X, padx=10)
+        
         # Main monitoring frame
         main_monitor_frame = ttk.Frame(monitoring_frame)
         main_monitor_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -289,10 +373,15 @@ class FacultyMonitoringApp:
         alert_settings_frame = ttk.Frame(settings_notebook)
         settings_notebook.add(alert_settings_frame, text="Alerts")
         
+        # Diagnostics
+        diagnostics_settings_frame = ttk.Frame(settings_notebook)
+        settings_notebook.add(diagnostics_settings_frame, text="Diagnostics")
+        
         # Create camera settings
         self.create_camera_settings(camera_settings_frame)
         self.create_detection_settings(detection_settings_frame)
         self.create_alert_settings(alert_settings_frame)
+        self.create_diagnostics_settings(diagnostics_settings_frame)
         
         # Save button
         ttk.Button(settings_frame, text="Save Settings", 
@@ -366,6 +455,62 @@ class FacultyMonitoringApp:
         self.email_password_var = tk.StringVar()
         ttk.Entry(email_frame, textvariable=self.email_password_var, width=30, show="*").grid(row=3, column=1, padx=5, pady=5)
         
+    def create_diagnostics_settings(self, parent):
+        """Create profiling controls"""
+        profile_frame = ttk.LabelFrame(parent, text="Sampling Profiler")
+        profile_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        ttk.Label(profile_frame, text="Duration (s):").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
+        self.profile_duration_var = tk.StringVar(value="30")
+        ttk.Entry(profile_frame, textvariable=self.profile_duration_var, width=10).grid(row=0, column=1, padx=5, pady=5)
+        
+        self.profile_button = ttk.Button(profile_frame, text="Start Profiling", command=self.toggle_profiling)
+        self.profile_button.grid(row=0, column=2, padx=5, pady=5)
+        
+        self.profile_status_label = ttk.Label(profile_frame, text="Idle")
+        self.profile_status_label.grid(row=1, column=0, columnspan=3, sticky=tk.W, padx=5, pady=5)
+        
+    def start_profiling(self, duration):
+        """Sample the monitoring, capture and inference threads for duration seconds"""
+        if self.profiler is not None and self.profiler.running:
+            return False
+            
+        self.profiler = SamplingProfiler(duration=duration)
+        self.profiler.start()
+        self.add_activity_log(f"Profiling started for {duration:.0f} s")
+        return True
+        
+    def toggle_profiling(self):
+        """Start a profiling window, or end the current one early"""
+        try:
+            if self.profiler is not None and self.profiler.running:
+                self.profiler.stop()
+                return
+                
+            duration = float(self.profile_duration_var.get())
+            if duration <= 0:
+                raise ValueError("duration must be positive")
+            self.start_profiling(duration)
+            
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid profiling duration: {e}")
+            
+    def update_profiler_status(self):
+        """Show profiling progress and where the results went"""
+        if self.profiler is None:
+            return
+            
+        status = self.profiler.get_status()
+        if status['running']:
+            self.profile_button.config(text="Stop Profiling")
+            self.profile_status_label.config(
+                text=f"Profiling... {status['elapsed']:.0f}/{status['duration']:.0f} s, {status['samples']} samples")
+        else:
+            self.profile_button.config(text="Start Profiling")
+            if status['summary_file']:
+                self.profile_status_label.config(
+                    text=f"Saved {status['collapsed_file']} and {status['summary_file']}")
+                    
     def start_background_processes(self):
         """Start background processes"""
         # Update GUI periodically
@@ -374,8 +519,20 @@ class FacultyMonitoringApp:
     def update_gui(self):
         """Update GUI elements periodically"""
         try:
+            # A replay that ran out of frames stops its camera on its own; finish its queued frames first
+            if self.monitoring_active and self.camera_registry.get_active_count() == 0 and \
+                    (self.pipeline is None or self.pipeline.is_idle()):
+                self.add_activity_log("All cameras stopped capturing")
+                self.stop_monitoring()
+                
+            # Depart anyone unseen for longer than the exit timeout
+            self.presence_tracker.expire()
+            
             # Update dashboard stats
             self.update_dashboard_stats()
+            self.update_camera_stats()
+            self.update_metrics_panel()
+            self.update_profiler_status()
             
             # Update faculty list
             self.update_faculty_list()
@@ -386,6 +543,7 @@ class FacultyMonitoringApp:
             # Update camera feed if monitoring is active
             if self.monitoring_active:
                 self.update_camera_feed()
+                self.update_pipeline_stats()
                 
         except Exception as e:
             print(f"Error updating GUI: {e}")
@@ -400,7 +558,7 @@ class FacultyMonitoringApp:
             self.stats_labels["total_faculty"].config(text=str(faculty_count))
             
             camera_status = "Active" if self.monitoring_active else "Inactive"
-            self.stats_labels["active_cameras"].config(text="1" if self.monitoring_active else "0")
+            self.stats_labels["active_cameras"].config(text=str(self.camera_registry.get_active_count()))
             
             detections_today = len([d for d in self.detection_log 
                                   if d.get('date') == datetime.now().strftime('%Y-%m-%d')])
@@ -409,9 +567,36 @@ class FacultyMonitoringApp:
             system_status = "Running" if self.monitoring_active else "Stopped"
             self.stats_labels["system_status"].config(text=system_status)
             
+            alert_stats = self.alert_system.get_alert_statistics()
+            suppression = alert_stats['suppression']
+            self.stats_labels["active_alerts"].config(text=str(alert_stats['active']))
+            self.stats_labels["alerts_suppressed"].config(
+                text=f"{suppression['suppressed']} ({suppression['suppressed_ratio'] * 100:.0f}%)")
+            self.stats_labels["faculty_present"].config(text=str(self.presence_tracker.get_stats()['present']))
+            
         except Exception as e:
             print(f"Error updating dashboard stats: {e}")
             
+    def update_camera_stats(self):
+        """Update per-camera FPS and backlog"""
+        try:
+            for item in self.cameras_tree.get_children():
+                self.cameras_tree.delete(item)
+                
+            for camera_id, stats in self.camera_registry.get_camera_stats(self.pipeline).items():
+                self.cameras_tree.insert("", tk.END, values=(
+                    camera_id,
+                    stats['source'],
+                    stats['status'],
+                    f"{stats['fps']:.1f}",
+                    f"{stats['jitter_ms']:.1f} ms",
+                    stats['backlog'],
+                    stats['dropped']
+                ))
+                
+        except Exception as e:
+            print(f"Error updating camera stats: {e}")
+            
     def update_faculty_list(self):
         """Update faculty list in the treeview"""
         try:
@@ -421,14 +606,18 @@ class FacultyMonitoringApp:
                 
             # Add faculty members
             faculty_list = self.faculty_manager.get_all_faculty()
+            present = {presence['name']: presence for presence in self.presence_tracker.get_present()}
             for faculty in faculty_list:
+                last_seen = faculty.get('last_seen', 'Never')
+                if faculty.get('name') in present:
+                    last_seen = f"Present on {present[faculty['name']]['camera']}"
                 self.faculty_tree.insert("", tk.END, values=(
                     faculty.get('id', ''),
                     faculty.get('name', ''),
                     faculty.get('department', ''),
                     faculty.get('email', ''),
                     faculty.get('status', 'Active'),
-                    faculty.get('last_seen', 'Never')
+                    last_seen
                 ))
                 
         except Exception as e:
@@ -437,18 +626,31 @@ class FacultyMonitoringApp:
     def update_alerts_display(self):
         """Update alerts display"""
         try:
+            # Nothing to redraw unless an alert or the filter changed
+            priority = self.alert_filter_var.get()
+            view_key = (self.alert_system.version, priority)
+            if view_key == self.alerts_view_key:
+                return
+            self.alerts_view_key = view_key
+            
             # Clear existing items
             for item in self.alerts_tree.get_children():
                 self.alerts_tree.delete(item)
                 
-            # Add alerts
-            alerts = self.alert_system.get_all_alerts()
+            # Add the newest alerts; the filtered view comes straight from the priority index
+            if priority == "All":
+                alerts = self.alert_system.get_all_alerts(limit=MAX_DISPLAYED_ALERTS)
+            else:
+                alerts = self.alert_system.get_alerts_by_priority(priority, limit=MAX_DISPLAYED_ALERTS)
             for alert in alerts:
+                message = alert.get('message', '')
+                if alert.get('count', 1) > 1:
+                    message = f"{message} (x{alert['count']}, last {alert['last_seen'][11:19]})"
                 self.alerts_tree.insert("", tk.END, values=(
                     alert.get('timestamp', ''),
                     alert.get('type', ''),
                     alert.get('priority', ''),
-                    alert.get('message', ''),
+                    message,
                     alert.get('status', 'Active')
                 ))
                 
@@ -458,14 +660,39 @@ class FacultyMonitoringApp:
     def update_camera_feed(self):
         """Update camera feed display"""
         try:
-            if self.current_frame is not None:
-                # Convert frame to PhotoImage
-                frame_rgb = cv2.cvtColor(self.current_frame, cv2.COLOR_BGR2RGB)
-                frame_pil = Image.fromarray(frame_rgb)
+            # The live feed follows the primary camera directly, including frames the pipeline skipped.
+            # The displayed frame stays pinned, so capture cannot reuse its slot while it is shown.
+            ring = self.camera_monitor.frame_ring
+            frame, _, sequence = ring.acquire_latest()
+            detections = self.latest_detections.get(self.camera_monitor.camera_id)
+            
+            if frame is not None:
+                # Nothing to redraw if neither the frame nor its overlay changed
+                new_frame = self.display_cursor.advance(sequence)
+                if not new_frame and detections is self.displayed_detections:
+                    ring.release(sequence)
+                    return
+                self.release_current_frame()
+                self.current_frame = frame
+                self.current_frame_pin = (ring, sequence)
+                self.displayed_detections = detections
                 
-                # Resize frame to fit display
+            if self.current_frame is not None:
+                # Shrink first (into a reused buffer) so drawing and conversion touch fewer pixels
                 display_size = (640, 480)
-                frame_pil = frame_pil.resize(display_size, Image.Resampling.LANCZOS)
+                self.display_buffer = cv2.resize(self.current_frame, display_size, dst=self.display_buffer,
+                                                 interpolation=cv2.INTER_AREA)
+                                                 
+                # Overlay the newest tracked boxes; with tracking they move on every frame
+                if detections:
+                    height, width = self.current_frame.shape[:2]
+                    self.ml_processor.draw_detections(
+                        self.display_buffer, scale_detections(detections, display_size[0] / width,
+                                                              display_size[1] / height))
+                        
+                # Convert frame to PhotoImage
+                self.display_rgb = cv2.cvtColor(self.display_buffer, cv2.COLOR_BGR2RGB, dst=self.display_rgb)
+                frame_pil = Image.fromarray(self.display_rgb)
                 
                 # Convert to PhotoImage
                 photo = ImageTk.PhotoImage(frame_pil)
@@ -477,14 +704,100 @@ class FacultyMonitoringApp:
         except Exception as e:
             print(f"Error updating camera feed: {e}")
             
+    def update_metrics_panel(self):
+        """Update the per-stage frame time table"""
+        try:
+            for item in self.metrics_tree.get_children():
+                self.metrics_tree.delete(item)
+                
+            if not stage_metrics.enabled:
+                return
+                
+            for stage, summary in stage_metrics.get_summary().items():
+                if summary['count'] == 0:
+                    continue
+                self.metrics_tree.insert("", tk.END, values=(
+                    stage,
+                    summary['count'],
+                    f"{summary['mean_ms']:.1f} ms",
+                    f"<{summary['p50_ms']:.1f} ms",
+                    f"<{summary['p95_ms']:.1f} ms",
+                    f"{summary['total_ms'] / 1000.0:.1f} s"
+                ))
+                
+        except Exception as e:
+            print(f"Error updating metrics panel: {e}")
+            
+    def toggle_metrics(self):
+        """Switch stage timing collection on or off"""
+        stage_metrics.enabled = self.metrics_enabled_var.get()
+        if stage_metrics.enabled:
+            stage_metrics.reset()
+        self.add_activity_log(f"Stage timings {'enabled' if stage_metrics.enabled else 'disabled'}")
+        
+    def pipeline_gauges(self):
+        """Queue depths and throughput exported on /metrics while monitoring"""
+        if self.pipeline is None:
+            return {}
+            
+        stats = self.pipeline.get_stats()
+        gauges = {
+            'capture_fps': stats['capture']['fps'],
+            'end_to_end_latency_seconds': stats['end_to_end_latency_ms'] / 1000.0
+        }
+        for stage in ('detection', 'propagation', 'recognition', 'sink'):
+            if stage in stats:
+                gauges[f'{stage}_fps'] = stats[stage]['fps']
+                gauges[f'{stage}_queue_depth'] = stats[stage]['queue']['depth']
+                gauges[f'{stage}_queue_dropped'] = stats[stage]['queue']['dropped']
+        return gauges
+        
+    def update_pipeline_stats(self):
+        """Update pipeline queue depth and throughput display"""
+        try:
+            if self.pipeline is None:
+                return
+                
+            stats = self.pipeline.get_stats()
+            parts = [f"capture {stats['capture']['fps']:.1f} fps"]
+            for stage in ('detection', 'propagation', 'recognition', 'sink'):
+                if stage not in stats:
+                    continue
+                stage_stats = stats[stage]
+                queue = stage_stats['queue']
+                parts.append(f"{stage} {stage_stats['fps']:.1f} fps "
+                             f"(queue {queue['depth']}/{queue['capacity']}, dropped {queue['dropped']})")
+            if 'workers' in stats['detection']:
+                workers = stats['detection']['workers']
+                parts.append(f"workers {workers['alive']}/{workers['workers']} "
+                             f"({workers['in_flight']} in flight, {workers['avg_ms']:.0f} ms/frame)")
+            if 'batch_size' in stats['detection']:
+                parts.append(f"batch {stats['detection']['batch_size']:.1f}/{stats['detection']['max_batch_size']} "
+                             f"({stats['detection']['avg_ms']:.1f} ms/frame)")
+            parts.append(f"latency {stats['end_to_end_latency_ms']:.0f} ms")
+            if 'motion' in stats:
+                parts.append(f"static frames skipped {stats['motion']['skipped']} "
+                             f"({stats['motion']['skip_ratio'] * 100:.0f}%)")
+            if 'tracking' in stats:
+                parts.append(f"tracks {stats['tracking']['active_tracks']}, "
+                             f"recognitions saved {stats['tracking']['saved_ratio'] * 100:.0f}%")
+            if 'schedule' in stats:
+                parts.append(f"detect every {stats['schedule']['interval']} frames "
+                             f"({stats['schedule']['propagated_ratio'] * 100:.0f}% tracked)")
+            
+            self.pipeline_stats_label.config(text="Pipeline: " + " | ".join(parts))
+            
+        except Exception as e:
+            print(f"Error updating pipeline stats: {e}")
+            
     def start_monitoring(self):
         """Start camera monitoring"""
         try:
             if not self.monitoring_active:
                 self.monitoring_active = True
                 
-                # Start camera monitoring
-                self.camera_monitor.start_monitoring()
+                # Start every registered camera
+                self.camera_registry.start_all()
                 
                 # Start ML processing
                 self.ml_processor.start_processing()
@@ -494,9 +807,55 @@ class FacultyMonitoringApp:
                 self.stop_button.config(state=tk.NORMAL)
                 self.monitoring_status_label.config(text="Status: Running", foreground="green")
                 
-                # Start monitoring thread
-                self.monitoring_thread = threading.Thread(target=self.monitoring_loop, daemon=True)
-                self.monitoring_thread.start()
+                # Start capture -> detection -> recognition -> sink pipeline
+                pipeline_settings = self.config.get_config('pipeline')
+                motion_settings = self.config.get_config('motion')
+                motion_gate = None
+                if motion_settings.get('enabled', True):
+                    motion_gate = MotionGate()
+                    motion_gate.update_settings(motion_settings)
+                    
+                tracking_settings = self.config.get_config('tracking')
+                tracker = None
+                if tracking_settings.get('enabled', True):
+                    tracker = FaceTracker()
+                    tracker.update_settings(tracking_settings)
+                    
+                # Detector every N frames, optical flow in between (needs the tracker)
+                schedule_settings = self.config.get_config('detection_schedule')
+                scheduler = None
+                if tracker is not None and schedule_settings.get('enabled', False):
+                    scheduler = DetectionScheduler()
+                    scheduler.update_settings(schedule_settings)
+                    
+                # Optional worker processes so detection/recognition are not bound by the GIL
+                worker_pool = None
+                if pipeline_settings.get('inference_workers', 0) > 0:
+                    frame_bytes = [width * height * 3 for width, height in
+                                   (camera.resolution for camera in self.camera_registry.get_cameras().values())]
+                    worker_pool = InferenceWorkerPool(
+                        workers=pipeline_settings['inference_workers'],
+                        slots_per_worker=pipeline_settings.get('worker_slots', 2),
+                        slot_bytes=max(frame_bytes + [1920 * 1080 * 3]),
+                        settings=self.config.get_config('detection')
+                    )
+                    
+                self.pipeline = MonitoringPipeline(
+                    None,
+                    self.ml_processor,
+                    self.handle_pipeline_result,
+                    queue_size=pipeline_settings.get('queue_size', 2),
+                    drop_policy=pipeline_settings.get('drop_policy', 'drop_oldest'),
+                    detection_batch_size=pipeline_settings.get('detection_batch_size', 1),
+                    detection_batch_wait=pipeline_settings.get('detection_batch_wait_ms', 10) / 1000.0,
+                    motion_gate=motion_gate,
+                    tracker=tracker,
+                    scheduler=scheduler,
+                    worker_pool=worker_pool
+                )
+                for camera_id, camera_monitor in self.camera_registry.get_cameras().items():
+                    self.pipeline.add_source(camera_id, camera_monitor)
+                self.pipeline.start()
                 
                 self.add_activity_log("Monitoring started")
                 
@@ -509,12 +868,22 @@ class FacultyMonitoringApp:
             if self.monitoring_active:
                 self.monitoring_active = False
                 
+                # Stop the pipeline before the camera so no stage waits on frames
+                if self.pipeline is not None:
+                    self.pipeline.stop()
+                    self.pipeline = None
+                self.latest_detections = {}
+                self.pipeline_stats_label.config(text="Pipeline: stopped")
+                
                 # Stop camera monitoring
-                self.camera_monitor.stop_monitoring()
+                self.camera_registry.stop_all()
                 
                 # Stop ML processing
                 self.ml_processor.stop_processing()
                 
+                # Nobody can be seen any more, so everyone present departs now
+                self.presence_tracker.reset()
+                
                 # Update UI
                 self.start_button.config(state=tk.NORMAL)
                 self.stop_button.config(state=tk.DISABLED)
@@ -528,30 +897,18 @@ class FacultyMonitoringApp:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to stop monitoring: {e}")
             
-    def monitoring_loop(self):
-        """Main monitoring loop"""
-        while self.monitoring_active:
-            try:
-                # Get frame from camera
-                frame = self.camera_monitor.get_current_frame()
-                
-                if frame is not None:
-                    self.current_frame = frame
-                    
-                    # Process frame with ML
-                    detections = self.ml_processor.process_frame(frame)
-                    
-                    # Handle detections
-                    for detection in detections:
-                        self.handle_detection(detection)
-                        
-                time.sleep(0.1)  # Small delay to prevent excessive CPU usage
-                
-            except Exception as e:
-                print(f"Error in monitoring loop: {e}")
-                
-    def handle_detection(self, detection):
+    def handle_pipeline_result(self, packet):
+        """Event sink: receives each frame that made it through detection and recognition"""
+        camera_id = packet['source_id']
+        self.latest_detections[camera_id] = packet['detections']
+        
+        # Handle detections
+        for detection in packet['detections']:
+            self.handle_detection(detection, camera_id)
+            
+    def handle_detection(self, detection, camera_id="PC Camera"):
         """Handle a face detection"""
+        started = stage_metrics.start()
         try:
             # Add to detection log
             detection_entry = {
@@ -559,13 +916,15 @@ class FacultyMonitoringApp:
                 'date': datetime.now().strftime('%Y-%m-%d'),
                 'name': detection.get('name', 'Unknown'),
                 'confidence': detection.get('confidence', 0.0),
-                'camera': 'PC Camera'
+                'camera': camera_id,
+                'track_id': detection.get('track_id')
             }
             
             self.detection_log.append(detection_entry)
             
             # Update detection listbox
-            detection_text = f"{detection_entry['timestamp']} - {detection_entry['name']} ({detection_entry['confidence']:.2f})"
+            detection_text = (f"{detection_entry['timestamp']} - {detection_entry['camera']} - "
+                              f"{detection_entry['name']} ({detection_entry['confidence']:.2f})")
             self.detection_listbox.insert(0, detection_text)
             
             # Keep only last 100 entries
@@ -575,17 +934,55 @@ class FacultyMonitoringApp:
             # Add to activity log
             self.add_activity_log(f"Detected: {detection_entry['name']}")
             
+            # Presence bookkeeping is O(1) per hit; only arrivals/departures go further
+            self.presence_tracker.observe(detection_entry['name'], detection_entry['confidence'], camera_id)
+            
             # Check if alert should be generated
+            # (repeats of the same track or identity on a camera fold into one alert)
             if detection_entry['name'] == 'Unknown' or detection_entry['confidence'] < 0.7:
-                self.alert_system.create_alert(
+                subject = detection_entry['track_id']
+                if subject is None:
+                    subject = detection_entry['name']
+                self.alert_system.raise_alert(
                     alert_type="Unknown Person",
-                    message=f"Unknown person detected with confidence {detection_entry['confidence']:.2f}",
-                    priority="Medium"
+                    message=f"Unknown person detected on {detection_entry['camera']} with confidence {detection_entry['confidence']:.2f}",
+                    priority="Medium",
+                    camera=detection_entry['camera'],
+                    subject=subject
                 )
                 
+            stage_metrics.observe('handle_detection', started)
         except Exception as e:
             print(f"Error handling detection: {e}")
             
+    def handle_presence_change(self, event, presence):
+        """Presence listener: record an arrival or departure with the faculty store and alerts"""
+        try:
+            name = presence['name']
+            camera = presence['camera']
+            # On departure this is the last sighting, not when the timeout noticed it
+            self.faculty_manager.update_last_seen(name, presence['last_seen'], camera)
+            
+            if event == 'arrived':
+                message = f"{name} arrived on {camera}"
+            else:
+                left_at = datetime.fromtimestamp(presence['last_seen']).strftime('%H:%M:%S')
+                message = f"{name} left (last seen on {camera} at {left_at})"
+            self.add_activity_log(message)
+            
+            if self.config.get_config('presence').get('alert_on_transitions', True):
+                self.alert_system.raise_alert(
+                    alert_type="Faculty Present" if event == 'arrived' else "Faculty Absent",
+                    message=message,
+                    priority="Low",
+                    camera=camera,
+                    subject=name,
+                    auto_email=False
+                )
+                
+        except Exception as e:
+            print(f"Error handling presence change: {e}")
+            
     def add_activity_log(self, message):
         """Add message to activity log"""
         try:
@@ -743,18 +1140,51 @@ class FacultyMonitoringApp:
             else:
                 messagebox.showerror("Error", "Failed to process reference image.")
                 
+    def release_current_frame(self):
+        """Unpin the displayed frame's ring slot"""
+        if self.current_frame_pin is not None:
+            ring, sequence = self.current_frame_pin
+            ring.release(sequence)
+            self.current_frame_pin = None
+            
     def take_screenshot(self):
         """Take screenshot of current camera feed"""
-        if self.current_frame is not None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"screenshot_{timestamp}.jpg"
+        # Save the newest frame, pinned while it is written; else the (pinned) displayed one
+        ring = self.camera_monitor.frame_ring
+        frame, _, sequence = ring.acquire_latest()
+        try:
+            if frame is None:
+                frame = self.current_frame
+                
+            if frame is not None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"screenshot_{timestamp}.jpg"
+                
+                # Save screenshot
+                cv2.imwrite(filename, frame)
+                messagebox.showinfo("Success", f"Screenshot saved as {filename}")
+            else:
+                messagebox.showwarning("Warning", "No camera feed available.")
+        finally:
+            if sequence:
+                ring.release(sequence)
             
-            # Save screenshot
-            cv2.imwrite(filename, self.current_frame)
-            messagebox.showinfo("Success", f"Screenshot saved as {filename}")
-        else:
-            messagebox.showwarning("Warning", "No camera feed available.")
+    def on_closing(self):
+        """Stop monitoring and flush stores, then close the window"""
+        try:
+            self.stop_monitoring()
+            if self.profiler is not None:
+                self.profiler.stop()
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
+            self.alert_system.close()
+            self.faculty_manager.close()
+            
+        except Exception as e:
+            print(f"Error during shutdown: {e}")
             
+        self.root.destroy()
+        
     def clear_alerts(self):
         """Clear all alerts"""
         if messagebox.askyesno("Confirm", "Are you sure you want to clear all alerts?"):
@@ -787,8 +1217,7 @@ class FacultyMonitoringApp:
             
     def filter_alerts(self, event=None):
         """Filter alerts by priority"""
-        # Implementation for filtering alerts
-        pass
+        self.update_alerts_display()
         
     def update_confidence_label(self, value):
         """Update confidence threshold label"""
@@ -823,17 +1252,28 @@ class FacultyMonitoringApp:
             
             # Update components with new settings
             self.camera_monitor.update_settings(settings['camera'])
-            self.ml_processor.update_settings(settings['detection'])
-            self.alert_system.update_settings(settings['email'])
+            self.ml_processor.update_settings(self.config.get_config('detection'))
+            self.alert_system.update_settings(self.config.get_config('email'))
             
             messagebox.showinfo("Success", "Settings saved successfully!")
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save settings: {e}")
 
-def main():
+def scale_detections(detections, scale_x, scale_y):
+    """Copies of detections with boxes scaled to a resized display frame"""
+    scaled = []
+    for detection in detections:
+        x, y, w, h = detection['bbox']
+        scaled.append(dict(detection, bbox=(int(x * scale_x), int(y * scale_y),
+                                            int(w * scale_x), int(h * scale_y))))
+    return scaled
+
+def main(profile_seconds=None):
     root = tk.Tk()
     app = FacultyMonitoringApp(root)
+    if profile_seconds:
+        app.start_profiling(profile_seconds)
     root.mainloop()
 
 if __name__ == "__main__":
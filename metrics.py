@@ -0,0 +1,201 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds, Prometheus style (plus an implicit +Inf)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+STAGES = ('capture', 'color_conversion', 'detection', 'encoding', 'matching',
+          'handle_detection', 'alert_creation', 'persistence')
+
+class Histogram:
+    """Fixed-bucket latency histogram; O(log buckets) per observation"""
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.lock = threading.Lock()
+        
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (inf for the overflow bucket)"""
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+        if count == 0:
+            return 0.0
+            
+        target = q * count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return bound
+        return float('inf')
+        
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.count, self.total
+
+class StageMetrics:
+    """Hot-path stage timings and counters.
+    
+    Instrumented code calls start() and observe(); with collection off start() returns None
+    and observe() returns at once, so the only cost left is a flag check.
+    """
+    
+    def __init__(self, namespace='faculty_monitor'):
+        self.namespace = namespace
+        self.enabled = False
+        self.histograms = {stage: Histogram() for stage in STAGES}
+        self.counters = {}
+        self.collectors = []  # callables returning {gauge_name: value}
+        self.lock = threading.Lock()
+        
+    def start(self):
+        """Start timing a stage; None when collection is off"""
+        return time.perf_counter() if self.enabled else None
+        
+    def observe(self, stage, started):
+        """Record the time since start() for a stage"""
+        if started is None:
+            return
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(stage, Histogram())
+        histogram.observe(time.perf_counter() - started)
+        
+    def increment(self, name, amount=1):
+        """Bump a counter (only while collection is on)"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            
+    def add_collector(self, collector):
+        """Register a callable returning gauges to export alongside the stage timings"""
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+            
+    def remove_collector(self, collector):
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+            
+    def reset(self):
+        """Clear all timings and counters"""
+        with self.lock:
+            self.histograms = {stage: Histogram() for stage in STAGES}
+            self.counters = {}
+            
+    def get_summary(self):
+        """{stage: {'count', 'mean_ms', 'p50_ms', 'p95_ms', 'total_ms'}} for the dashboard"""
+        summary = {}
+        for stage, histogram in list(self.histograms.items()):
+            _, count, total = histogram.snapshot()
+            summary[stage] = {
+                'count': count,
+                'mean_ms': (total / count * 1000.0) if count else 0.0,
+                'p50_ms': histogram.quantile(0.5) * 1000.0,
+                'p95_ms': histogram.quantile(0.95) * 1000.0,
+                'total_ms': total * 1000.0
+            }
+        return summary
+        
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        prefix = self.namespace
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pipeline stage",
+            f"# TYPE {prefix}_stage_seconds histogram"
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            counts, count, total = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {count}')
+            
+        with self.lock:
+            counters = dict(self.counters)
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.append(f"{prefix}_{name} {value}")
+            
+        for collector in list(self.collectors):
+            try:
+                gauges = collector()
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+                continue
+            for name, value in sorted(gauges.items()):
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                lines.append(f"{prefix}_{name} {float(value)}")
+                
+        return "\n".join(lines) + "\n"
+
+# Process-wide instance used by the instrumented modules
+stage_metrics = StageMetrics()
+
+class MetricsServer:
+    """Local HTTP endpoint serving /metrics in Prometheus text format"""
+    
+    def __init__(self, metrics=stage_metrics, host='127.0.0.1', port=9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+        
+    def start(self):
+        """Start serving on a background thread"""
+        if self.server is not None:
+            return True
+            
+        metrics = self.metrics
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                
+            def log_message(self, format, *args):
+                # Scrapes every few seconds would flood the console
+                pass
+                
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"Failed to start metrics endpoint on {self.host}:{self.port}: {e}")
+            return False
+            
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+        print(f"Metrics endpoint at http://{self.host}:{self.port}/metrics")
+        return True
+        
+    def stop(self):
+        """Stop serving"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -8,11 +8,18 @@ import time
 from ultralytics import YOLO
 import face_recognition
 
+from encoding_cache import EncodingCache
+from enrollment import copy_into_reference_dir, enroll_images, print_progress
+from face_gallery import FaceGallery
+from metrics import stage_metrics
+
 class MLProcessor:
-    def __init__(self):
+    def __init__(self, settings=None, load_gallery=True):
         self.yolo_model = None
         self.reference_encodings = {}
         self.reference_names = []
+        self.gallery = FaceGallery()
+        self.encoding_cache = EncodingCache()
         self.processing = False
         self.processing_thread = None
         
@@ -20,10 +27,23 @@ class MLProcessor:
         self.confidence_threshold = 0.8
         self.nms_threshold = 0.4
         self.face_detection_model = 'yolov8n-face.pt'  # YOLOv8 face detection model
+        self.detection_width = 0  # downscale detector input to this width (0 = full resolution)
+        
+        # Recognition settings
+        self.recognition_tolerance = 0.6
+        self.top_k_candidates = 3
+        self.gallery_index_settings = None
+        self.enrollment_workers = 0  # 0 = all cores
         
+        # Settings first: enrolling reference images below already uses enrollment_workers
+        if settings:
+            self.update_settings(settings)
+            
         # Initialize models
         self.initialize_models()
-        self.load_reference_images()
+        # Detection-only instances (inference workers) never read or rewrite the shared gallery cache
+        if load_gallery:
+            self.load_reference_images()
         
     def initialize_models(self):
         """Initialize ML models"""
@@ -61,33 +81,96 @@ class MLProcessor:
             
         print("Loading reference images...")
         
-        for filename in os.listdir(reference_dir):
-            if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
-                faculty_name = os.path.splitext(filename)[0]
-                image_path = os.path.join(reference_dir, filename)
-                
-                try:
-                    # Load and process reference image
-                    image = cv2.imread(image_path)
-                    if image is not None:
-                        # Convert BGR to RGB for face_recognition
-                        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                        
-                        # Get face encodings
-                        face_encodings = face_recognition.face_encodings(rgb_image)
-                        
-                        if len(face_encodings) > 0:
-                            # Use the first face found
-                            self.reference_encodings[faculty_name] = face_encodings[0]
-                            self.reference_names.append(faculty_name)
-                            print(f"Loaded reference image for {faculty_name}")
-                        else:
-                            print(f"No face found in reference image for {faculty_name}")
-                            
-                except Exception as e:
-                    print(f"Error loading reference image for {faculty_name}: {e}")
+        self.encoding_cache.load()
+        
+        image_files = sorted(
+            filename for filename in os.listdir(reference_dir)
+            if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))
+        )
+        self.encoding_cache.prune(set(image_files))
+        
+        loaded = {}
+        pending = []
+        
+        for filename in image_files:
+            faculty_name = os.path.splitext(filename)[0]
+            image_path = os.path.join(reference_dir, filename)
+            
+            try:
+                # Reuse the cached encoding when the image is unchanged
+                cached = self.encoding_cache.lookup(filename, image_path)
+                if cached is not None:
+                    encoding = cached['encoding']
+                else:
+                    encoding = self.load_legacy_encoding(faculty_name, image_path)
+                    if encoding is None:
+                        pending.append((filename, faculty_name, image_path))
+                        continue
+                    self.encoding_cache.update(filename, faculty_name, image_path, encoding)
                     
-        print(f"Loaded {len(self.reference_encodings)} reference images")
+                if encoding is not None:
+                    loaded[faculty_name] = encoding
+                    
+            except Exception as e:
+                print(f"Error loading reference image for {faculty_name}: {e}")
+                
+        cached_count = len(loaded)
+        
+        # Encode new or changed images across all cores
+        if pending:
+            print(f"Encoding {len(pending)} new or changed reference images...")
+            summary = enroll_images(self.encoding_cache, pending, self.enrollment_workers, print_progress)
+            loaded.update(summary['enrolled'])
+            
+        if self.encoding_cache.dirty:
+            self.encoding_cache.save()
+            
+        self.merge_reference_encodings(loaded)
+        
+        print(f"Loaded {len(self.reference_encodings)} reference images "
+              f"({len(loaded) - cached_count} encoded, {cached_count} from cache)")
+        
+    def merge_reference_encodings(self, encodings):
+        """Merge {faculty_name: encoding} into the in-memory gallery"""
+        for faculty_name, encoding in encodings.items():
+            self.reference_encodings[faculty_name] = encoding
+            if faculty_name not in self.reference_names:
+                self.reference_names.append(faculty_name)
+        self.gallery.add_many(list(encodings.keys()), list(encodings.values()))
+        
+    def enroll_reference_images(self, image_paths, workers=None, progress_callback=print_progress):
+        """Bulk-enroll image files in parallel; returns a summary of enrolled, no-face and failed images"""
+        try:
+            reference_dir = "reference_images"
+            images = [(os.path.splitext(os.path.basename(path))[0], path) for path in image_paths]
+            items = copy_into_reference_dir(images, reference_dir)
+            
+            if workers is None:
+                workers = self.enrollment_workers
+            summary = enroll_images(self.encoding_cache, items, workers, progress_callback)
+            
+            self.encoding_cache.save()
+            self.merge_reference_encodings(summary['enrolled'])
+            
+            print(f"Enrolled {len(summary['enrolled'])} reference images "
+                  f"({len(summary['no_face'])} without a face, {len(summary['failed'])} failed)")
+            return summary
+            
+        except Exception as e:
+            print(f"Error enrolling reference images: {e}")
+            return {'enrolled': {}, 'no_face': [], 'failed': {}}
+            
+    def load_legacy_encoding(self, faculty_name, image_path):
+        """Read a per-image <name>_encoding.npy if it is newer than the image"""
+        encoding_file = os.path.join(os.path.dirname(image_path), f"{faculty_name}_encoding.npy")
+        
+        try:
+            if os.path.exists(encoding_file) and os.path.getmtime(encoding_file) >= os.path.getmtime(image_path):
+                return np.load(encoding_file)
+        except Exception as e:
+            print(f"Error reading encoding file for {faculty_name}: {e}")
+            
+        return None
         
     def process_reference_image(self, faculty_name, image_path):
         """Process and save reference image for faculty member"""
@@ -125,11 +208,16 @@ class MLProcessor:
             self.reference_encodings[faculty_name] = face_encoding
             if faculty_name not in self.reference_names:
                 self.reference_names.append(faculty_name)
+            self.gallery.add(faculty_name, face_encoding)
                 
             # Save encoding to file for persistence
             encoding_file = os.path.join(reference_dir, f"{faculty_name}_encoding.npy")
             np.save(encoding_file, face_encoding)
             
+            # Keep the consolidated cache in sync so the next start skips this image
+            self.encoding_cache.update(f"{faculty_name}.jpg", faculty_name, output_path, face_encoding)
+            self.encoding_cache.save()
+            
             print(f"Reference image processed successfully for {faculty_name}")
             return True
             
@@ -149,31 +237,54 @@ class MLProcessor:
             detected_faces = []
             
             for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # Get bounding box coordinates
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        confidence = box.conf[0].cpu().numpy()
-                        
-                        # Convert to integers
-                        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                        
-                        # Extract face region
-                        face_region = frame[y1:y2, x1:x2]
-                        
-                        detected_faces.append({
-                            'bbox': (x1, y1, x2-x1, y2-y1),  # (x, y, width, height)
-                            'confidence': float(confidence),
-                            'face_region': face_region
-                        })
-                        
+                detected_faces.extend(self.parse_yolo_result(result, frame))
+                
             return detected_faces
             
         except Exception as e:
             print(f"Error in YOLOv8 face detection: {e}")
             return []
             
+    def detect_faces_yolo_batch(self, frames):
+        """Detect faces in several frames with a single YOLOv8 call"""
+        try:
+            if self.yolo_model is None or len(frames) == 0:
+                return [[] for _ in frames]
+                
+            # One inference call for the whole batch; results come back in input order
+            results = self.yolo_model(list(frames), conf=self.confidence_threshold, iou=self.nms_threshold)
+            
+            return [self.parse_yolo_result(result, frame) for result, frame in zip(results, frames)]
+            
+        except Exception as e:
+            print(f"Error in batched YOLOv8 face detection: {e}")
+            return [[] for _ in frames]
+            
+    def parse_yolo_result(self, result, frame):
+        """Convert one YOLOv8 result into detected face dicts"""
+        detected_faces = []
+        
+        boxes = result.boxes
+        if boxes is not None:
+            for box in boxes:
+                # Get bounding box coordinates
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                confidence = box.conf[0].cpu().numpy()
+                
+                # Convert to integers
+                x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+                
+                # Extract face region
+                face_region = frame[y1:y2, x1:x2]
+                
+                detected_faces.append({
+                    'bbox': (x1, y1, x2-x1, y2-y1),  # (x, y, width, height)
+                    'confidence': float(confidence),
+                    'face_region': face_region
+                })
+                
+        return detected_faces
+        
     def detect_faces_opencv(self, frame):
         """Detect faces using OpenCV Haar Cascade (fallback)"""
         try:
@@ -211,109 +322,211 @@ class MLProcessor:
     def recognize_faces(self, frame, face_locations):
         """Recognize faces using face_recognition library"""
         try:
-            if len(self.reference_encodings) == 0:
+            if len(self.gallery) == 0:
                 return []
                 
-            # Convert frame to RGB
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Convert face locations to face_recognition format
-            face_locations_rgb = []
-            for (x, y, w, h) in face_locations:
-                # Convert (x, y, w, h) to (top, right, bottom, left)
-                top, right, bottom, left = y, x + w, y + h, x
-                face_locations_rgb.append((top, right, bottom, left))
-                
-            # Get face encodings for detected faces
-            face_encodings = face_recognition.face_encodings(rgb_frame, face_locations_rgb)
-            
-            recognized_faces = []
-            
-            for i, face_encoding in enumerate(face_encodings):
-                # Compare with reference encodings
-                matches = face_recognition.compare_faces(
-                    list(self.reference_encodings.values()),
-                    face_encoding,
-                    tolerance=0.6
-                )
-                
-                name = "Unknown"
-                confidence = 0.0
-                
-                # Calculate face distances
-                face_distances = face_recognition.face_distance(
-                    list(self.reference_encodings.values()),
-                    face_encoding
-                )
-                
-                if len(face_distances) > 0:
-                    best_match_index = np.argmin(face_distances)
-                    
-                    if matches[best_match_index]:
-                        name = self.reference_names[best_match_index]
-                        # Convert distance to confidence (lower distance = higher confidence)
-                        confidence = 1.0 - face_distances[best_match_index]
-                        
-                recognized_faces.append({
-                    'name': name,
-                    'confidence': confidence,
-                    'bbox': face_locations[i]
-                })
-                
-            return recognized_faces
+            return self.match_faces(face_locations, self.encode_faces(frame, face_locations))
             
         except Exception as e:
             print(f"Error in face recognition: {e}")
             return []
             
+    def encode_faces(self, frame, face_locations):
+        """Encode each face from its own full-resolution crop; None where no encoding came out"""
+        return [self.encode_face(frame, bbox) for bbox in face_locations]
+        
+    def match_faces(self, face_locations, face_encodings):
+        """Match per-face encodings (None = not encodable) against the gallery"""
+        recognized_faces = [{
+            'name': 'Unknown',
+            'confidence': 0.0,
+            'bbox': bbox,
+            'candidates': []
+        } for bbox in face_locations]
+        
+        encoded_indices = [i for i, encoding in enumerate(face_encodings) if encoding is not None]
+        if not encoded_indices or len(self.gallery) == 0:
+            return recognized_faces
+            
+        # Score every probe against the whole gallery in one batched computation
+        started = stage_metrics.start()
+        matches = self.gallery.search(
+            [face_encodings[i] for i in encoded_indices],
+            tolerance=self.recognition_tolerance,
+            top_k=self.top_k_candidates
+        )
+        stage_metrics.observe('matching', started)
+        
+        for i, match in zip(encoded_indices, matches):
+            recognized_faces[i].update({
+                'name': match['name'],
+                'confidence': match['confidence'],
+                'candidates': match['candidates']
+            })
+            
+        return recognized_faces
+        
+    def encode_face(self, frame, bbox, margin=0.1):
+        """Encode one face; only a small crop around it is converted to RGB"""
+        height, width = frame.shape[:2]
+        x, y, w, h = (int(v) for v in bbox)
+        
+        # A little context around the box keeps the landmark predictor happy
+        pad_x, pad_y = int(w * margin), int(h * margin)
+        left, top = max(0, x - pad_x), max(0, y - pad_y)
+        right, bottom = min(width, x + w + pad_x), min(height, y + h + pad_y)
+        if right <= left or bottom <= top:
+            return None
+            
+        started = stage_metrics.start()
+        rgb_crop = cv2.cvtColor(frame[top:bottom, left:right], cv2.COLOR_BGR2RGB)
+        stage_metrics.observe('color_conversion', started)
+        
+        # Face location relative to the crop, as (top, right, bottom, left)
+        location = (y - top, x + w - left, y + h - top, x - left)
+        started = stage_metrics.start()
+        encodings = face_recognition.face_encodings(rgb_crop, [location])
+        stage_metrics.observe('encoding', started)
+        stage_metrics.increment('faces_encoded_total')
+        return encodings[0] if encodings else None
+        
     def process_frame(self, frame):
         """Process a frame and return detections"""
         try:
             if frame is None:
                 return []
                 
-            # Detect faces
-            if self.yolo_model is not None:
-                detected_faces = self.detect_faces_yolo(frame)
-            else:
-                detected_faces = self.detect_faces_opencv(frame)
-                
+            detected_faces = self.detect_faces(frame)
+            
             if len(detected_faces) == 0:
                 return []
                 
-            # Extract face locations for recognition
-            face_locations = [face['bbox'] for face in detected_faces]
-            
-            # Recognize faces
-            recognized_faces = self.recognize_faces(frame, face_locations)
-            
-            # Combine detection and recognition results
-            results = []
-            for i, detection in enumerate(detected_faces):
-                if i < len(recognized_faces):
-                    recognition = recognized_faces[i]
-                    result = {
-                        'name': recognition['name'],
-                        'confidence': recognition['confidence'],
-                        'bbox': detection['bbox'],
-                        'detection_confidence': detection['confidence']
-                    }
-                else:
-                    result = {
-                        'name': 'Unknown',
-                        'confidence': 0.0,
-                        'bbox': detection['bbox'],
-                        'detection_confidence': detection['confidence']
-                    }
-                    
-                results.append(result)
-                
-            return results
+            return self.recognize_detections(frame, detected_faces)
             
         except Exception as e:
             print(f"Error processing frame: {e}")
             return []
             
+    def detect_faces(self, frame, regions=None):
+        """Detect faces with the active detector, only inside regions of interest if given"""
+        return self.detect_faces_batch([frame], [regions])[0]
+        
+    def detect_faces_batch(self, frames, regions=None):
+        """Detect faces in a batch of frames, returning one list of full-resolution boxes per frame"""
+        if regions is None:
+            regions = [None] * len(frames)
+            
+        started = stage_metrics.start()
+        
+        # Every region of every frame becomes one detector input
+        views = []
+        for frame_index, (frame, frame_regions) in enumerate(zip(frames, regions)):
+            for view in self.detection_views(frame, frame_regions):
+                views.append((frame_index,) + view)
+                
+        images = [view[1] for view in views]
+        if self.yolo_model is not None:
+            results = self.detect_faces_yolo_batch(images)
+        else:
+            results = [self.detect_faces_opencv(image) for image in images]
+            
+        detected_faces = [[] for _ in frames]
+        for (frame_index, _, x_offset, y_offset, scale), faces in zip(views, results):
+            detected_faces[frame_index].extend(
+                self.map_detections(faces, frames[frame_index], x_offset, y_offset, scale)
+            )
+            
+        stage_metrics.observe('detection', started)
+        stage_metrics.increment('frames_detected_total', len(frames))
+        return detected_faces
+        
+    def detection_views(self, frame, regions=None):
+        """Detector inputs for a frame as (image, x_offset, y_offset, scale).
+        
+        Regions are (x, y, width, height) in frame pixels and should not overlap. Crops are views
+        into the frame; only regions wider than detection_width are resized (one small copy each).
+        """
+        height, width = frame.shape[:2]
+        views = []
+        
+        for (x, y, w, h) in (regions or [(0, 0, width, height)]):
+            left, top = max(0, int(x)), max(0, int(y))
+            right, bottom = min(width, int(x + w)), min(height, int(y + h))
+            if right <= left or bottom <= top:
+                continue
+                
+            image = frame[top:bottom, left:right]
+            scale = 1.0
+            if self.detection_width and right - left > self.detection_width:
+                scale = self.detection_width / (right - left)
+                size = (self.detection_width, max(1, int(round((bottom - top) * scale))))
+                image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+                
+            views.append((image, left, top, scale))
+            
+        return views
+        
+    def map_detections(self, faces, frame, x_offset, y_offset, scale):
+        """Map boxes found on a detector input back to full-resolution frame coordinates"""
+        mapped = []
+        for face in faces:
+            x, y, w, h = face['bbox']
+            x = x_offset + int(round(x / scale))
+            y = y_offset + int(round(y / scale))
+            w = int(round(w / scale))
+            h = int(round(h / scale))
+            
+            mapped.append({
+                'bbox': (x, y, w, h),
+                'confidence': face['confidence'],
+                'face_region': frame[y:y+h, x:x+w]
+            })
+        return mapped
+        
+    def recognize_detections(self, frame, detected_faces):
+        """Recognize detected faces and combine detection and recognition results"""
+        # Extract face locations for recognition
+        face_locations = [face['bbox'] for face in detected_faces]
+        
+        # Recognize faces
+        recognized_faces = self.recognize_faces(frame, face_locations)
+        return self.combine_recognitions(detected_faces, recognized_faces)
+        
+    def recognize_encoded(self, detected_faces, face_encodings):
+        """recognize_detections for faces encoded elsewhere (an inference worker), against this gallery"""
+        try:
+            recognized_faces = self.match_faces([face['bbox'] for face in detected_faces], face_encodings)
+        except Exception as e:
+            print(f"Error in face recognition: {e}")
+            recognized_faces = []
+        return self.combine_recognitions(detected_faces, recognized_faces)
+        
+    def combine_recognitions(self, detected_faces, recognized_faces):
+        """Combine detection and recognition results"""
+        results = []
+        for i, detection in enumerate(detected_faces):
+            if i < len(recognized_faces):
+                recognition = recognized_faces[i]
+                result = {
+                    'name': recognition['name'],
+                    'confidence': recognition['confidence'],
+                    'bbox': detection['bbox'],
+                    'detection_confidence': detection['confidence'],
+                    'candidates': recognition.get('candidates', [])
+                }
+            else:
+                result = {
+                    'name': 'Unknown',
+                    'confidence': 0.0,
+                    'bbox': detection['bbox'],
+                    'detection_confidence': detection['confidence'],
+                    'candidates': []
+                }
+                
+            results.append(result)
+            
+        return results
+        
     def draw_detections(self, frame, detections):
         """Draw detection results on frame"""
         try:
@@ -368,18 +581,47 @@ class MLProcessor:
         try:
             self.confidence_threshold = settings.get('confidence_threshold', 0.8)
             self.nms_threshold = settings.get('nms_threshold', 0.4)
+            self.detection_width = settings.get('detection_width', 0)
+            self.recognition_tolerance = settings.get('recognition_tolerance', 0.6)
+            self.top_k_candidates = settings.get('top_k_candidates', 3)
+            self.enrollment_workers = settings.get('enrollment_workers', 0)
+            self.configure_gallery_index(settings)
             
             print(f"ML settings updated - Confidence: {self.confidence_threshold}, NMS: {self.nms_threshold}")
             
         except Exception as e:
             print(f"Error updating ML settings: {e}")
             
+    def configure_gallery_index(self, settings):
+        """Select the gallery search backend and its recall/latency knobs"""
+        index_settings = {
+            'index_type': settings.get('gallery_index', 'exact'),
+            'nlist': settings.get('ivf_nlist', 0),
+            'nprobe': settings.get('ivf_nprobe', 8),
+            'min_gallery_size': settings.get('ivf_min_gallery_size', 1000)
+        }
+        
+        # Rebuilding the index retrains it, so only do it when something changed
+        if index_settings == self.gallery_index_settings:
+            return
+            
+        self.gallery.configure_index(
+            index_settings['index_type'],
+            nlist=index_settings['nlist'],
+            nprobe=index_settings['nprobe'],
+            min_gallery_size=index_settings['min_gallery_size']
+        )
+            
+        self.gallery_index_settings = index_settings
+        print(f"Gallery index set to {index_settings['index_type']}")
+        
     def get_model_info(self):
         """Get information about loaded models"""
         info = {
             'face_detection': 'YOLOv8' if self.yolo_model else 'OpenCV Haar Cascade',
             'face_recognition': 'face_recognition library',
             'reference_images': len(self.reference_encodings),
+            'gallery_index': (self.gallery_index_settings or {}).get('index_type', 'exact'),
             'confidence_threshold': self.confidence_threshold,
             'nms_threshold': self.nms_threshold
         }
@@ -398,6 +640,8 @@ class MLProcessor:
             if faculty_name in self.reference_names:
                 self.reference_names.remove(faculty_name)
                 
+            self.gallery.remove(faculty_name)
+                
             # Remove files
             reference_dir = "reference_images"
             image_file = os.path.join(reference_dir, f"{faculty_name}.jpg")
@@ -409,6 +653,9 @@ class MLProcessor:
             if os.path.exists(encoding_file):
                 os.remove(encoding_file)
                 
+            if self.encoding_cache.remove(f"{faculty_name}.jpg"):
+                self.encoding_cache.save()
+                
             print(f"Reference image removed for {faculty_name}")
             return True
             
@@ -0,0 +1,94 @@
+import time
+
+import cv2
+import numpy as np
+
+class MotionGate:
+    def __init__(self, motion_threshold=0.01, pixel_threshold=25, max_skip_interval=2.0,
+                 downscale_width=160, learning_rate=0.05):
+        # Fraction of changed pixels needed to run detection (lower = more sensitive)
+        self.motion_threshold = motion_threshold
+        # Per-pixel grey-level change that counts as "changed"
+        self.pixel_threshold = pixel_threshold
+        # Run detection at least this often even on a static scene (seconds)
+        self.max_skip_interval = max_skip_interval
+        self.downscale_width = downscale_width
+        self.learning_rate = learning_rate
+        
+        # source_id -> background model and counters; each source is fed by one camera thread
+        self.states = {}
+        
+    def update_settings(self, settings):
+        """Update gate thresholds"""
+        self.motion_threshold = settings.get('motion_threshold', 0.01)
+        self.pixel_threshold = settings.get('pixel_threshold', 25)
+        self.max_skip_interval = settings.get('max_skip_seconds', 2.0)
+        self.downscale_width = settings.get('downscale_width', 160)
+        self.states = {}
+        
+    def prepare(self, frame):
+        """Downscaled, blurred greyscale copy used for differencing"""
+        height, width = frame.shape[:2]
+        if width > self.downscale_width:
+            scale = self.downscale_width / width
+            frame = cv2.resize(frame, (self.downscale_width, max(1, int(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+                               
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(frame, (5, 5), 0)
+        
+    def should_process(self, frame, source_id='default', now=None):
+        """Return True if the frame differs enough from the background to be worth detecting on"""
+        now = time.time() if now is None else now
+        small = self.prepare(frame)
+        
+        state = self.states.get(source_id)
+        if state is None or state['background'].shape != small.shape:
+            self.states[source_id] = {
+                'background': small.astype(np.float32),
+                'last_processed': now,
+                'motion': 1.0,
+                'processed': 1,
+                'skipped': 0
+            }
+            return True
+            
+        # Compare against a running-average background so slow lighting drift is absorbed
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(state['background']))
+        motion = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+        cv2.accumulateWeighted(small, state['background'], self.learning_rate)
+        state['motion'] = motion
+        
+        if motion >= self.motion_threshold or now - state['last_processed'] >= self.max_skip_interval:
+            state['last_processed'] = now
+            state['processed'] += 1
+            return True
+            
+        state['skipped'] += 1
+        return False
+        
+    def get_stats(self):
+        """Frames processed versus skipped, overall and per source"""
+        sources = {}
+        processed = 0
+        skipped = 0
+        
+        for source_id, state in list(self.states.items()):
+            total = state['processed'] + state['skipped']
+            sources[source_id] = {
+                'processed': state['processed'],
+                'skipped': state['skipped'],
+                'skip_ratio': state['skipped'] / total if total else 0.0,
+                'motion': state['motion']
+            }
+            processed += state['processed']
+            skipped += state['skipped']
+            
+        total = processed + skipped
+        return {
+            'processed': processed,
+            'skipped': skipped,
+            'skip_ratio': skipped / total if total else 0.0,
+            'sources': sources
+        }
@@ -0,0 +1,789 @@
+import threading
+import time
+from collections import deque
+
+from frame_ring import FrameCursor
+
+DROP_OLDEST = 'drop_oldest'
+LATEST_ONLY = 'latest_only'
+# Lossless backpressure for replays and benchmarks: producers wait for room
+BLOCK = 'block'
+
+class BoundedQueue:
+    def __init__(self, name, capacity=2, drop_policy=DROP_OLDEST, release=None):
+        if drop_policy == LATEST_ONLY:
+            # Keep only the newest item; a put replaces whatever is waiting
+            capacity = 1
+        elif drop_policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+            
+        self.name = name
+        self.capacity = max(1, int(capacity))
+        self.drop_policy = drop_policy
+        # Called with every item the queue discards, so its owner can free what the item holds
+        self.release = release
+        self.items = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        
+        # Counters
+        self.put_count = 0
+        self.get_count = 0
+        self.dropped_count = 0
+        
+    def put(self, item):
+        """Enqueue without blocking the producer (unless the policy is BLOCK); drops the oldest item when full"""
+        with self.condition:
+            if self.drop_policy == BLOCK:
+                self.wait_for_room(self.items)
+                
+            if len(self.items) >= self.capacity:
+                self.discard(self.items.popleft())
+                self.dropped_count += 1
+                
+            self.items.append(item)
+            self.put_count += 1
+            # notify_all: under BLOCK, producers wait on the same condition as the consumer
+            self.condition.notify_all()
+            
+    def get(self, timeout=None):
+        """Dequeue the oldest item, or None on timeout/close"""
+        with self.condition:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            
+            while self.pending() == 0 and not self.closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+                
+            if self.pending() == 0:
+                return None
+                
+            self.get_count += 1
+            item = self.pop_item()
+            if self.drop_policy == BLOCK:
+                self.condition.notify_all()
+            return item
+            
+    def wait_for_room(self, items):
+        """BLOCK policy: wait until items has room or the queue closes; caller holds the condition"""
+        while len(items) >= self.capacity and not self.closed:
+            self.condition.wait(0.5)
+            
+    def pending(self):
+        """Number of queued items; caller holds the condition"""
+        return len(self.items)
+        
+    def pop_item(self):
+        """Remove the next item; caller holds the condition"""
+        return self.items.popleft()
+        
+    def discard(self, item):
+        """Hand a dropped item to the release callback"""
+        if self.release is not None:
+            self.release(item)
+            
+    def clear(self):
+        """Drop every pending item"""
+        with self.condition:
+            while self.items:
+                self.discard(self.items.popleft())
+                
+    def close(self):
+        """Wake up any waiting consumer"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+            
+    def reopen(self):
+        """Clear pending items and accept new ones again"""
+        with self.condition:
+            self.clear()
+            self.closed = False
+            
+    def __len__(self):
+        with self.condition:
+            return len(self.items)
+            
+    def get_stats(self):
+        """Get queue depth and counters"""
+        with self.condition:
+            return {
+                'depth': len(self.items),
+                'capacity': self.capacity,
+                'drop_policy': self.drop_policy,
+                'put': self.put_count,
+                'get': self.get_count,
+                'dropped': self.dropped_count
+            }
+
+class FairQueue(BoundedQueue):
+    """Per-source bounded queues served round-robin, so no stream can starve the others"""
+    
+    def __init__(self, name, capacity=2, drop_policy=DROP_OLDEST, release=None):
+        super().__init__(name, capacity, drop_policy, release)
+        
+        # source_id -> deque of items; capacity and drop policy apply per source
+        self.source_items = {}
+        self.source_counters = {}
+        # Sources with pending items, in service order
+        self.ready = deque()
+        self.total = 0
+        
+    def put(self, item):
+        """Enqueue into the item's source queue; drops that source's oldest item when full"""
+        source_id = item.get('source_id')
+        
+        with self.condition:
+            items = self.source_items.get(source_id)
+            if items is None:
+                items = self.source_items[source_id] = deque()
+                self.source_counters[source_id] = {'put': 0, 'dropped': 0}
+            counters = self.source_counters[source_id]
+            
+            if self.drop_policy == BLOCK:
+                self.wait_for_room(items)
+                if self.source_items.get(source_id) is not items:
+                    # Source removed while waiting
+                    self.discard(item)
+                    return
+                    
+            if len(items) >= self.capacity:
+                self.discard(items.popleft())
+                self.total -= 1
+                self.dropped_count += 1
+                counters['dropped'] += 1
+            elif not items:
+                self.ready.append(source_id)
+                
+            items.append(item)
+            self.total += 1
+            self.put_count += 1
+            counters['put'] += 1
+            self.condition.notify_all()
+            
+    def pending(self):
+        return self.total
+        
+    def pop_item(self):
+        source_id = self.ready.popleft()
+        items = self.source_items[source_id]
+        item = items.popleft()
+        self.total -= 1
+        
+        # Back of the line if it still has work
+        if items:
+            self.ready.append(source_id)
+        return item
+        
+    def remove_source(self, source_id):
+        """Discard a source's pending items and counters"""
+        with self.condition:
+            items = self.source_items.pop(source_id, None)
+            self.source_counters.pop(source_id, None)
+            if items:
+                self.total -= len(items)
+                self.ready.remove(source_id)
+                for item in items:
+                    self.discard(item)
+                    
+    def clear(self):
+        with self.condition:
+            for items in self.source_items.values():
+                while items:
+                    self.discard(items.popleft())
+            self.ready.clear()
+            self.total = 0
+            
+    def reopen(self):
+        with self.condition:
+            self.clear()
+            self.closed = False
+            
+    def __len__(self):
+        with self.condition:
+            return self.total
+            
+    def get_stats(self):
+        """Get queue counters plus per-source backlog and drops"""
+        with self.condition:
+            return {
+                'depth': self.total,
+                'capacity': self.capacity,
+                'drop_policy': self.drop_policy,
+                'put': self.put_count,
+                'get': self.get_count,
+                'dropped': self.dropped_count,
+                'sources': {
+                    source_id: {
+                        'backlog': len(items),
+                        'put': self.source_counters[source_id]['put'],
+                        'dropped': self.source_counters[source_id]['dropped']
+                    }
+                    for source_id, items in self.source_items.items()
+                }
+            }
+
+class RateMeter:
+    """Exponentially weighted event rate and duration, O(1) per event"""
+    
+    def __init__(self, smoothing=0.1):
+        self.smoothing = smoothing
+        self.count = 0
+        self.last_time = None
+        self.interval = None
+        self.duration = None
+        
+    def record(self, duration=None, now=None):
+        now = time.perf_counter() if now is None else now
+        if self.last_time is not None:
+            interval = now - self.last_time
+            self.interval = interval if self.interval is None else \
+                self.interval + self.smoothing * (interval - self.interval)
+        if duration is not None:
+            self.duration = duration if self.duration is None else \
+                self.duration + self.smoothing * (duration - self.duration)
+        self.last_time = now
+        self.count += 1
+        
+    def get_stats(self):
+        return {
+            'count': self.count,
+            'fps': (1.0 / self.interval) if self.interval else 0.0,
+            'avg_ms': (self.duration * 1000.0) if self.duration is not None else 0.0
+        }
+
+class PipelineStage:
+    def __init__(self, name, handler, input_queue, output_queue=None, release=None):
+        self.name = name
+        self.handler = handler
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        # Called with every item that ends here: failed, or consumed without a result to pass on
+        self.release = release
+        self.running = False
+        self.thread = None
+        self.meter = RateMeter()
+        self.errors = 0
+        
+    def start(self):
+        """Start the stage worker thread"""
+        if not self.running:
+            self.input_queue.reopen()
+            self.running = True
+            self.thread = threading.Thread(target=self.run, name=f"pipeline-{self.name}", daemon=True)
+            self.thread.start()
+            
+    def stop(self):
+        """Stop the stage worker thread"""
+        if self.running:
+            self.running = False
+            self.input_queue.close()
+            if self.thread and self.thread.is_alive():
+                self.thread.join(timeout=2.0)
+                
+    def run(self):
+        """Take items from the input queue, process them and pass results on"""
+        while self.running:
+            item = self.input_queue.get(timeout=0.5)
+            if item is None:
+                continue
+                
+            start = time.perf_counter()
+            try:
+                result = self.handler(item)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error in {self.name} stage: {e}")
+                self.discard(item)
+                continue
+                
+            self.meter.record(time.perf_counter() - start)
+            
+            if result is None:
+                self.discard(item)
+            elif self.output_queue is not None:
+                self.output_queue.put(result)
+                
+    def discard(self, item):
+        """Hand an item that goes no further to the release callback"""
+        if self.release is not None:
+            self.release(item)
+            
+    def get_stats(self):
+        """Get stage throughput, latency and input queue counters"""
+        stats = self.meter.get_stats()
+        stats['errors'] = self.errors
+        stats['queue'] = self.input_queue.get_stats()
+        return stats
+
+class BatchingStage(PipelineStage):
+    """Stage that gathers up to max_batch_size items (or waits max_wait seconds) per handler call"""
+    
+    def __init__(self, name, handler, input_queue, output_queue=None, max_batch_size=4, max_wait=0.01,
+                 release=None):
+        super().__init__(name, handler, input_queue, output_queue, release)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait)
+        self.batch_meter = RateMeter()
+        self.batch_size = None
+        
+    def collect_batch(self):
+        """Block for the first item, then top the batch up until it is full or the wait expires"""
+        first = self.input_queue.get(timeout=0.5)
+        if first is None:
+            return []
+            
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size and self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            item = self.input_queue.get(timeout=remaining)
+            if item is None:
+                break
+            batch.append(item)
+            
+        return batch
+        
+    def run(self):
+        """Process items in batches and pass each result on individually"""
+        while self.running:
+            batch = self.collect_batch()
+            if not batch:
+                continue
+                
+            start = time.perf_counter()
+            try:
+                results = self.handler(batch)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error in {self.name} stage: {e}")
+                for item in batch:
+                    self.discard(item)
+                continue
+                
+            elapsed = time.perf_counter() - start
+            self.batch_meter.record(elapsed)
+            self.batch_size = len(batch) if self.batch_size is None else \
+                self.batch_size + self.meter.smoothing * (len(batch) - self.batch_size)
+                
+            # Amortized per-frame latency
+            now = time.perf_counter()
+            for _ in batch:
+                self.meter.record(elapsed / len(batch), now)
+                
+            for item, result in zip(batch, results):
+                if result is None:
+                    self.discard(item)
+                elif self.output_queue is not None:
+                    self.output_queue.put(result)
+                        
+    def get_stats(self):
+        """Get stage stats plus achieved batch size and per-batch latency"""
+        stats = super().get_stats()
+        stats['batch_size'] = self.batch_size or 0.0
+        stats['max_batch_size'] = self.max_batch_size
+        stats['batch_ms'] = self.batch_meter.get_stats()['avg_ms']
+        return stats
+
+class WorkerPoolStage(PipelineStage):
+    """Stage that hands frames to an InferenceWorkerPool and forwards results as they complete"""
+    
+    def __init__(self, name, pool, input_queue, output_queue=None, recognize=False, release=None):
+        super().__init__(name, None, input_queue, output_queue, release)
+        self.pool = pool
+        # Encode faces in the workers too (used when no tracker needs to decide per face)
+        self.recognize = recognize
+        
+    def start(self):
+        if not self.running:
+            self.pool.start()
+        super().start()
+        
+    def stop(self):
+        super().stop()
+        self.pool.stop()
+        
+    def run(self):
+        """Submit packets while slots are free; a full pool leaves the drop policy to the input queue"""
+        while self.running:
+            packet = self.input_queue.get(timeout=0.5)
+            if packet is None:
+                continue
+                
+            submitted = False
+            while self.running and not submitted:
+                submitted = self.pool.submit(packet['frame'], packet['regions'], self.recognize,
+                                             self.make_callback(packet))
+                if not submitted and (not self.pool.running or packet['frame'].nbytes > self.pool.slot_bytes):
+                    self.errors += 1
+                    break
+            if not submitted:
+                self.discard(packet)
+                
+    def make_callback(self, packet):
+        """Result handler for one packet; runs on the pool's result thread"""
+        submitted_at = time.perf_counter()
+        
+        def on_result(detected_faces, face_encodings, error):
+            if error is not None:
+                self.errors += 1
+                self.discard(packet)
+                return
+                
+            # Workers return boxes only; crops are re-sliced from the frame this process holds
+            # (still pinned in its ring slot, so it is the frame the worker saw)
+            frame = packet['frame']
+            for face in detected_faces:
+                x, y, w, h = face['bbox']
+                face['face_region'] = frame[y:y+h, x:x+w]
+            packet['detected_faces'] = detected_faces
+            if face_encodings is not None:
+                # Matched in the recognition stage, against the gallery this process keeps current
+                packet['face_encodings'] = face_encodings
+                
+            # Amortized over the workers, like a batch, so it reads as the stage's per-frame cost
+            self.meter.record((time.perf_counter() - submitted_at) / self.pool.workers)
+            if self.output_queue is not None:
+                self.output_queue.put(packet)
+        return on_result
+        
+    def get_stats(self):
+        """Get stage stats plus worker pool counters"""
+        stats = super().get_stats()
+        stats['workers'] = self.pool.get_stats()
+        return stats
+
+class MonitoringPipeline:
+    def __init__(self, camera_monitor, ml_processor, sink, queue_size=2, drop_policy=DROP_OLDEST,
+                 detection_batch_size=1, detection_batch_wait=0.01, motion_gate=None, tracker=None,
+                 scheduler=None, worker_pool=None):
+        if scheduler is not None and tracker is None:
+            raise ValueError("Detecting every N frames needs a face tracker to fill the gaps")
+            
+        self.ml_processor = ml_processor
+        self.sink = sink
+        self.motion_gate = motion_gate
+        self.tracker = tracker
+        self.scheduler = scheduler
+        self.running = False
+        
+        # source_id -> {'monitor', 'listener', 'stop_listener', 'meter', 'cursor', 'generation', 'delivered'}
+        self.sources = {}
+        self.sources_lock = threading.Lock()
+        
+        self.latency_meter = RateMeter()
+        self.in_flight = 0  # packets created and not yet released
+        self.stale_packets = 0  # propagated packets dropped at the sink for arriving after a newer one
+        self.in_flight_lock = threading.Lock()
+        
+        # capture -> detection -> recognition -> sink, each hop bounded.
+        # Every queue must hold a full detection batch, or a batch would evict its own frames.
+        # Detection is fed round-robin per source so one busy camera cannot starve the rest.
+        capacity = max(queue_size, detection_batch_size)
+        downstream_policy = drop_policy
+        if drop_policy == LATEST_ONLY:
+            # Only frames waiting for detection are cut to the newest one; a capacity-1 hop after
+            # the detector would evict its own batch, so later hops drop oldest at batch capacity
+            # (the same as latest_only when the batch is a single frame)
+            capacity = detection_batch_size
+            downstream_policy = DROP_OLDEST
+            
+        # Packets pin their frame's ring slot; every queue and stage unpins the ones it drops.
+        self.detection_queue = FairQueue('detection', queue_size, drop_policy, self.release)
+        self.recognition_queue = BoundedQueue('recognition', capacity, downstream_policy, self.release)
+        self.sink_queue = BoundedQueue('sink', capacity, downstream_policy, self.release)
+        self.queues = [self.detection_queue, self.recognition_queue, self.sink_queue]
+        
+        if worker_pool is not None:
+            # Detection (and, without a tracker, recognition) runs in worker processes
+            detection_stage = WorkerPoolStage('detection', worker_pool, self.detection_queue,
+                                              self.recognition_queue, recognize=tracker is None,
+                                              release=self.release)
+        elif detection_batch_size > 1:
+            detection_stage = BatchingStage('detection', self.detect_batch, self.detection_queue,
+                                            self.recognition_queue, detection_batch_size, detection_batch_wait,
+                                            release=self.release)
+        else:
+            detection_stage = PipelineStage('detection', self.detect, self.detection_queue, self.recognition_queue,
+                                            self.release)
+            
+        self.stages = [
+            detection_stage,
+            PipelineStage('recognition', self.recognize, self.recognition_queue, self.sink_queue, self.release),
+            # deliver() returns nothing, so the sink stage releases every packet it handles
+            PipelineStage('sink', self.deliver, self.sink_queue, release=self.release)
+        ]
+        
+        # Frames between detections bypass the detector: optical flow moves the tracked boxes
+        if scheduler is not None:
+            self.tracker.optical_flow = True
+            self.propagation_queue = FairQueue('propagation', queue_size, drop_policy, self.release)
+            self.queues.append(self.propagation_queue)
+            self.stages.append(PipelineStage('propagation', self.propagate, self.propagation_queue, self.sink_queue,
+                                             self.release))
+        
+        if camera_monitor is not None:
+            self.add_source('default', camera_monitor)
+            
+    def add_source(self, source_id, camera_monitor):
+        """Feed frames from another CameraMonitor into the shared stages"""
+        def listener(frame, timestamp, sequence):
+            self.on_frame(source_id, frame, timestamp, sequence)
+            
+        def stop_listener(camera_id):
+            self.on_source_stopped(source_id)
+            
+        with self.sources_lock:
+            if source_id in self.sources:
+                raise ValueError(f"Duplicate pipeline source: {source_id}")
+            self.sources[source_id] = {
+                'monitor': camera_monitor,
+                'listener': listener,
+                'stop_listener': stop_listener,
+                'meter': RateMeter(),
+                'cursor': FrameCursor(),
+                'generation': 0,  # bumped when the camera's sequence numbers restart (new ring)
+                'delivered': None  # (generation, sequence) of the newest packet handed to the sink
+            }
+            
+        # Size the ring for everything in flight, plus the slot being written and the latest one
+        required = self.frames_in_flight() + 2
+        if camera_monitor.ensure_frame_buffers(required):
+            print(f"Frame ring of {source_id} raised to {required} buffers to cover the pipeline's frames in flight")
+            
+        if self.running:
+            camera_monitor.add_frame_listener(listener)
+            camera_monitor.add_stop_listener(stop_listener)
+            
+    def remove_source(self, source_id):
+        """Stop feeding frames from a source"""
+        with self.sources_lock:
+            source = self.sources.pop(source_id, None)
+        if source is not None:
+            source['monitor'].remove_frame_listener(source['listener'])
+            source['monitor'].remove_stop_listener(source['stop_listener'])
+            self.detection_queue.remove_source(source_id)
+            if self.tracker is not None:
+                self.tracker.remove_source(source_id)
+            if self.scheduler is not None:
+                self.propagation_queue.remove_source(source_id)
+                self.scheduler.remove_source(source_id)
+        return source is not None
+        
+    def start(self):
+        """Start all stages and subscribe to camera frames"""
+        if self.running:
+            return
+            
+        self.running = True
+        for stage in self.stages:
+            stage.start()
+        with self.sources_lock:
+            sources = list(self.sources.values())
+        for source in sources:
+            source['monitor'].add_frame_listener(source['listener'])
+            source['monitor'].add_stop_listener(source['stop_listener'])
+        print("Monitoring pipeline started")
+        
+    def stop(self):
+        """Unsubscribe from the cameras and stop all stages"""
+        if not self.running:
+            return
+            
+        self.running = False
+        with self.sources_lock:
+            sources = list(self.sources.values())
+        for source in sources:
+            source['monitor'].remove_frame_listener(source['listener'])
+            source['monitor'].remove_stop_listener(source['stop_listener'])
+        for stage in self.stages:
+            stage.stop()
+        # Unpin whatever was still queued
+        for queue in self.queues:
+            queue.clear()
+        print("Monitoring pipeline stopped")
+        
+    def is_idle(self):
+        """Every packet taken from the cameras has been delivered or dropped"""
+        with self.in_flight_lock:
+            return self.in_flight == 0
+            
+    def frames_in_flight(self):
+        """Most frames of one source the pipeline can hold at once: queued, batched or being processed"""
+        detection = self.stages[0]
+        if isinstance(detection, WorkerPoolStage):
+            # Every worker slot, plus the packet waiting for one
+            processing = detection.pool.slot_count + 1
+        elif isinstance(detection, BatchingStage):
+            processing = detection.max_batch_size
+        else:
+            processing = 1
+        # One packet in each of the other stages, and one capture put waiting under BLOCK
+        processing += len(self.stages)
+        return sum(queue.capacity for queue in self.queues) + processing
+        
+    def release(self, packet):
+        """Unpin a packet's frame once it leaves the pipeline (delivered, dropped or failed)"""
+        if 'ring' not in packet:
+            return
+        ring = packet.pop('ring')
+        if ring is not None:
+            ring.release(packet['frame_id'])
+        with self.in_flight_lock:
+            self.in_flight -= 1
+        
+    def on_frame(self, source_id, frame, timestamp, sequence):
+        """Capture stage: runs on the source's camera thread, so it only enqueues"""
+        source = self.sources.get(source_id)
+        if source is None:
+            return
+            
+        # Each source is fed by exactly one camera thread, so its counters need no lock
+        if sequence < source['cursor'].last_sequence:
+            source['generation'] += 1
+        if not source['cursor'].advance(sequence):
+            return
+        source['meter'].record()
+        
+        # Cheap pre-filter: static scenes never reach the detector
+        if self.motion_gate is not None and not self.motion_gate.should_process(frame, source_id, timestamp):
+            return
+            
+        packet = {
+            'source_id': source_id,
+            'frame_id': sequence,
+            'order': (source['generation'], sequence),
+            'timestamp': timestamp,
+            'frame': frame,
+            'regions': source['monitor'].regions
+        }
+        
+        # Keep the capture thread off this frame's slot until the packet is released
+        ring = source['monitor'].frame_ring
+        packet['ring'] = ring if ring.pin(sequence) else None
+        with self.in_flight_lock:
+            self.in_flight += 1
+            
+        if self.scheduler is not None and not self.scheduler.should_detect(
+                source_id, self.stages[0].meter.duration, self.input_fps()):
+            self.propagation_queue.put(packet)
+        else:
+            self.detection_queue.put(packet)
+            
+    def on_source_stopped(self, source_id):
+        """A source's capture ended on its own: frames already queued still finish, but its rate
+        no longer counts towards the detector's load"""
+        source = self.sources.get(source_id)
+        if source is not None:
+            source['meter'] = RateMeter()
+            
+    def input_fps(self):
+        """Combined frame rate of all sources, i.e. the load the shared detector faces"""
+        fps = 0.0
+        for source in list(self.sources.values()):
+            interval = source['meter'].interval
+            if interval:
+                fps += 1.0 / interval
+        return fps
+        
+    def detect(self, packet):
+        """Detection stage"""
+        packet['detected_faces'] = self.ml_processor.detect_faces(packet['frame'], packet['regions'])
+        return packet
+        
+    def detect_batch(self, packets):
+        """Batched detection stage: one detector call for frames from any mix of sources"""
+        results = self.ml_processor.detect_faces_batch([packet['frame'] for packet in packets],
+                                                       [packet['regions'] for packet in packets])
+        for packet, detected_faces in zip(packets, results):
+            packet['detected_faces'] = detected_faces
+        return packets
+        
+    def recognize(self, packet):
+        """Recognition stage"""
+        if 'face_encodings' in packet:
+            # Encoded by an inference worker; only the cheap gallery match runs here
+            packet['detections'] = self.ml_processor.recognize_encoded(packet['detected_faces'],
+                                                                       packet.pop('face_encodings'))
+            return packet
+            
+        detected_faces = packet['detected_faces']
+        if self.tracker is not None:
+            # Identities are cached per track; only new, uncertain or stale tracks are re-recognized
+            packet['detections'] = self.tracker.recognize(
+                packet['source_id'], packet['frame'], detected_faces, packet['timestamp'],
+                self.ml_processor.recognize_detections
+            )
+        elif detected_faces:
+            packet['detections'] = self.ml_processor.recognize_detections(packet['frame'], detected_faces)
+        else:
+            packet['detections'] = []
+        return packet
+        
+    def propagate(self, packet):
+        """Propagation stage: move tracked boxes with optical flow on frames the detector skips"""
+        detections, needs_detection = self.tracker.propagate(packet['source_id'], packet['frame'],
+                                                             packet['timestamp'])
+        if needs_detection:
+            self.scheduler.request_detection(packet['source_id'])
+            
+        packet['detected_faces'] = None
+        packet['detections'] = detections
+        return packet
+        
+    def deliver(self, packet):
+        """Event sink stage.
+        
+        Detected and propagated frames arrive from different stages. A propagated packet older
+        than one already delivered for its source is dropped instead of rewinding the boxes; a
+        late detection is still delivered, since the tracker moved its boxes onto the newest frame.
+        """
+        source = self.sources.get(packet['source_id'])
+        if source is not None:
+            if source['delivered'] is not None and packet['order'] <= source['delivered']:
+                if packet['detected_faces'] is None:
+                    self.stale_packets += 1
+                    return
+            else:
+                source['delivered'] = packet['order']
+                
+        packet['latency'] = time.time() - packet['timestamp']
+        self.latency_meter.record(packet['latency'])
+        self.sink(packet)
+        
+    def get_stats(self):
+        """Get per-stage queue depth, throughput and end-to-end latency"""
+        with self.sources_lock:
+            sources = dict(self.sources)
+            
+        detection_sources = self.detection_queue.get_stats()['sources']
+        capture = {}
+        for source_id, source in sources.items():
+            capture[source_id] = source['meter'].get_stats()
+            queue_stats = detection_sources.get(source_id, {})
+            capture[source_id]['backlog'] = queue_stats.get('backlog', 0)
+            capture[source_id]['dropped'] = queue_stats.get('dropped', 0)
+            capture[source_id]['missed'] = source['cursor'].dropped
+            
+        stats = {
+            'capture': {
+                'fps': sum(source_stats['fps'] for source_stats in capture.values()),
+                'count': sum(source_stats['count'] for source_stats in capture.values()),
+                'sources': capture
+            }
+        }
+        for stage in self.stages:
+            stats[stage.name] = stage.get_stats()
+        stats['end_to_end_latency_ms'] = self.latency_meter.get_stats()['avg_ms']
+        stats['stale_dropped'] = self.stale_packets
+        if self.motion_gate is not None:
+            stats['motion'] = self.motion_gate.get_stats()
+        if self.tracker is not None:
+            stats['tracking'] = self.tracker.get_stats()
+        if self.scheduler is not None:
+            stats['schedule'] = self.scheduler.get_stats()
+        return stats
@@ -0,0 +1,163 @@
+import threading
+import time
+
+ABSENT = 'absent'
+PRESENT = 'present'
+
+class Presence:
+    """One person's presence state"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.state = ABSENT
+        self.first_seen = None  # start of the current (or last) presence
+        self.last_seen = None
+        self.camera = None
+        self.pending_hits = 0  # recognitions counted towards arrival
+        self.pending_since = None
+        
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'state': self.state,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'camera': self.camera
+        }
+
+class PresenceTracker:
+    """Turns per-frame recognition hits into debounced arrive/depart transitions.
+    
+    Arrival needs enter_hits confident recognitions within enter_window seconds, so one
+    misrecognized frame does not mark anyone present; departure needs exit_after seconds
+    without a hit, so a few missed frames do not mark them absent. observe() is O(1) and only
+    transitions reach the listeners, so downstream cost follows arrivals and departures, not
+    the detection rate.
+    """
+    
+    def __init__(self, enter_hits=3, enter_window=2.0, exit_after=30.0, min_confidence=0.6):
+        self.enter_hits = enter_hits
+        self.enter_window = enter_window
+        self.exit_after = exit_after
+        self.min_confidence = min_confidence
+        
+        self.people = {}  # name -> Presence
+        self.present = {}  # name -> Presence, the only entries expire() has to look at
+        self.listeners = []  # callables (event, presence_dict)
+        self.lock = threading.Lock()
+        
+        # Counters
+        self.observations = 0
+        self.arrivals = 0
+        self.departures = 0
+        
+    def update_settings(self, settings):
+        """Update debounce and hysteresis thresholds"""
+        with self.lock:
+            if 'enter_hits' in settings:
+                self.enter_hits = max(1, int(settings['enter_hits']))
+            if 'enter_window_seconds' in settings:
+                self.enter_window = float(settings['enter_window_seconds'])
+            if 'exit_after_seconds' in settings:
+                self.exit_after = float(settings['exit_after_seconds'])
+            if 'min_confidence' in settings:
+                self.min_confidence = float(settings['min_confidence'])
+                
+    def add_listener(self, listener):
+        """listener(event, presence) is called with 'arrived' or 'departed' and a state snapshot"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+            
+    def observe(self, name, confidence, camera, now=None):
+        """Feed one recognition; returns the transition it caused, if any"""
+        if not name or name == 'Unknown' or confidence < self.min_confidence:
+            return None
+            
+        now = time.time() if now is None else now
+        with self.lock:
+            self.observations += 1
+            presence = self.people.get(name)
+            if presence is None:
+                presence = self.people[name] = Presence(name)
+                
+            presence.last_seen = now
+            presence.camera = camera
+            if presence.state == PRESENT:
+                return None
+                
+            # Absent: count hits inside a sliding start window
+            if presence.pending_since is None or now - presence.pending_since > self.enter_window:
+                presence.pending_since = now
+                presence.pending_hits = 0
+            presence.pending_hits += 1
+            if presence.pending_hits < self.enter_hits:
+                return None
+                
+            presence.state = PRESENT
+            presence.first_seen = presence.pending_since
+            presence.pending_since = None
+            presence.pending_hits = 0
+            self.present[name] = presence
+            self.arrivals += 1
+            snapshot = presence.to_dict()
+            
+        self.emit('arrived', snapshot)
+        return 'arrived'
+        
+    def expire(self, now=None):
+        """Mark people unseen for exit_after seconds as departed; O(people present)"""
+        now = time.time() if now is None else now
+        with self.lock:
+            departed = [presence for presence in self.present.values()
+                        if now - presence.last_seen > self.exit_after]
+            snapshots = [self.depart(presence) for presence in departed]
+            
+        for snapshot in snapshots:
+            self.emit('departed', snapshot)
+        return len(snapshots)
+        
+    def reset(self):
+        """Depart everyone present (e.g. when monitoring stops) and forget pending hits"""
+        with self.lock:
+            snapshots = [self.depart(presence) for presence in list(self.present.values())]
+            for presence in self.people.values():
+                presence.pending_since = None
+                presence.pending_hits = 0
+                
+        for snapshot in snapshots:
+            self.emit('departed', snapshot)
+            
+    def depart(self, presence):
+        """Move to absent (caller holds the lock)"""
+        presence.state = ABSENT
+        del self.present[presence.name]
+        self.departures += 1
+        return presence.to_dict()
+        
+    def emit(self, event, snapshot):
+        for listener in list(self.listeners):
+            try:
+                listener(event, snapshot)
+            except Exception as e:
+                print(f"Error in presence listener: {e}")
+                
+    def get_presence(self, name):
+        """State snapshot for one person, or None if never seen"""
+        with self.lock:
+            presence = self.people.get(name)
+            return presence.to_dict() if presence else None
+            
+    def get_present(self):
+        """Snapshots of everyone currently present"""
+        with self.lock:
+            return [presence.to_dict() for presence in self.present.values()]
+            
+    def get_stats(self):
+        with self.lock:
+            return {
+                'present': len(self.present),
+                'tracked': len(self.people),
+                'observations': self.observations,
+                'arrivals': self.arrivals,
+                'departures': self.departures
+            }
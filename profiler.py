@@ -0,0 +1,178 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+# Threads sampled by default: the GUI/monitoring thread, camera capture, pipeline stages and the
+# inference result collector
+DEFAULT_THREAD_PREFIXES = ('MainThread', 'capture-', 'pipeline-', 'inference-')
+
+# Files whose functions get their own section in the summary
+FOCUS_FILES = ('ml_processor.py', 'camera_monitor.py')
+
+def frame_label(code):
+    """Stack entry as 'function (file:line)', the line being where the function starts"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def format_table(counter, total, limit):
+    lines = []
+    for label, count in counter.most_common(limit):
+        lines.append(f"  {count / total * 100:6.1f}%  {count:7d}  {label}")
+    return lines or ["  (no samples)"]
+
+class SamplingProfiler:
+    """Samples the stacks of selected threads at a fixed interval for a time window.
+    
+    Writes a collapsed-stack file (one 'thread;outer;...;inner count' line per distinct stack,
+    ready for flamegraph.pl or speedscope) and a plain-text summary of the hottest functions.
+    """
+    
+    def __init__(self, duration=30.0, interval=0.005, thread_prefixes=DEFAULT_THREAD_PREFIXES,
+                 output_dir="data/profiles"):
+        self.duration = float(duration)
+        self.interval = float(interval)
+        self.thread_prefixes = tuple(thread_prefixes)
+        self.output_dir = output_dir
+        
+        self.thread = None
+        self.running = False
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.result = None  # (collapsed_path, summary_path) once finished
+        
+    def start(self):
+        """Start sampling on a background thread; False if already running"""
+        if self.running:
+            return False
+            
+        self.running = True
+        self.stacks = Counter()
+        self.samples = 0
+        self.result = None
+        self.started_at = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, name="profiler", daemon=True)
+        self.thread.start()
+        print(f"Profiling for {self.duration:.0f} s")
+        return True
+        
+    def stop(self):
+        """End the window early; the files are still written"""
+        self.running = False
+        if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5.0)
+            
+    def run(self):
+        """Sampling loop"""
+        own_id = threading.get_ident()
+        deadline = self.started_at + self.duration
+        next_sample = time.perf_counter()
+        
+        try:
+            while self.running and time.perf_counter() < deadline:
+                self.sample(own_id)
+                
+                next_sample += self.interval
+                delay = next_sample - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Fell behind (e.g. GIL contention); don't try to catch up with a burst
+                    next_sample = time.perf_counter()
+                    
+            self.result = self.write_results()
+        except Exception as e:
+            print(f"Error while profiling: {e}")
+        finally:
+            self.running = False
+            
+    def sample(self, own_id):
+        """Record one stack per selected thread"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            name = names.get(thread_id)
+            if name is None or not name.startswith(self.thread_prefixes):
+                continue
+                
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(name)
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+            
+        self.samples += 1
+        
+    def write_results(self):
+        """Write the collapsed stacks and the summary; returns both paths"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        collapsed_path = os.path.join(self.output_dir, f"profile-{stamp}.folded")
+        summary_path = os.path.join(self.output_dir, f"profile-{stamp}.txt")
+        
+        with open(collapsed_path, 'w') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+                
+        with open(summary_path, 'w') as f:
+            f.write(self.summary())
+            
+        print(f"Profile written to {collapsed_path} and {summary_path}")
+        return collapsed_path, summary_path
+        
+    def summary(self, limit=15):
+        """Top functions by own and total time, overall and within FOCUS_FILES"""
+        own = Counter()
+        total = Counter()
+        threads = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            threads[frames[0]] += count
+            if len(frames) > 1:
+                own[frames[-1]] += count
+            # A recursive function counts once per stack
+            for label in set(frames[1:]):
+                total[label] += count
+                
+        stack_samples = sum(self.stacks.values()) or 1
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        
+        lines = [
+            f"Sampling profile, {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            f"{self.samples} samples over {elapsed:.1f} s every {self.interval * 1000:.1f} ms, "
+            f"{stack_samples} thread stacks",
+            "",
+            "Samples per thread:"
+        ]
+        lines += format_table(threads, stack_samples, limit)
+        
+        lines += ["", "Top functions by own time (innermost frame):"]
+        lines += format_table(own, stack_samples, limit)
+        
+        lines += ["", "Top functions by total time (on the stack):"]
+        lines += format_table(total, stack_samples, limit)
+        
+        for filename in FOCUS_FILES:
+            marker = f"({filename}:"
+            focus = Counter({label: count for label, count in total.items() if marker in label})
+            lines += ["", f"Top functions in {filename} by total time:"]
+            lines += format_table(focus, stack_samples, limit)
+            
+        return "\n".join(lines) + "\n"
+        
+    def get_status(self):
+        """Progress for the settings tab"""
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return {
+            'running': self.running,
+            'elapsed': min(elapsed, self.duration),
+            'duration': self.duration,
+            'samples': self.samples,
+            'collapsed_file': self.result[0] if self.result else None,
+            'summary_file': self.result[1] if self.result else None
+        }
@@ -0,0 +1,139 @@
+import os
+
+import cv2
+
+FRAME_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def is_frame_directory(source):
+    return isinstance(source, str) and os.path.isdir(source)
+
+class ReplayCapture:
+    """cv2.VideoCapture stand-in that replays a video file or a directory of frames.
+    
+    speed 1.0 plays at the recording's native rate, 2.0 twice as fast and 0 as fast as frames
+    can be decoded. CameraMonitor does the pacing using frame_interval.
+    """
+    
+    def __init__(self, source, speed=1.0, loop=False, fps=30.0):
+        self.source = source
+        self.speed = max(0.0, float(speed))
+        self.loop = loop
+        self.video = None
+        self.frame_paths = []
+        self.position = 0
+        self.loops = 0
+        self.finished = False
+        self.pending = None
+        self.frame_size = (0, 0)
+        
+        if is_frame_directory(source):
+            self.frame_paths = [os.path.join(source, name) for name in sorted(os.listdir(source))
+                                if name.lower().endswith(FRAME_EXTENSIONS)]
+            self.native_fps = fps
+            if self.frame_paths:
+                first = cv2.imread(self.frame_paths[0])
+                if first is not None:
+                    self.frame_size = (first.shape[1], first.shape[0])
+        else:
+            self.video = cv2.VideoCapture(source)
+            self.native_fps = self.video.get(cv2.CAP_PROP_FPS) or fps
+            self.frame_size = (int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                               int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+                               
+    @property
+    def frame_interval(self):
+        """Seconds between frames at the replay speed (0 = no pacing)"""
+        if self.speed == 0 or self.native_fps <= 0:
+            return 0.0
+        return 1.0 / (self.native_fps * self.speed)
+        
+    def isOpened(self):
+        if self.video is not None:
+            return self.video.isOpened()
+        return bool(self.frame_paths)
+        
+    def rewind(self):
+        """Start again from the first frame"""
+        self.position = 0
+        self.finished = False
+        self.pending = None
+        if self.video is not None:
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            
+    def next_frame(self, image=None):
+        """Decode the next frame (wrapping around when looping), or None at the end"""
+        for _ in range(2):
+            if self.video is not None:
+                ret, frame = self.video.read(image) if image is not None else self.video.read()
+                frame = frame if ret else None
+            elif self.position < len(self.frame_paths):
+                frame = cv2.imread(self.frame_paths[self.position])
+            else:
+                frame = None
+                
+            if frame is not None:
+                self.position += 1
+                return frame
+            if not self.loop or self.position == 0:
+                break
+                
+            self.rewind()
+            self.loops += 1
+            
+        self.finished = True
+        return None
+        
+    def read(self, image=None):
+        frame = self.next_frame(image)
+        return frame is not None, frame
+        
+    def grab(self):
+        self.pending = self.next_frame()
+        return self.pending is not None
+        
+    def retrieve(self, image=None):
+        frame, self.pending = self.pending, None
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            image[...] = frame
+            frame = image
+        return True, frame
+        
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.frame_size[0]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.frame_size[1]
+        if prop == cv2.CAP_PROP_FPS:
+            return self.native_fps
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.position
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.frame_count()
+        return 0
+        
+    def set(self, prop, value):
+        """Recordings keep their own resolution and rate"""
+        return False
+        
+    def frame_count(self):
+        if self.video is not None:
+            return int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
+        return len(self.frame_paths)
+        
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+            
+    def get_stats(self):
+        """Replay position and speed"""
+        return {
+            'source': self.source,
+            'speed': self.speed,
+            'native_fps': self.native_fps,
+            'position': self.position,
+            'frames': self.frame_count(),
+            'loops': self.loops,
+            'finished': self.finished
+        }
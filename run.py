@@ -4,6 +4,7 @@ Faculty Presence Monitoring & Alert System
 Main entry point for the application
 """
 
+import argparse
 import sys
 import os
 import tkinter as tk
@@ -53,6 +54,12 @@ Note: You may need to install additional system dependencies for dlib and face_r
 
 def main():
     """Main function to start the application"""
+    parser = argparse.ArgumentParser(description="Faculty Presence Monitoring & Alert System")
+    parser.add_argument('--profile', type=float, metavar='SECONDS',
+                        help="sample the monitoring, capture and inference threads for SECONDS "
+                             "and write a collapsed-stack profile to data/profiles")
+    args = parser.parse_args()
+    
     print("Faculty Presence Monitoring & Alert System")
     print("=" * 50)
     
@@ -66,7 +73,7 @@ def main():
         from main import main as run_app
         
         print("Starting application...")
-        run_app()
+        run_app(profile_seconds=args.profile)
         
     except KeyboardInterrupt:
         print("\nApplication interrupted by user")
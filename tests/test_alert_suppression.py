@@ -0,0 +1,67 @@
+"""
+Regression test: raising alerts and reading alert statistics from two threads
+at once must not deadlock on the AlertSystem and AlertSuppressor locks
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alert_system import AlertSystem
+
+class ConcurrentAlertStatisticsTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.alert_system = AlertSystem(os.path.join(self.workdir.name, 'alerts.jsonl'))
+        # Fold every repeat into the open alert so check() always consults is_alert_open
+        self.alert_system.update_suppression_settings({'dedup_window_seconds': 3600.0})
+        self.threads = []
+        
+    def tearDown(self):
+        # A deadlocked alert system would block close() as well
+        if not any(thread.is_alive() for thread in self.threads):
+            self.alert_system.close()
+        self.workdir.cleanup()
+        
+    def test_raise_alert_and_statistics_do_not_deadlock(self):
+        stop = threading.Event()
+        counts = {'raised': 0, 'stats': 0}
+        
+        def raise_alerts():
+            # Like the pipeline sink thread (handle_detection)
+            while not stop.is_set():
+                self.alert_system.raise_alert("Unknown Person", "Unknown person detected on Corridor",
+                                              camera="Corridor", subject=counts['raised'] % 4,
+                                              auto_email=False)
+                counts['raised'] += 1
+                
+        def read_statistics():
+            # Like the GUI thread (update_dashboard_stats)
+            while not stop.is_set():
+                self.alert_system.get_alert_statistics()
+                counts['stats'] += 1
+                
+        threads = self.threads = [threading.Thread(target=raise_alerts, daemon=True),
+                                  threading.Thread(target=read_statistics, daemon=True)]
+        for thread in threads:
+            thread.start()
+        time.sleep(1.0)
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=5.0)
+            
+        self.assertFalse(any(thread.is_alive() for thread in threads),
+                         f"threads deadlocked (raised {counts['raised']}, stats {counts['stats']})")
+        self.assertGreater(counts['raised'], 0)
+        self.assertGreater(counts['stats'], 0)
+        
+        stats = self.alert_system.get_alert_statistics()
+        self.assertEqual(stats['suppression']['created'] + stats['suppression']['suppressed'], counts['raised'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Regression test: a replay that runs out of frames stops counting as an active
+camera, tells the registry's listeners, and its frames still drain through
+the pipeline
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from camera_registry import CameraRegistry
+from pipeline import BLOCK, MonitoringPipeline
+
+class NoFaces:
+    def detect_faces(self, frame, regions):
+        time.sleep(0.005)
+        return []
+        
+class FinishedReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        for i in range(20):
+            cv2.imwrite(os.path.join(self.workdir.name, f"{i:04d}.png"), np.full((48, 64, 3), i, np.uint8))
+            
+    def tearDown(self):
+        self.workdir.cleanup()
+        
+    def test_finished_replay_is_reported_stopped(self):
+        registry = CameraRegistry()
+        stopped = []
+        registry.add_stop_listener(stopped.append)
+        camera_monitor = registry.add_camera('replay', {'source': self.workdir.name, 'resolution': '64x48',
+                                                        'replay_speed': 0})
+        delivered = []
+        pipeline = MonitoringPipeline(None, NoFaces(), delivered.append, drop_policy=BLOCK)
+        pipeline.add_source('replay', camera_monitor)
+        pipeline.start()
+        try:
+            self.assertEqual(registry.start_all(), 1)
+            self.assertTrue(camera_monitor.wait_until_finished(30.0))
+            
+            self.assertEqual(stopped, ['replay'])
+            self.assertEqual(registry.get_active_count(), 0)
+            self.assertEqual(registry.get_camera_stats()['replay']['status'], 'inactive')
+            
+            deadline = time.monotonic() + 30.0
+            while not pipeline.is_idle() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(pipeline.is_idle())
+            self.assertEqual(len(delivered), 20)
+        finally:
+            pipeline.stop()
+            registry.stop_all()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Regression test: loaded encodings are private copies, so nothing keeps the
+cache file mapped and a later save can replace it
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encoding_cache import EncodingCache
+
+class EncodingCacheLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.images = {}
+        for name, content in (('alice', b'a'), ('bob', b'bb')):
+            path = os.path.join(self.workdir.name, f"{name}.jpg")
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.images[name] = path
+            
+    def tearDown(self):
+        self.workdir.cleanup()
+        
+    def test_loaded_rows_are_copies(self):
+        cache = EncodingCache(self.workdir.name)
+        cache.update('alice.jpg', 'alice', self.images['alice'], np.ones(128))
+        cache.update('bob.jpg', 'bob', self.images['bob'], None)
+        self.assertTrue(cache.save())
+        
+        cache = EncodingCache(self.workdir.name)
+        self.assertEqual(cache.load(), 2)
+        encoding = cache.entries['alice.jpg']['encoding']
+        self.assertNotIsInstance(encoding, np.memmap)
+        self.assertIsNone(encoding.base)
+        self.assertIsNone(cache.entries['bob.jpg']['encoding'])
+        
+        # Rewriting the file while the loaded encodings are still held
+        cache.update('bob.jpg', 'bob', self.images['bob'], np.full(128, 2.0))
+        self.assertTrue(cache.save())
+        
+        reloaded = EncodingCache(self.workdir.name)
+        reloaded.load()
+        np.testing.assert_array_equal(reloaded.entries['alice.jpg']['encoding'], encoding)
+        np.testing.assert_array_equal(reloaded.entries['bob.jpg']['encoding'], np.full(128, 2.0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Regression test: matching while another thread enrolls (and so regrows the
+gallery matrix) never sees a matrix, norms and size that do not belong together
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_gallery import FaceGallery
+
+class ConcurrentEnrollmentTest(unittest.TestCase):
+    def setUp(self):
+        # Switch threads as often as possible so unguarded reads interleave with writes
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+        
+    def test_search_during_growth(self):
+        rng = np.random.default_rng(0)
+        gallery = FaceGallery(initial_capacity=1)
+        anchor = rng.normal(size=128).astype(np.float32)
+        gallery.add('anchor', anchor)
+        encodings = rng.normal(size=(20000, 128)).astype(np.float32) + 10.0
+        
+        errors = []
+        done = threading.Event()
+        
+        def enroll():
+            # Like the GUI thread adding reference images one by one
+            for i, encoding in enumerate(encodings):
+                gallery.add(f"faculty_{i}", encoding)
+            done.set()
+            
+        def search():
+            # Like the pipeline's recognition thread
+            while not done.is_set():
+                try:
+                    result = gallery.search(anchor[None, :], 0.6, 3)[0]
+                    if result['name'] != 'anchor' or result['distance'] > 1e-3:
+                        errors.append(result)
+                except Exception as e:
+                    errors.append(e)
+                    
+        threads = [threading.Thread(target=enroll), threading.Thread(target=search)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60.0)
+            
+        self.assertEqual(errors[:1], [])
+        self.assertEqual(len(gallery), len(encodings) + 1)
+
+if __name__ == "__main__":
+    unittest.main()
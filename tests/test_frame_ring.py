@@ -0,0 +1,65 @@
+"""
+Regression test: a frame the GUI holds stays intact while capture keeps
+publishing, and re-applying unchanged camera settings keeps the ring the
+pipeline grew (and its pinned slots)
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from camera_monitor import CameraMonitor
+from frame_ring import FrameRing
+
+def capture(ring, value):
+    """One in-place read, as the capture loop does it"""
+    buffer = ring.next_buffer()
+    frame = np.full((4, 4, 3), value, dtype=np.uint8) if buffer is None else buffer
+    frame[...] = value
+    return ring.publish(frame, float(value))
+
+class FrameRingPinTest(unittest.TestCase):
+    def test_acquired_frame_is_not_overwritten(self):
+        ring = FrameRing(4)
+        capture(ring, 1)
+        frame, _, sequence = ring.acquire_latest()
+        
+        for value in range(2, 40):
+            capture(ring, value)
+        self.assertTrue((frame == 1).all())
+        
+        ring.release(sequence)
+        for value in range(40, 50):
+            capture(ring, value)
+        self.assertEqual(ring.get_stats()['pinned'], 0)
+        self.assertEqual(ring.get_stats()['overflows'], 0)
+        
+    def test_unchanged_settings_keep_the_grown_ring(self):
+        camera_monitor = CameraMonitor('cam', 0)
+        settings = {'index': 0, 'frame_buffers': 16}
+        camera_monitor.update_settings(settings)
+        self.assertTrue(camera_monitor.ensure_frame_buffers(24))
+        
+        ring = camera_monitor.frame_ring
+        capture(ring, 7)
+        frame, _, sequence = ring.acquire_latest()
+        
+        camera_monitor.update_settings(settings)
+        self.assertIs(camera_monitor.frame_ring, ring)
+        self.assertEqual(ring.slot_count, 24)
+        
+        # A smaller setting never goes below what the pipeline required
+        camera_monitor.update_settings(dict(settings, frame_buffers=8))
+        self.assertIs(camera_monitor.frame_ring, ring)
+        
+        camera_monitor.update_settings(dict(settings, frame_buffers=32))
+        self.assertEqual(camera_monitor.frame_ring.slot_count, 32)
+        self.assertEqual(ring.get_stats()['pinned'], 1)
+        ring.release(sequence)
+
+if __name__ == "__main__":
+    unittest.main()
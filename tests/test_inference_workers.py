@@ -0,0 +1,65 @@
+"""
+Regression test: when an inference worker dies, the pool hands back the
+slots and callbacks it held and starts a replacement
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_inference_workers import create_busy_processor
+from inference_workers import InferenceWorkerPool
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+class DeadWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        self.pool = InferenceWorkerPool(workers=2, slots_per_worker=2, slot_bytes=self.frame.nbytes,
+                                        processor_factory=create_busy_processor, settings={'work_ms': 500})
+        self.pool.start()
+        self.results = []
+        self.lock = threading.Lock()
+        
+    def tearDown(self):
+        self.pool.stop()
+        
+    def on_result(self, detected_faces, face_encodings, error):
+        with self.lock:
+            self.results.append(error)
+            
+    def test_dead_worker_is_reclaimed_and_replaced(self):
+        # Wait for both workers to come up so the kill lands while tasks are queued on them
+        self.assertTrue(wait_for(lambda: self.pool.get_stats()['alive'] == 2))
+        for _ in range(4):
+            self.assertTrue(self.pool.submit(self.frame, None, True, self.on_result))
+            
+        self.pool.processes[0].kill()
+        
+        # Every callback fires (with an error for the lost tasks) and every slot comes back
+        self.assertTrue(wait_for(lambda: len(self.results) == 4))
+        self.assertIn("inference worker exited", self.results)
+        self.assertTrue(wait_for(lambda: self.pool.free_slots.qsize() == self.pool.slot_count))
+        self.assertEqual(self.pool.get_stats()['restarts'], 1)
+        self.assertEqual(self.pool.get_stats()['in_flight'], 0)
+        
+        # The replacement takes work again
+        for _ in range(4):
+            self.assertTrue(self.pool.submit(self.frame, None, True, self.on_result, timeout=5.0))
+        self.assertTrue(wait_for(lambda: len(self.results) == 8))
+        self.assertEqual(self.results[4:], [None] * 4)
+
+if __name__ == "__main__":
+    unittest.main()
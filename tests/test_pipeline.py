@@ -0,0 +1,134 @@
+"""
+Regression tests for the staged monitoring pipeline: frames in flight keep
+their ring slots, and the sink drops propagated packets that arrive after a
+newer one but still delivers a late detection (its boxes were moved forward)
+"""
+
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from camera_monitor import CameraMonitor
+from detection_scheduler import DetectionScheduler
+from face_tracker import FaceTracker
+from pipeline import BLOCK, DROP_OLDEST, LATEST_ONLY, MonitoringPipeline
+
+def capture(ring, value):
+    """One in-place read, as the capture loop does it"""
+    buffer = ring.next_buffer()
+    frame = np.full((48, 64, 3), value, dtype=np.uint8) if buffer is None else buffer
+    frame[...] = value
+    return ring.publish(frame, time.time())
+
+def wait_until_idle(pipeline, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not pipeline.is_idle() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return pipeline.is_idle()
+
+class SlowDetector:
+    """Detector that notices if its frame changes while it works on it"""
+    
+    def __init__(self):
+        self.frames = 0
+        self.overwritten = 0
+        
+    def detect_faces(self, frame, regions):
+        before = frame.copy()
+        time.sleep(0.02)
+        if not np.array_equal(before, frame):
+            self.overwritten += 1
+        self.frames += 1
+        return []
+        
+class FramesInFlightTest(unittest.TestCase):
+    def run_capture(self, drop_policy):
+        camera_monitor = CameraMonitor('cam', 0)
+        # Far fewer slots than the pipeline can hold; adding the source must grow the ring
+        camera_monitor.update_settings({'index': 0, 'frame_buffers': 2})
+        detector = SlowDetector()
+        pipeline = MonitoringPipeline(None, detector, lambda packet: None, drop_policy=drop_policy)
+        pipeline.add_source('cam', camera_monitor)
+        pipeline.start()
+        try:
+            for value in range(1, 80):
+                frame, sequence = capture(camera_monitor.frame_ring, value)
+                pipeline.on_frame('cam', frame, time.time(), sequence)
+                time.sleep(0.002)
+            self.assertTrue(wait_until_idle(pipeline))
+        finally:
+            pipeline.stop()
+            
+        self.assertGreater(detector.frames, 0)
+        self.assertEqual(detector.overwritten, 0)
+        self.assertEqual(camera_monitor.frame_ring.get_stats()['pinned'], 0)
+        
+    def test_drop_oldest_frames_are_not_overwritten(self):
+        self.run_capture(DROP_OLDEST)
+        
+    def test_block_frames_are_not_overwritten(self):
+        self.run_capture(BLOCK)
+        
+
+class BatchingDetector:
+    def __init__(self):
+        self.batches = []
+        
+    def detect_faces_batch(self, frames, regions):
+        self.batches.append(len(frames))
+        return [[] for _ in frames]
+        
+class LatestOnlyBatchTest(unittest.TestCase):
+    def test_batch_results_all_reach_the_sink(self):
+        delivered = []
+        detector = BatchingDetector()
+        pipeline = MonitoringPipeline(None, detector, delivered.append, drop_policy=LATEST_ONLY,
+                                      detection_batch_size=4, detection_batch_wait=0.5)
+        sources = [f"cam_{i}" for i in range(4)]
+        for source_id in sources:
+            pipeline.add_source(source_id, CameraMonitor(source_id, 0))
+        pipeline.start()
+        try:
+            # One frame per camera: latest_only keeps each, and they share one detector batch
+            frame = np.zeros((48, 64, 3), dtype=np.uint8)
+            for source_id in sources:
+                pipeline.on_frame(source_id, frame, time.time(), 1)
+            self.assertTrue(wait_until_idle(pipeline))
+        finally:
+            pipeline.stop()
+            
+        self.assertEqual(detector.batches, [4])
+        self.assertEqual(sorted(packet['source_id'] for packet in delivered), sources)
+        
+class SinkOrderTest(unittest.TestCase):
+    def setUp(self):
+        self.delivered = []
+        self.pipeline = MonitoringPipeline(None, None, self.delivered.append, tracker=FaceTracker(),
+                                           scheduler=DetectionScheduler())
+        self.pipeline.add_source('cam', CameraMonitor('cam', 0))
+        
+    def packet(self, sequence, detected):
+        return {
+            'source_id': 'cam',
+            'frame_id': sequence,
+            'order': (0, sequence),
+            'timestamp': time.time(),
+            'detected_faces': [] if detected else None,
+            'detections': []
+        }
+        
+    def test_late_detection_delivered_stale_propagation_dropped(self):
+        for packet in (self.packet(2, False), self.packet(1, True), self.packet(3, False),
+                       self.packet(2, False), self.packet(4, False)):
+            self.pipeline.deliver(packet)
+            
+        self.assertEqual([packet['frame_id'] for packet in self.delivered], [2, 1, 3, 4])
+        self.assertEqual(self.pipeline.get_stats()['stale_dropped'], 1)
+
+if __name__ == "__main__":
+    unittest.main()
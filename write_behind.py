@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+
+from metrics import stage_metrics
+
+def sync_directory(path):
+    """fsync the directory so a rename survives a crash (not supported everywhere)"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def atomic_write_json(path, data, indent=2):
+    """Write JSON to a temp file next to path, fsync it and rename it over path"""
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    sync_directory(path)
+
+class WriteBehindWriter:
+    """Coalesces changes to a JSON file and writes them from a background thread.
+    
+    Callers mark records dirty (O(1), no I/O); every interval seconds the thread takes one
+    snapshot and rewrites the file atomically if anything changed, so any number of changes in
+    between costs a single write. flush() writes synchronously, close() flushes and stops.
+    """
+    
+    def __init__(self, path, snapshot, interval=2.0):
+        self.path = path
+        self.snapshot = snapshot  # callable returning the data to write; must not hold our lock
+        self.interval = interval
+        
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()  # one write at a time (thread vs flush())
+        self.wakeup = threading.Event()
+        self.dirty = set()
+        self.running = False
+        self.thread = None
+        
+        # Counters
+        self.changes = 0
+        self.writes = 0
+        self.errors = 0
+        
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.wakeup.clear()
+        self.thread = threading.Thread(target=self.run, name="write-behind", daemon=True)
+        self.thread.start()
+        
+    def close(self):
+        """Stop the thread and write any pending changes"""
+        if self.running:
+            self.running = False
+            self.wakeup.set()
+            if self.thread and self.thread.is_alive():
+                self.thread.join(timeout=5.0)
+        self.flush()
+        
+    def mark_dirty(self, key=None):
+        """Record that key (e.g. a record id) changed; the write happens later"""
+        with self.lock:
+            self.dirty.add(key)
+            self.changes += 1
+            
+    def is_dirty(self):
+        with self.lock:
+            return bool(self.dirty)
+            
+    def run(self):
+        while self.running:
+            self.wakeup.wait(self.interval)
+            if not self.running:
+                break
+            self.flush()
+            
+    def flush(self):
+        """Write now if anything is dirty; returns False if the write failed"""
+        with self.write_lock:
+            with self.lock:
+                if not self.dirty:
+                    return True
+                dirty, self.dirty = self.dirty, set()
+                
+            started = stage_metrics.start()
+            try:
+                atomic_write_json(self.path, self.snapshot())
+            except (OSError, TypeError, ValueError) as e:
+                # Keep the marks so the next flush tries again
+                with self.lock:
+                    self.dirty |= dirty
+                self.errors += 1
+                print(f"Error writing {self.path}: {e}")
+                return False
+                
+            self.writes += 1
+            stage_metrics.observe('persistence', started)
+            return True
+            
+    def get_stats(self):
+        """Coalescing counters"""
+        with self.lock:
+            pending = len(self.dirty)
+        return {
+            'pending': pending,
+            'changes': self.changes,
+            'writes': self.writes,
+            'errors': self.errors,
+            'interval': self.interval
+        }